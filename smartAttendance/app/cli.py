@@ -0,0 +1,134 @@
+"""
+Commandes d'administration.
+
+Usage (depuis smartAttendance/):
+    python -m app.cli enrol photos.zip --report rapport.json
+    python -m app.cli enrol dossier_photos/ --state enrol.state
+    python -m app.cli rollups reconcile --dry-run
+    python -m app.cli rollups rebuild
+    python -m app.cli seances finalize
+    python -m app.cli seances plan
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+
+def _register_models():
+    # Comme dans main.py: toutes les tables doivent être déclarées avant la première requête
+    from app.models import user, filiere, groupe, student, module, cours, seance, attendance, student_embedding, notification, enseignant, attendance_rollup  # noqa: F401
+
+
+def enrol(args):
+    """
+    L'index en mémoire mis à jour ici est celui du processus CLI: un serveur
+    déjà démarré ne voit les nouveaux templates qu'au prochain chargement de
+    l'index (redémarrage). Utiliser POST /students/bulk-enrol pour un serveur en marche.
+    """
+    from app.services.enrolment import list_photos, enrol_photos
+
+    _register_models()
+
+    source = Path(args.source)
+    photos = list_photos(source)
+    state_path = Path(args.state) if args.state else source.with_name(source.name.rstrip("/") + ".state")
+    print(f"📦 {len(photos)} photos in {source} (state: {state_path})")
+
+    report = enrol_photos(
+        photos,
+        state_path=state_path,
+        chunk_size=args.chunk_size,
+        on_chunk=lambda done, total: print(f"  {done}/{total}")
+    )
+
+    for result in report["files"]:
+        if result["status"] not in ("enrolled", "already_enrolled"):
+            print(f"  ⚠️ {result['file']}: {result['status']}" + (f" ({result['detail']})" if result["detail"] else ""))
+    print(f"✅ {report['summary']}")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+def rollups(args):
+    """Reconstruit ou réconcilie les rollups de présences depuis la table attendances"""
+    from app.database import SessionLocal
+    from app.services.attendance_service import rebuild_rollups, reconcile_rollups
+
+    _register_models()
+    db = SessionLocal()
+    try:
+        if args.action == "rebuild":
+            rebuild_rollups(db)
+            db.commit()
+            print("✅ Attendance rollups rebuilt")
+            return
+
+        drift = reconcile_rollups(db, fix=not args.dry_run)
+        if args.dry_run:
+            db.rollback()
+        else:
+            db.commit()
+        for table, count in drift.items():
+            print(f"  {table}: {count} rows {'out of date' if args.dry_run else 'fixed'}")
+    finally:
+        db.close()
+
+
+def seances(args):
+    """
+    Planifie les séances (SEANCE_HORIZON_DAYS jours) ou clôture les séances
+    terminées (absences), comme le planificateur du serveur; utilisable en
+    cron avec SCHEDULER_INTERVAL=0.
+    """
+    from datetime import datetime
+    from app.config import settings
+    from app.database import SessionLocal
+    from app.services.attendance_service import run_finalization_sweep
+    from app.services.seance_scheduler import plan_seances, open_due_seances
+
+    _register_models()
+    if args.action == "finalize":
+        finalized = run_finalization_sweep()
+        print(f"✅ {finalized} seances finalized")
+        return
+
+    db = SessionLocal()
+    try:
+        now = datetime.now()
+        planned = plan_seances(db, now, settings.SEANCE_HORIZON_DAYS)
+        opened = open_due_seances(db, now)
+        db.commit()
+        print(f"✅ {planned} seances planned, {opened} opened")
+    finally:
+        db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enrol_parser = commands.add_parser("enrol", help="Inscription en masse depuis un dossier ou un zip de photos <email>.jpg")
+    enrol_parser.add_argument("source", help="Dossier ou archive zip")
+    enrol_parser.add_argument("--state", help="Fichier d'état pour la reprise (défaut: <source>.state)")
+    enrol_parser.add_argument("--chunk-size", type=int, default=None, help="Photos par transaction (défaut: ENROL_CHUNK_SIZE)")
+    enrol_parser.add_argument("--report", help="Écrit le rapport complet (JSON) dans ce fichier")
+    enrol_parser.set_defaults(handler=enrol)
+
+    rollups_parser = commands.add_parser("rollups", help="Rollups de présences (dashboards)")
+    rollups_parser.add_argument("action", choices=["rebuild", "reconcile"])
+    rollups_parser.add_argument("--dry-run", action="store_true", help="reconcile: compter les divergences sans corriger")
+    rollups_parser.set_defaults(handler=rollups)
+
+    seances_parser = commands.add_parser("seances", help="Séances (clôture et absences)")
+    seances_parser.add_argument("action", choices=["plan", "finalize"])
+    seances_parser.set_defaults(handler=seances)
+
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,223 @@
-from sqlalchemy import create_engine
+import threading
+import time
+from collections import deque
+from uuid import uuid4
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeout
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 from app.config import settings
 
-engine = create_engine(settings.DATABASE_URL)
+
+class CheckoutStats:
+    """Temps d'attente pour obtenir une connexion du pool (file + ouverture + pre-ping)"""
+
+    def __init__(self, window: int = 1024):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=window)  # Pour le p95
+        self._checkouts = 0
+        self._timeouts = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def record(self, wait: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self._timeouts += 1
+                return
+            self._checkouts += 1
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+            self._recent.append(wait)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            recent = sorted(self._recent)
+            return {
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "avg_wait_ms": round(self._total_wait / self._checkouts * 1000, 2) if self._checkouts else 0.0,
+                "p95_wait_ms": round(recent[min(len(recent) - 1, int(len(recent) * 0.95))] * 1000, 2) if recent else 0.0,
+                "max_wait_ms": round(self._max_wait * 1000, 2),
+            }
+
+
+class _TimedCheckout:
+    """Mixin de pool: mesure chaque connect() (appelé par l'engine à chaque checkout)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = CheckoutStats()
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeout:
+            self.stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        # dispose() / invalidation: le nouveau pool garde les mêmes compteurs
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+class InstrumentedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class InstrumentedNullPool(_TimedCheckout, NullPool):
+    pass
+
+
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+def _engine_arguments(url: str, asynchronous: bool, overrides: dict) -> tuple[object, dict, int]:
+    """(url, arguments de create_engine, statement_timeout à poser par transaction)"""
+    options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "statement_timeout_ms": settings.DB_STATEMENT_TIMEOUT_MS,
+        "pgbouncer": settings.DB_PGBOUNCER,
+        **overrides,
+    }
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if asynchronous:
+        parsed = parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+    if backend == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return parsed, {}, 0
+
+    timeout_ms = int(options["statement_timeout_ms"]) if backend == "postgresql" else 0
+    connect_args = {}
+    if options["pgbouncer"]:
+        if asynchronous and backend == "postgresql":
+            # Mode transaction: les requêtes préparées nommées d'asyncpg ne survivent pas au changement de connexion serveur
+            connect_args = {"statement_cache_size": 0, "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__"}
+        arguments = {"poolclass": InstrumentedNullPool, "connect_args": connect_args}
+        return parsed, arguments, timeout_ms
+
+    if timeout_ms:
+        if asynchronous:
+            connect_args = {"server_settings": {"statement_timeout": str(timeout_ms)}}
+        else:
+            connect_args = {"options": f"-c statement_timeout={timeout_ms}"}
+    arguments = {
+        "poolclass": InstrumentedAsyncQueuePool if asynchronous else InstrumentedQueuePool,
+        "pool_size": options["pool_size"],
+        "max_overflow": options["max_overflow"],
+        "pool_timeout": options["pool_timeout"],
+        "pool_pre_ping": options["pool_pre_ping"],
+        "pool_recycle": options["pool_recycle"],
+        "connect_args": connect_args,
+    }
+    return parsed, arguments, 0
+
+
+def _set_local_statement_timeout(engine, timeout_ms: int):
+    @event.listens_for(engine, "begin")
+    def _statement_timeout(connection):
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {timeout_ms}")
+
+
+def create_db_engine(url: str = settings.DATABASE_URL, **overrides):
+    """
+    Engine configuré depuis Settings (DB_*); `overrides` remplace un réglage
+    (clé en minuscules sans préfixe: pool_size=2, pgbouncer=True, ...).
+
+    - PostgreSQL direct: QueuePool borné, pre-ping, recycle, statement_timeout
+      passé au démarrage de la connexion.
+    - PgBouncer (mode transaction): pas de pool côté application (NullPool),
+      PgBouncer mutualise déjà; les paramètres de démarrage y sont refusés, donc
+      statement_timeout est posé par transaction (SET LOCAL).
+    - SQLite en mémoire: pool par défaut de SQLAlchemy (une seule base par connexion).
+    """
+    parsed, arguments, local_timeout_ms = _engine_arguments(url, False, overrides)
+    engine = create_engine(parsed, **arguments)
+    if local_timeout_ms:
+        _set_local_statement_timeout(engine, local_timeout_ms)
+    return engine
+
+
+def create_async_db_engine(url: str = settings.DATABASE_URL, **overrides):
+    """
+    Même configuration que create_db_engine avec le driver asynchrone
+    correspondant (asyncpg pour PostgreSQL, aiosqlite pour SQLite); le pool
+    a son propre budget de connexions.
+    """
+    parsed, arguments, local_timeout_ms = _engine_arguments(url, True, overrides)
+    engine = create_async_engine(parsed, **arguments)
+    if local_timeout_ms:
+        _set_local_statement_timeout(engine.sync_engine, local_timeout_ms)
+    return engine
+
+
+def pool_metrics(bind=None) -> dict:
+    """Occupation du pool et temps d'attente au checkout (GET /metrics)"""
+    pool = (bind or engine).pool
+    result = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        result.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+        })
+    if isinstance(pool, _TimedCheckout):
+        result.update(pool.stats.metrics())
+    return result
+
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Routes async: pas de chargement paresseux possible, les objets restent lisibles après commit
+async_engine = create_async_db_engine()
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
+    # La Session ne prend une connexion au pool qu'à sa première requête
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    """Session async pour les routes `async def`: les requêtes n'occupent plus la boucle d'événements"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def release_connection(db: Session):
+    """
+    Termine la transaction en cours (lecture seule à ce stade) pour rendre la
+    connexion au pool avant une longue attente (lecture de l'upload, inférence).
+    Les objets déjà chargés restent utilisables sans rechargement; la requête
+    suivante reprend une connexion.
+    """
+    expire_on_commit = db.expire_on_commit
+    db.expire_on_commit = False
+    try:
+        db.commit()
+    finally:
+        db.expire_on_commit = expire_on_commit
@@ -1,10 +1,10 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles  # ← AJOUTER
-from app.database import engine, Base
+from app.database import engine, Base, SessionLocal
 from app.routers import (
     auth, filieres, groupes, students, 
-    modules, cours, seances, recognition, attendance, enseignants
+    modules, cours, seances, recognition, attendance, enseignants, metrics, events
 )
 from app.config import settings
 
@@ -18,6 +18,7 @@ from app.models.cours import Cours
 from app.models.seance import Seance
 from app.models.attendance import Attendance
 from app.models.student_embedding import StudentEmbedding
+from app.models.attendance_rollup import SeanceAttendanceRollup, CoursStudentAttendanceRollup, StudentAttendanceRollup
 
 Base.metadata.create_all(bind=engine)
 
@@ -27,8 +28,10 @@ app = FastAPI(
     version="2.0.0"
 )
 
+import asyncio
 import logging
 import traceback
+from fastapi.concurrency import run_in_threadpool
 logger = logging.getLogger(__name__)
 
 from fastapi.responses import JSONResponse
@@ -44,12 +47,25 @@ async def type_error_handler(request: Request, exc: TypeError):
         logger.error(traceback.format_exc())
     return JSONResponse(status_code=500, content={"detail": "Internal TypeError occurred", "message": msg})
 
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+
+@app.exception_handler(PoolTimeout)
+async def pool_timeout_handler(request: Request, exc: PoolTimeout):
+    """Pool de connexions épuisé (DB_POOL_TIMEOUT dépassé): 503 pour que le client réessaie, comme PoolSaturated"""
+    logger.warning("DB pool exhausted during %s %s", request.method, request.url)
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Serveur occupé (base de données), réessayez dans quelques secondes"},
+        headers={"Retry-After": "1"},
+    )
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # curseur des listes paginées (utils/pagination.py)
 )
 
 # ← AJOUTER CETTE LIGNE POUR SERVIR LES FICHIERS STATIQUES
@@ -57,10 +73,69 @@ app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 
 @app.on_event("startup")
 def load_models():
+    if not settings.LOAD_ML_MODELS:
+        print("⏭️ LOAD_ML_MODELS=false: MTCNN and FaceNet not loaded (API-only worker)")
+        return
     from app.services.embedding_extractor import extractor
-    _ = extractor.mtcnn
-    _ = extractor.facenet
-    print("✅ MTCNN and FaceNet loaded")
+    timings = extractor.warmup()
+    print(f"✅ MTCNN and FaceNet loaded and warmed up {timings}")
+
+@app.on_event("startup")
+def load_embedding_index():
+    from app.services.embedding_index import embedding_index
+    db = SessionLocal()
+    try:
+        embedding_index.load(db)
+    finally:
+        db.close()
+    print(f"✅ Embedding index loaded ({embedding_index.student_count()} students, {len(embedding_index)} templates)")
+
+@app.on_event("startup")
+def build_attendance_rollups():
+    from app.services.attendance_service import rebuild_rollups_if_empty
+    db = SessionLocal()
+    try:
+        if rebuild_rollups_if_empty(db):
+            print("✅ Attendance rollups built from existing attendances")
+    finally:
+        db.close()
+
+@app.on_event("startup")
+async def start_seance_scheduler():
+    """Planification des séances, ouverture des fenêtres de détection et clôture (voir services/seance_scheduler.py)"""
+    if settings.SCHEDULER_INTERVAL <= 0:
+        print("⏭️ SCHEDULER_INTERVAL=0: séances not planned by this worker")
+        return
+    from app.services.seance_scheduler import seance_scheduler
+
+    async def run():
+        while True:
+            try:
+                stats = await run_in_threadpool(seance_scheduler.tick)
+                if any(stats.values()):
+                    logger.info("Seance scheduler: %s", stats)
+            except Exception:
+                logger.exception("Seance scheduler tick failed")
+            await asyncio.sleep(settings.SCHEDULER_INTERVAL)
+
+    app.state.seance_scheduler = asyncio.create_task(run())
+
+@app.on_event("shutdown")
+def stop_seance_scheduler():
+    task = getattr(app.state, "seance_scheduler", None)
+    if task is not None:
+        task.cancel()
+
+@app.on_event("shutdown")
+def stop_worker_pools():
+    from app.services.worker_pool import inference_pool, auth_pool
+    inference_pool.shutdown()
+    auth_pool.shutdown()
+
+@app.on_event("shutdown")
+def stop_attendance_events():
+    from app.services.attendance_events import attendance_broker
+    attendance_broker.close()
 
 app.include_router(auth.router)
 app.include_router(filieres.router)
@@ -72,6 +147,8 @@ app.include_router(seances.router)
 app.include_router(recognition.router)
 app.include_router(attendance.router) 
 app.include_router(enseignants.router)
+app.include_router(metrics.router)
+app.include_router(events.router)
 
 @app.get("/")
 def root():
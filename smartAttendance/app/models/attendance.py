@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, Float, DateTime, String
+from sqlalchemy import Column, Integer, ForeignKey, Float, DateTime, String, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -12,6 +12,11 @@ class AttendanceStatus(str, enum.Enum):
 
 class Attendance(Base):
     __tablename__ = "attendances"
+    __table_args__ = (
+        # Une seule présence par (séance, étudiant): cible du ON CONFLICT de attendance_service
+        Index("uq_attendances_seance_student", "seance_id", "student_id", unique=True),
+        Index("ix_attendances_student_seance", "student_id", "seance_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     seance_id = Column(Integer, ForeignKey("seances.id"))
@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, ForeignKey
+from app.database import Base
+
+# Compteurs de présences matérialisés, tenus à jour par services/attendance_service.py
+# dans la même transaction que chaque insertion d'Attendance.
+
+
+class SeanceAttendanceRollup(Base):
+    __tablename__ = "seance_attendance_rollups"
+
+    seance_id = Column(Integer, ForeignKey("seances.id"), primary_key=True)
+    present = Column(Integer, nullable=False, default=0)
+    late = Column(Integer, nullable=False, default=0)
+    absent = Column(Integer, nullable=False, default=0)
+
+
+class CoursStudentAttendanceRollup(Base):
+    __tablename__ = "cours_student_attendance_rollups"
+
+    cours_id = Column(Integer, ForeignKey("cours.id"), primary_key=True)
+    student_id = Column(Integer, ForeignKey("students.id"), primary_key=True, index=True)
+    present = Column(Integer, nullable=False, default=0)
+    late = Column(Integer, nullable=False, default=0)
+    absent = Column(Integer, nullable=False, default=0)
+
+
+class StudentAttendanceRollup(Base):
+    __tablename__ = "student_attendance_rollups"
+
+    student_id = Column(Integer, ForeignKey("students.id"), primary_key=True)
+    present = Column(Integer, nullable=False, default=0)
+    late = Column(Integer, nullable=False, default=0)
+    absent = Column(Integer, nullable=False, default=0)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Time, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, ForeignKey, Time, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from app.database import Base
 import enum
@@ -13,6 +13,10 @@ class JourSemaine(str, enum.Enum):
 
 class Cours(Base):
     __tablename__ = "cours"
+    __table_args__ = (
+        Index("ix_cours_enseignant_groupe", "enseignant_id", "groupe_id"),
+        Index("ix_cours_groupe_id", "groupe_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     module_id = Column(Integer, ForeignKey("modules.id"), nullable=False)
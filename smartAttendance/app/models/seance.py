@@ -1,10 +1,15 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, Boolean, Time
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Boolean, Time, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
 
 class Seance(Base):
     __tablename__ = "seances"
+    __table_args__ = (
+        # Une séance par (cours, début): cible du ON CONFLICT du planificateur (services/seance_scheduler.py)
+        Index("uq_seances_cours_date", "cours_id", "date", unique=True),
+        Index("ix_seances_date", "date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     cours_id = Column(Integer, ForeignKey("cours.id"))
@@ -12,6 +17,7 @@ class Seance(Base):
     heure_debut = Column(Time, nullable=True)  # Copié du cours
     heure_fin = Column(Time, nullable=True)    # Copié du cours
     is_active = Column(Boolean, default=True)
+    finalized_at = Column(DateTime(timezone=True), nullable=True)  # Absences écrites (attendance_service.finalize_seance)
     
     # Relations
     cours = relationship("Cours", back_populates="seances")
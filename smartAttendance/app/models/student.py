@@ -1,10 +1,13 @@
-from sqlalchemy import Integer, String, ForeignKey, LargeBinary
+from sqlalchemy import Integer, String, ForeignKey, LargeBinary, Index
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from app.database import Base
 from typing import Optional, List
 
 class Student(Base):
     __tablename__ = "students"
+    __table_args__ = (
+        Index("ix_students_groupe_id", "groupe_id"),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), unique=True, nullable=False)  # ← LIEN AVEC USER
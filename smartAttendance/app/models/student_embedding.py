@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, ForeignKey, LargeBinary, DateTime, Boolean
+from sqlalchemy import Column, Integer, ForeignKey, LargeBinary, DateTime, Boolean, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
 
 class StudentEmbedding(Base):
     __tablename__ = "student_embeddings"
+    __table_args__ = (
+        # Même ordre que le row_number() de templates.py / embedding_index.load
+        Index("ix_student_embeddings_student_verified_created", "student_id", "is_verified", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("students.id"))
@@ -1,16 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
 from sqlalchemy.orm import Session
 from datetime import datetime, time, timedelta
-from app.database import get_db
+from app.database import get_db, release_connection
 from app.models.attendance import Attendance, AttendanceStatus
-from app.models.seance import Seance
 from app.models.cours import Cours
 from app.models.student import Student
 from app.models.user import User, UserRole
 from app.schemas.attendance import AttendanceResponse
 from app.utils.dependencies import require_role
 from app.services.embedding_extractor import extractor
-import numpy as np
+from app.services.worker_pool import inference_pool
+from app.services.embedding_index import embedding_index
+from app.services.attendance_service import record_attendance
+from app.services.recognition_cache import recognition_cache, seance_state, active_seance
+from app.config import settings
 import traceback
 
 router = APIRouter(prefix="/attendance", tags=["Attendance"])
@@ -45,94 +48,83 @@ async def mark_attendance(
     db: Session = Depends(get_db)
 ):
     try:
-        seance = db.query(Seance).filter(Seance.id == seance_id).first()
-        if not seance:
-            raise HTTPException(status_code=404, detail="Séance not found")
-        
-        if not seance.is_active:
-            raise HTTPException(status_code=400, detail="Séance is closed")
-        
-        cours = db.query(Cours).filter(Cours.id == seance.cours_id).first()
-        if not cours:
-            raise HTTPException(status_code=404, detail="Cours not found")
+        # État de la séance (recognition_cache, comme routers/recognition.py): séance et cours lus une fois
+        state = seance_state(db, seance_id)
+        if state.heure_debut is None or state.heure_fin is None:
+            raise HTTPException(status_code=400, detail="Séance sans horaires définis")
         
         current_time = datetime.now().time()
-        status = calculate_attendance_status(cours, current_time)
+        status = calculate_attendance_status(state, current_time)
         
         if status is None:
-            if current_time < cours.heure_debut:
+            if current_time < state.heure_debut:
                 raise HTTPException(
                     status_code=400,
-                    detail=f"Le cours commence à {cours.heure_debut}. Trop tôt."
+                    detail=f"Le cours commence à {state.heure_debut}. Trop tôt."
                 )
             else:
                 raise HTTPException(
                     status_code=400,
-                    detail=f"Le cours s'est terminé à {cours.heure_fin}."
+                    detail=f"Le cours s'est terminé à {state.heure_fin}."
                 )
         
+        release_connection(db)  # Pas de connexion gardée pendant l'inférence
+        
         image_bytes = await file.read()
-        embedding = extractor.extract_from_image(image_bytes)
+        embedding = await inference_pool.run(extractor.extract_from_image, image_bytes)
         
         if embedding is None:
             raise HTTPException(status_code=400, detail="No face detected in image")
         
-        from sqlalchemy.orm import joinedload
-        students = db.query(Student).options(joinedload(Student.user)).all()
-        
-        best_match = None
-        min_distance = float('inf')
-        
-        for student in students:
-            if student.embedding:
-                try:
-                    stored_emb = np.frombuffer(student.embedding, dtype=np.float32)
-                    if stored_emb.shape != embedding.shape:
-                        continue
-                    distance = np.linalg.norm(embedding - stored_emb)
-                    if distance < min_distance:
-                        min_distance = distance
-                        best_match = student
-                except Exception as e:
-                    print(f"Error comparing with student {student.id}: {e}")
-                    continue
-        
-        threshold = 0.9
-        
-        if min_distance > threshold:
+        student_id, min_distance = recognition_cache.match(
+            state, embedding, lambda probe: embedding_index.match(probe, groupe_id=state.groupe_id)
+        )
+        
+        threshold = settings.RECOGNITION_THRESHOLD
+        
+        if student_id is None or min_distance > threshold:
             raise HTTPException(
                 status_code=404,
                 detail=f"Étudiant non reconnu (distance: {min_distance:.2f})"
             )
         
-        confidence = max(0.0, 1 - (min_distance / threshold))
-        
-        existing = db.query(Attendance).filter(
-            Attendance.seance_id == seance_id,
-            Attendance.student_id == best_match.id
-        ).first()
-        
-        if existing:
+        # Déjà marqué(e) d'après l'état de la séance: réponse sans toucher la base
+        existing = recognition_cache.already_marked(state, student_id)
+        if existing is not None:
             raise HTTPException(
                 status_code=400,
-                detail=f"Présence déjà enregistrée ({existing.status})"
+                detail=f"Présence déjà enregistrée ({existing})"
             )
         
+        seance = active_seance(db, seance_id)
+        if seance is None:
+            raise HTTPException(status_code=400, detail="Cette séance est terminée")
+        
+        confidence = max(0.0, 1 - (min_distance / threshold))
+        
         print(f"🔍 DEBUG STATUS: '{status}' (type: {type(status).__name__})")
         
         # ← FIX ICI: Utiliser la valeur string directement
-        attendance = Attendance(
-            seance_id=seance_id,
-            student_id=best_match.id,
-            status=status,  # ← "present" ou "late" (minuscules)
-            confidence=float(confidence)
-        )
+        # ← "present" ou "late" (minuscules); rollups mis à jour dans la même transaction.
+        # L'unicité (séance, étudiant) est garantie par la base: None si déjà enregistrée
+        attendance = record_attendance(db, seance, student_id, confidence, status)
+        
+        if attendance is None:
+            existing = db.query(Attendance.status).filter(
+                Attendance.seance_id == seance_id,
+                Attendance.student_id == student_id
+            ).scalar()
+            if existing is not None:
+                state.mark(student_id, existing)
+            raise HTTPException(
+                status_code=400,
+                detail=f"Présence déjà enregistrée ({existing})"
+            )
         
-        db.add(attendance)
         db.commit()
         db.refresh(attendance)
         
-        print(f"✅ Présence marquée: {best_match.user.full_name} ({status})")
+        print(f"✅ Présence marquée: {embedding_index.name_of(student_id)} ({status})")
         return attendance
     
     except HTTPException:
@@ -1,18 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
-from app.database import get_db
+from app.database import get_db, get_async_db
 from app.models.user import User, UserRole
+from app.models.student import Student
 from pydantic import BaseModel
 from app.schemas.user import UserCreate, UserResponse, Token, UserUpdate
 from app.utils.security import (
-    verify_password, 
+    verify_and_update_password,
     get_password_hash, 
     create_access_token,
-    determine_role_from_email
+    determine_role_from_email,
+    user_claims
 )
 from app.utils.dependencies import get_current_active_user, require_role
+from app.utils.pagination import PageParams, paginate, ndjson_stream
+from app.services.embedding_index import embedding_index
+from app.services.user_cache import user_cache
+from app.services.worker_pool import auth_pool
 from app.config import settings
 
 class LoginRequest(BaseModel):
@@ -22,7 +30,7 @@ class LoginRequest(BaseModel):
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 @router.post("/signup", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def signup(user_data: UserCreate, db: Session = Depends(get_db)):
+async def signup(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Inscription d'un nouvel utilisateur.
     Le rôle est automatiquement déterminé selon l'email:
@@ -30,7 +38,7 @@ def signup(user_data: UserCreate, db: Session = Depends(get_db)):
     - @emsi-edu.ma -> student
     """
     # Vérifier si l'email existe déjà
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    existing_user = await db.scalar(select(User.id).where(User.email == user_data.email))
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -40,32 +48,32 @@ def signup(user_data: UserCreate, db: Session = Depends(get_db)):
     # Déterminer le rôle basé sur l'email
     role = determine_role_from_email(user_data.email)
     
-    # Créer le nouvel utilisateur
+    # Créer le nouvel utilisateur (bcrypt sur le pool borné, hors de la boucle d'événements)
     new_user = User(
         email=user_data.email,
         full_name=user_data.full_name,
-        hashed_password=get_password_hash(user_data.password),
+        hashed_password=await auth_pool.run(get_password_hash, user_data.password),
         role=role
     )
     
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     
     return new_user
 
 @router.post("/login", response_model=Token)
-def login(
+async def login(
     login_data: LoginRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Connexion avec email/full_name et mot de passe.
+    La vérification bcrypt tourne sur auth_pool (borné: 503 au-delà de la file).
     """
-    # Chercher par email OU full_name
-    user = db.query(User).filter(
-        (User.email == login_data.username) | (User.full_name == login_data.username)
-    ).first()
+    # Une seule recherche indexée: email si l'identifiant en a la forme, sinon nom complet
+    column = User.email if "@" in login_data.username else User.full_name
+    user = (await db.execute(select(User).where(column == login_data.username).limit(1))).scalar_one_or_none()
 
     if not user:
         raise HTTPException(
@@ -74,12 +82,18 @@ def login(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    if not verify_password(login_data.password, user.hashed_password):
+    valid, new_hash = await auth_pool.run(verify_and_update_password, login_data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email/name or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    
+    # Hash d'un ancien coût (BCRYPT_ROUNDS modifié): remplacé de façon transparente
+    if new_hash is not None:
+        user.hashed_password = new_hash
+        await db.commit()
 
     if not user.is_active:
         raise HTTPException(
@@ -89,7 +103,7 @@ def login(
     
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data=user_claims(user), expires_delta=access_token_expires
     )
     
     return {
@@ -107,14 +121,18 @@ def get_current_user_info(current_user: User = Depends(get_current_active_user))
 
 @router.get("/users", response_model=list[UserResponse])
 def get_all_users(
+    response: Response,
+    page: PageParams = Depends(),
     current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.SUPER_ADMIN])),
     db: Session = Depends(get_db)
 ):
     """
-    Récupérer tous les utilisateurs (Admin et Super Admin uniquement).
+    Récupérer tous les utilisateurs (Admin et Super Admin uniquement),
+    paginés par id ou en flux NDJSON (voir utils/pagination.py).
     """
-    users = db.query(User).all()
-    return users
+    if page.stream:
+        return ndjson_stream(lambda session: session.query(User), User.id, lambda session, rows: rows, UserResponse, page)
+    return paginate(db.query(User), User.id, page, response)
 
 @router.put("/users/{user_id}/role", response_model=UserResponse)
 def update_user_role(
@@ -157,9 +175,15 @@ def update_user_role(
     if user_update.is_active is not None:
         user.is_active = user_update.is_active
     
+    user_cache.invalidate_after_commit(db, user.id)
     db.commit()
     db.refresh(user)
     
+    if user_update.full_name is not None and user.role == UserRole.STUDENT:
+        student = db.query(Student).filter(Student.user_id == user.id).first()
+        if student:
+            embedding_index.rename(student.id, user.full_name)
+    
     return user
 
 @router.post("/create-super-admin", response_model=UserResponse)
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models.cours import Cours
@@ -7,6 +7,10 @@ from app.models.groupe import Groupe
 from app.models.user import User, UserRole
 from app.schemas.cours import CoursCreate, CoursResponse, CoursWithDetails
 from app.utils.dependencies import require_role
+from app.utils.pagination import PageParams, paginate, ndjson_stream
+from app.services.seance_scheduler import plan_seances, unplan_seances
+from app.config import settings
+from datetime import datetime
 
 router = APIRouter(prefix="/cours", tags=["Cours"])
 
@@ -19,25 +23,26 @@ def create_cours(
     """Créer un cours dans l'emploi du temps"""
     new_cours = Cours(**cours.dict())
     db.add(new_cours)
+    db.flush()
+    plan_seances(db, datetime.now(), settings.SEANCE_HORIZON_DAYS, cours_ids=[new_cours.id])
     db.commit()
     db.refresh(new_cours)
     return new_cours
 
-@router.get("/", response_model=list[CoursWithDetails])
-def get_all_cours(
-    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.SUPER_ADMIN, UserRole.ENSEIGNANT])),
-    db: Session = Depends(get_db)
-):
-    """Liste de tous les cours avec détails"""
-    cours_list = db.query(Cours).all()
-    
-    result = []
-    for cours in cours_list:
-        module = db.query(Module).filter(Module.id == cours.module_id).first()
-        groupe = db.query(Groupe).filter(Groupe.id == cours.groupe_id).first()
-        enseignant = db.query(User).filter(User.id == cours.enseignant_id).first()
-        
-        result.append({
+def _cours_rows(db: Session):
+    """Cours avec module, groupe et enseignant en une requête (jointures externes)"""
+    return db.query(Cours, Module, Groupe, User).outerjoin(
+        Module, Module.id == Cours.module_id
+    ).outerjoin(
+        Groupe, Groupe.id == Cours.groupe_id
+    ).outerjoin(
+        User, User.id == Cours.enseignant_id
+    )
+
+
+def _cours_details(rows) -> list[dict]:
+    return [
+        {
             "id": cours.id,
             "module": {
                 "id": module.id,
@@ -56,9 +61,22 @@ def get_all_cours(
             "heure_debut": cours.heure_debut,
             "heure_fin": cours.heure_fin,
             "salle": cours.salle
-        })
-    
-    return result
+        }
+        for cours, module, groupe, enseignant in rows
+    ]
+
+@router.get("/", response_model=list[CoursWithDetails])
+def get_all_cours(
+    response: Response,
+    page: PageParams = Depends(),
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.SUPER_ADMIN, UserRole.ENSEIGNANT])),
+    db: Session = Depends(get_db)
+):
+    """Liste de tous les cours avec détails, paginée ou en flux (voir utils/pagination.py)"""
+    if page.stream:
+        return ndjson_stream(_cours_rows, Cours.id, lambda session, rows: _cours_details(rows), CoursWithDetails, page)
+    rows = paginate(_cours_rows(db), Cours.id, page, response, row_id=lambda row: row.Cours.id)
+    return _cours_details(rows)
 
 @router.get("/groupe/{groupe_id}", response_model=list[CoursWithDetails])
 def get_cours_by_groupe(
@@ -154,6 +172,11 @@ def update_cours(
     db_cours.heure_fin = cours.heure_fin
     db_cours.salle = cours.salle
     
+    # Replanifier les séances à venir avec le nouvel horaire
+    now = datetime.now()
+    unplan_seances(db, cours_id, now)
+    db.flush()
+    plan_seances(db, now, settings.SEANCE_HORIZON_DAYS, cours_ids=[cours_id])
     db.commit()
     db.refresh(db_cours)
     return db_cours
@@ -169,6 +192,7 @@ def delete_cours(
     if not db_cours:
         raise HTTPException(status_code=404, detail="Cours not found")
     
+    unplan_seances(db, cours_id, datetime.now())
     db.delete(db_cours)
     db.commit()
     return {"message": "Cours deleted"}
\ No newline at end of file
@@ -1,13 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Response
 from typing import Optional
-from sqlalchemy.orm import Session, joinedload
-from app.database import get_db
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session, defer
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_db, get_async_db, release_connection
 from app.models.enseignant import Enseignant
 from app.models.user import User, UserRole
 from app.models.cours import Cours  # Assure-toi que ce modèle existe
 from app.models.seance import Seance
 from app.models.groupe import Groupe
-from app.models.attendance import Attendance
+from app.models.filiere import Filiere
+from app.models.attendance_rollup import SeanceAttendanceRollup, CoursStudentAttendanceRollup
 from app.models.student import Student
 from app.models.notification import Notification
 from app.models.module import Module
@@ -18,14 +21,60 @@ from app.schemas.schedule import ScheduleResponse  # Tu l'as créé ?
 from app.schemas.seance import SeanceResponse  # On va le créer simplement
 from app.schemas.notification import NotificationResponse
 from app.utils.dependencies import require_role
+from app.utils.pagination import PageParams, paginate, ndjson_stream
 from app.services.embedding_extractor import extractor
-from app.services.presence_service import calculate_presence_percentage  # Existe maintenant
+from app.services.worker_pool import inference_pool
+from app.services.presence_service import student_payloads
+from app.services.response_cache import response_cache
+from app.services.user_cache import user_cache
 from datetime import datetime, date, timedelta
 from typing import Optional, List
 import os
 
 router = APIRouter(prefix="/enseignants", tags=["Enseignants"])
 
+
+def _group_sizes(db: Session, groupe_ids) -> dict[int, int]:
+    """Nombre d'étudiants par groupe, en une requête"""
+    groupe_ids = list(groupe_ids)
+    if not groupe_ids:
+        return {}
+    return dict(
+        db.query(Student.groupe_id, func.count(Student.id)).filter(
+            Student.groupe_id.in_(groupe_ids)
+        ).group_by(Student.groupe_id).all()
+    )
+
+
+def _held(now: datetime):
+    """
+    Séances commencées ou clôturées: celles planifiées à l'avance par
+    seance_scheduler (is_active=False jusqu'à leur début) n'ont pas encore
+    eu lieu et ne comptent ni dans les listes ni dans les taux.
+    """
+    return or_(Seance.date <= now, Seance.finalized_at.isnot(None))
+
+
+def _absents(finalized_at, absent, present, late, group_size: int) -> int:
+    """
+    Absents d'une séance: lus dans le rollup une fois la séance clôturée
+    (attendance_service.finalize_seance), sinon étudiants pas encore reconnus.
+    """
+    if finalized_at is not None:
+        return absent or 0
+    return max(0, group_size - (present or 0) - (late or 0))
+
+
+def _seance_counts(db: Session, seance_ids) -> dict[int, SeanceAttendanceRollup]:
+    """Rollups (present/late/absent) de plusieurs séances, en une requête"""
+    seance_ids = list(seance_ids)
+    if not seance_ids:
+        return {}
+    return {
+        counts.seance_id: counts
+        for counts in db.query(SeanceAttendanceRollup).filter(SeanceAttendanceRollup.seance_id.in_(seance_ids))
+    }
+
 @router.get("/pending", response_model=list[EnseignantResponse])
 def get_pending_enseignants(
     current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.SUPER_ADMIN])),
@@ -109,8 +158,10 @@ async def upload_enseignant_photo(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
+    release_connection(db)  # Pas de connexion gardée pendant l'inférence
+    
     image_bytes = await file.read()
-    embedding = extractor.extract_from_image(image_bytes)
+    embedding = await inference_pool.run(extractor.extract_from_image, image_bytes)
     
     if embedding is None:
         raise HTTPException(status_code=400, detail="No face detected")
@@ -147,6 +198,7 @@ def activate_enseignant(
         raise HTTPException(status_code=404, detail="Utilisateur introuvable")
 
     user.is_active = True
+    user_cache.invalidate_after_commit(db, user.id)
 
 
     db.commit()
@@ -169,78 +221,99 @@ def delete_enseignant(
     db.delete(enseignant)
     if user:
         db.delete(user)
+        user_cache.invalidate_after_commit(db, user.id)
     
     db.commit()
     return {"message": "Enseignant deleted"}
 
 # Nouveaux endpoints pour le dashboard enseignant
-@router.get("/dashboard")
+@router.get("/dashboard", response_model=TeacherDashboardResponse)
 async def get_teacher_dashboard(
     current_user: User = Depends(require_role([UserRole.ENSEIGNANT])),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
+    """Dashboard enseignant (mis en cache, voir services/response_cache.py)"""
+    # run_sync: le code ORM synchrone s'exécute sur la connexion async, sans bloquer la boucle
+    return await response_cache.get_or_compute_async(
+        "dashboard", current_user.id, lambda: db.run_sync(lambda session: _teacher_dashboard(current_user, session))
+    )
+
+
+def _teacher_dashboard(current_user: User, db: Session):
+    """
+    Dashboard enseignant en un nombre fixe de requêtes agrégées (indépendant
+    du nombre de cours, de séances et d'étudiants), assemblées en Python.
+    """
     enseignant = db.query(Enseignant).filter(Enseignant.user_id == current_user.id).first()
     if not enseignant:
         raise HTTPException(status_code=404, detail="Enseignant not found")
 
     today = date.today()
-    now = datetime.now()
     week_start = today - timedelta(days=today.weekday())
-    week_end = week_start + timedelta(days=6)
+    week_end = week_start + timedelta(days=7)
+    evolution_start = today - timedelta(days=4)
+    tomorrow = today + timedelta(days=1)
+    now = datetime.now()
 
-    # 1. Stats globales - Compter les séances (pas les cours)
-    seances_semaine = db.query(Seance).join(Cours).filter(
-        Cours.enseignant_id == enseignant.id,
-        Seance.date >= week_start,
-        Seance.date <= week_end
-    ).count()
-
-    seances_aujourdhui = db.query(Seance).join(Cours).filter(
-        Cours.enseignant_id == enseignant.id,
-        Seance.date == today
-    ).all()
-    cours_aujourdhui_count = len(set(s.cours_id for s in seances_aujourdhui))
+    # Cours de l'enseignant (enseignant_id référence users.id) avec module et groupe
+    cours_rows = db.query(Cours, Module, Groupe).outerjoin(
+        Module, Cours.module_id == Module.id
+    ).outerjoin(
+        Groupe, Cours.groupe_id == Groupe.id
+    ).filter(Cours.enseignant_id == current_user.id).order_by(Cours.id).all()
+    cours_by_id = {c.id: (c, module, groupe) for c, module, groupe in cours_rows}
+    cours_ids = list(cours_by_id)
+
+    group_sizes = _group_sizes(db, {c.groupe_id for c, _, _ in cours_rows})
 
-    # Total étudiants suivis (distinct via groupes)
-    groupes_ids = [gid for (gid,) in db.query(Cours.groupe_id).filter(Cours.enseignant_id == enseignant.id).distinct().all()]
-    total_etudiants = db.query(Student).filter(Student.groupe_id.in_(groupes_ids)).count() if groupes_ids else 0
+    # Séances de la semaine et des 5 derniers jours, avec leurs compteurs (rollups)
+    seance_rows = db.query(
+        Seance.id, Seance.cours_id, Seance.date, Seance.finalized_at,
+        SeanceAttendanceRollup.present, SeanceAttendanceRollup.late, SeanceAttendanceRollup.absent
+    ).outerjoin(
+        SeanceAttendanceRollup, SeanceAttendanceRollup.seance_id == Seance.id
+    ).filter(
+        Seance.cours_id.in_(cours_ids),
+        Seance.date >= min(week_start, evolution_start),
+        Seance.date < max(week_end, tomorrow),
+        _held(now)
+    ).all() if cours_ids else []
+
+    # Séances et présences cumulées par cours (pour les taux)
+    seances_par_cours = dict(
+        db.query(Seance.cours_id, func.count(Seance.id)).filter(
+            Seance.cours_id.in_(cours_ids), _held(now)
+        ).group_by(Seance.cours_id).all()
+    ) if cours_ids else {}
+    presents_par_cours = dict(
+        db.query(CoursStudentAttendanceRollup.cours_id, func.sum(CoursStudentAttendanceRollup.present)).filter(
+            CoursStudentAttendanceRollup.cours_id.in_(cours_ids)
+        ).group_by(CoursStudentAttendanceRollup.cours_id).all()
+    ) if cours_ids else {}
+
+    def module_infos(cours_id):
+        _, module, groupe = cours_by_id[cours_id]
+        return (module.nom if module else "N/A", module.annee if module else 0, groupe.code if groupe else "N/A")
+
+    # 1. Stats globales - Compter les séances (pas les cours)
+    seances_semaine = sum(1 for s in seance_rows if week_start <= s.date.date() < week_end)
+    seances_aujourdhui = [s for s in seance_rows if s.date.date() == today]
+    total_etudiants = sum(group_sizes.values())
 
     # 2. Cours du jour avec présence
+    today_by_cours = {}
+    for s in seances_aujourdhui:
+        today_by_cours.setdefault(s.cours_id, []).append(s)
+
     cours_aujourdhui_list = []
-    cours_ids_today = set(s.cours_id for s in seances_aujourdhui)
-    
-    for cours_id in cours_ids_today:
-        c = db.query(Cours).options(joinedload(Cours.module), joinedload(Cours.groupe)).filter(Cours.id == cours_id).first()
-        if not c:
-            continue
-            
-        seances_today = [s for s in seances_aujourdhui if s.cours_id == cours_id]
-        
-        total_presents = 0
-        total_retards = 0
-        total_absents = 0
-        total_inscrits = 0
-
-        # Calculer total étudiants du groupe
-        groupe = db.query(Groupe).filter(Groupe.id == c.groupe_id).first()
-        if groupe:
-            total_inscrits = db.query(Student).filter(Student.groupe_id == groupe.id).count()
-
-        for s in seances_today:
-            attendances = db.query(Attendance).filter(Attendance.seance_id == s.id).all()
-            total_presents += sum(1 for a in attendances if a.status.lower() == "present")
-            total_retards += sum(1 for a in attendances if a.status.lower() == "late")
-        
-        total_absents = max(0, total_inscrits - total_presents - total_retards)
+    for cours_id, seances_today in today_by_cours.items():
+        c = cours_by_id[cours_id][0]
+        total_inscrits = group_sizes.get(c.groupe_id, 0)
+        total_presents = sum(s.present or 0 for s in seances_today)
+        total_retards = sum(s.late or 0 for s in seances_today)
+        total_absents = sum(_absents(s.finalized_at, s.absent, s.present, s.late, total_inscrits) for s in seances_today)
+        module_nom, module_niveau, groupe_code = module_infos(cours_id)
 
-        # Obtenir module et groupe
-        module = db.query(Module).filter(Module.id == c.module_id).first()
-        groupe = db.query(Groupe).filter(Groupe.id == c.groupe_id).first()
-        
-        module_nom = module.nom if module else "N/A"
-        module_niveau = module.annee if module else 0
-        groupe_code = groupe.code if groupe else "N/A"
-        
         cours_aujourdhui_list.append({
             "id": c.id,
             "heure": f"{c.heure_debut.strftime('%H:%M')} - {c.heure_fin.strftime('%H:%M')}",
@@ -258,101 +331,63 @@ async def get_teacher_dashboard(
     evolution = []
     for i in range(4, -1, -1):
         day = today - timedelta(days=i)
-        day_seances = db.query(Seance).join(Cours).filter(
-            Cours.enseignant_id == enseignant.id,
-            Seance.date == day
-        ).all()
-        
-        if not day_seances:
-            evolution.append(0)
-            continue
-            
-        day_presents = 0
-        day_total = 0
-        
-        for ds in day_seances:
-            cours = db.query(Cours).filter(Cours.id == ds.cours_id).first()
-            if not cours:
-                continue
-                
-            # Compter étudiants du groupe
-            groupe = db.query(Groupe).filter(Groupe.id == cours.groupe_id).first()
-            if groupe:
-                groupe_students = db.query(Student).filter(Student.groupe_id == groupe.id).count()
-                day_total += groupe_students
-                
-            att = db.query(Attendance).filter(Attendance.seance_id == ds.id).all()
-            day_presents += sum(1 for a in att if a.status.lower() == "present")
-        
+        day_seances = [s for s in seance_rows if s.date.date() == day]
+        day_total = sum(group_sizes.get(cours_by_id[s.cours_id][0].groupe_id, 0) for s in day_seances)
+        day_presents = sum(s.present or 0 for s in day_seances)
         evolution.append(round((day_presents / day_total * 100) if day_total > 0 else 0, 1))
 
     # 4. Taux présence par cours (les 5 principaux)
-    cours_list = db.query(Cours).filter(Cours.enseignant_id == enseignant.id).limit(5).all()
     taux_par_cours = []
-    for c in cours_list:
-        module = db.query(Module).filter(Module.id == c.module_id).first()
-        groupe = db.query(Groupe).filter(Groupe.id == c.groupe_id).first()
-        
-        seances = db.query(Seance).filter(Seance.cours_id == c.id).all()
-        presents = 0
-        total = 0
-        
-        # Compter étudiants du groupe
-        if groupe:
-            groupe_students = db.query(Student).filter(Student.groupe_id == groupe.id).count()
-            total = groupe_students * len(seances) if seances else 0
-        
-        for s in seances:
-            att = db.query(Attendance).filter(Attendance.seance_id == s.id).all()
-            presents += sum(1 for a in att if a.status.lower() == "present")
-            
-        taux = round((presents / total * 100) if total > 0 else 0, 1)
-        module_nom = module.nom if module else "N/A"
-        module_niveau = module.annee if module else 0
-        groupe_code = groupe.code if groupe else "N/A"
-        
+    for c, _, _ in cours_rows[:5]:
+        total = group_sizes.get(c.groupe_id, 0) * seances_par_cours.get(c.id, 0)
+        presents = presents_par_cours.get(c.id) or 0
+        module_nom, module_niveau, groupe_code = module_infos(c.id)
         taux_par_cours.append({
             "cours": f"{module_nom} (L{module_niveau}-{groupe_code})",
-            "taux": taux
+            "taux": round((presents / total * 100) if total > 0 else 0, 1)
         })
 
-    # 5. Étudiants à risque (< 75% présence)
-    students = db.query(Student).options(joinedload(Student.user), joinedload(Student.groupe)).join(Cours, Student.groupe_id == Cours.groupe_id).filter(
-        Cours.enseignant_id == enseignant.id
-    ).distinct().limit(10).all()
-    
-    etudiants_risque = []
-    for s in students:
-        if not s.groupe_id:
-            continue
-            
-        # Compter séances pour cet étudiant via ses groupes
-        seances_count = db.query(Seance).join(Cours).filter(
-            Cours.enseignant_id == enseignant.id,
-            Cours.groupe_id == s.groupe_id
-        ).count()
-        
-        if seances_count == 0:
-            continue
-            
-        presents_count = db.query(Attendance).join(Seance).join(Cours).filter(
-            Cours.enseignant_id == enseignant.id,
-            Attendance.student_id == s.id,
-            Attendance.status.ilike("present")
-        ).count()
-        
-        taux = round((presents_count / seances_count * 100) if seances_count > 0 else 0, 1)
-        if taux < 75:
-            groupe = db.query(Groupe).filter(Groupe.id == s.groupe_id).first()
-            niveau_str = f"{groupe.annee}ème année" if groupe else "N/A"
-            
-            etudiants_risque.append({
-                "nom": s.user.full_name if s.user else "N/A",
-                "cours": "Multiples",
-                "niveau": niveau_str,
-                "absences": seances_count - presents_count,
-                "taux_presence": taux
-            })
+    # 5. Étudiants à risque (< 75% présence): compteurs par étudiant sur les cours de l'enseignant,
+    # absences comprises (écrites à la clôture des séances), filtrés et triés par la base
+    seances_count = (
+        func.sum(CoursStudentAttendanceRollup.present)
+        + func.sum(CoursStudentAttendanceRollup.late)
+        + func.sum(CoursStudentAttendanceRollup.absent)
+    )
+    presents_count = func.sum(CoursStudentAttendanceRollup.present)
+    at_risk = db.query(
+        CoursStudentAttendanceRollup.student_id,
+        User.full_name,
+        Groupe.annee,
+        presents_count.label("presents"),
+        func.sum(CoursStudentAttendanceRollup.absent).label("absences"),
+        seances_count.label("seances"),
+    ).join(
+        Student, Student.id == CoursStudentAttendanceRollup.student_id
+    ).outerjoin(
+        User, Student.user_id == User.id
+    ).outerjoin(
+        Groupe, Student.groupe_id == Groupe.id
+    ).filter(
+        CoursStudentAttendanceRollup.cours_id.in_(cours_ids)
+    ).group_by(
+        CoursStudentAttendanceRollup.student_id, User.full_name, Groupe.annee
+    ).having(
+        seances_count > 0, presents_count * 100 < seances_count * 75
+    ).order_by(
+        (presents_count * 1.0 / seances_count), CoursStudentAttendanceRollup.student_id
+    ).limit(5).all() if cours_ids else []
+
+    etudiants_risque = [
+        {
+            "nom": s.full_name or "N/A",
+            "cours": "Multiples",
+            "niveau": f"{s.annee}ème année",
+            "absences": s.absences,
+            "taux_presence": round(s.presents / s.seances * 100, 1)
+        }
+        for s in at_risk
+    ]
 
     # Taux moyen global
     taux_moyen = sum(t["taux"] for t in taux_par_cours) / len(taux_par_cours) if taux_par_cours else 0
@@ -360,14 +395,14 @@ async def get_teacher_dashboard(
     return {
         "stats": {
             "total_cours_semaine": seances_semaine,  # Frontend expects totalCoursSemaine
-            "cours_aujourdhui": cours_aujourdhui_count,  # Frontend expects coursAujourdhui
+            "cours_aujourdhui": len(today_by_cours),  # Frontend expects coursAujourdhui
             "total_etudiants": total_etudiants,  # Frontend expects totalEtudiantsSuivis
             "taux_presence_moyen": round(taux_moyen, 1)  # Frontend expects tauxPresenceMoyen
         },
         "cours_aujourdhui": cours_aujourdhui_list,
         "evolution_presence": evolution[::-1],  # Du lundi au vendredi
         "taux_presence_par_cours": taux_par_cours,
-        "etudiants_a_risque": etudiants_risque[:5]
+        "etudiants_a_risque": etudiants_risque
     }
     
 # 2. Emploi du temps filtré
@@ -419,94 +454,109 @@ async def get_teacher_schedule(
     return result
 
 # 3. Liste des étudiants (utilise TON StudentResponse)
+def _teacher_student_rows(db: Session, teacher_user_id: int, filiere: Optional[str], niveau: Optional[int], groupe: Optional[str]):
+    """(Student, User) des groupes où l'enseignant a cours (Cours.enseignant_id référence users.id)"""
+    query = db.query(Student, User).join(User, Student.user_id == User.id).join(
+        Groupe, Student.groupe_id == Groupe.id
+    ).options(defer(Student.embedding)).filter(
+        Groupe.id.in_(db.query(Cours.groupe_id).filter(Cours.enseignant_id == teacher_user_id))
+    )
+
+    if filiere:
+        query = query.join(Filiere, Groupe.filiere_id == Filiere.id).filter(
+            Filiere.nom.ilike(f"%{filiere}%") | Filiere.code.ilike(f"%{filiere}%")
+        )
+    if niveau:
+        query = query.filter(Groupe.annee == niveau)
+    if groupe:
+        query = query.filter(Groupe.code.ilike(f"%{groupe}%"))
+    return query
+
 @router.get("/students", response_model=list[StudentResponse])
-async def get_teacher_students(
+def get_teacher_students(
+    response: Response,
     filiere: Optional[str] = Query(None),
     niveau: Optional[int] = Query(None),
     groupe: Optional[str] = Query(None),
+    page: PageParams = Depends(),
     current_user: User = Depends(require_role([UserRole.ENSEIGNANT])),
     db: Session = Depends(get_db)
 ):
+    """Étudiants de l'enseignant, paginés par id ou en flux NDJSON (voir utils/pagination.py)"""
     enseignant = db.query(Enseignant).filter(Enseignant.user_id == current_user.id).first()
     if not enseignant:
         raise HTTPException(status_code=404, detail="Enseignant not found")
-    
-    # Ensure the user relationship is loaded to avoid None values
-    query = db.query(Student).options(joinedload(Student.user)).join(Cours).filter(Cours.enseignant_id == enseignant.id).distinct()
-    
-    if filiere:
-        query = query.filter(Student.filiere.ilike(f"%{filiere}%"))
-    if niveau:
-        query = query.filter(Student.niveau == niveau)
-    if groupe:
-        query = query.filter(Student.groupe.ilike(f"%{groupe}%"))
-    
-    students = query.all()
-    
-    # Ajoute presence_percentage dynamiquement (construit dicts pour éviter attributs sur None)
-    result = []
-    for s in students:
-        # Skip if user relationship is missing
-        if not getattr(s, "user", None):
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.warning("Orphan Student detected in /enseignants/students: student_id=%s user_id=%s", s.id, s.user_id)
-            continue
-        percentage = calculate_presence_percentage(s.id, db)
-        student_dict = {
-            "id": s.id,
-            "user_id": s.user_id,
-            "groupe_id": getattr(s, "groupe_id", None),
-            "photo_path": getattr(s, "photo_path", None),
-            "user": {
-                "id": s.user.id,
-                "email": s.user.email,
-                "full_name": s.user.full_name,
-                "is_active": s.user.is_active
-            },
-            "presence_percentage": percentage
-        }
-        result.append(StudentResponse(**student_dict))
-    
-    return result
+
+    def build_query(session: Session):
+        return _teacher_student_rows(session, current_user.id, filiere, niveau, groupe)
+
+    if page.stream:
+        return ndjson_stream(build_query, Student.id, lambda session, rows: student_payloads(rows, session), StudentResponse, page)
+    rows = paginate(build_query(db), Student.id, page, response, row_id=lambda row: row.Student.id)
+    return student_payloads(rows, db)
 
 # 4. Séances + séance en cours
 @router.get("/seances/current")
 async def get_current_seance(
     current_user: User = Depends(require_role([UserRole.ENSEIGNANT])),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
+    """Séance en cours de l'enseignant (mise en cache)"""
+    return await response_cache.get_or_compute_async(
+        "seances/current", current_user.id, lambda: db.run_sync(lambda session: _current_seance(current_user, session))
+    )
+
+
+def _current_seance(current_user: User, db: Session):
     now = datetime.now()
     enseignant = db.query(Enseignant).filter(Enseignant.user_id == current_user.id).first()
     if not enseignant:
         raise HTTPException(status_code=404, detail="Enseignant not found")
     
-    current = db.query(Seance).join(Cours).filter(
-        Cours.enseignant_id == enseignant.id,
-        Seance.date == now.date(),
+    # Séance du jour (créée à l'avance par le planificateur); Cours.enseignant_id référence users.id
+    today = datetime.combine(now.date(), datetime.min.time())
+    row = db.query(Seance, Cours, Module, Groupe, Filiere).join(
+        Cours, Seance.cours_id == Cours.id
+    ).outerjoin(Module, Cours.module_id == Module.id).outerjoin(
+        Groupe, Cours.groupe_id == Groupe.id
+    ).outerjoin(
+        Filiere, Module.filiere_id == Filiere.id
+    ).filter(
+        Cours.enseignant_id == current_user.id,
+        Seance.date >= today,
+        Seance.date < today + timedelta(days=1),
         Seance.heure_debut <= now.time(),
         Seance.heure_fin >= now.time()
     ).first()
     
-    if not current:
+    if not row:
         return None
-    
-    attendances = db.query(Attendance).filter(Attendance.seance_id == current.id).all()
-    presents = len([a for a in attendances if a.status.lower() == "present"])
-    retards = len([a for a in attendances if a.status.lower() == "late"])
-    
-    # Calculate total students from groupe
-    cours = db.query(Cours).filter(Cours.id == current.cours_id).first()
-    total_etudiants = 0
-    if cours:
-        groupe = db.query(Groupe).filter(Groupe.id == cours.groupe_id).first()
-        if groupe:
-            total_etudiants = db.query(Student).filter(Student.groupe_id == groupe.id).count()
-    
-    absents = max(0, total_etudiants - presents - retards)
+    current, cours, module, groupe, filiere = row
+    
+    # Compteurs de la séance (rollup) et taille du groupe
+    counts = _seance_counts(db, [current.id]).get(current.id)
+    presents = counts.present if counts else 0
+    retards = counts.late if counts else 0
+    total_etudiants = _group_sizes(db, [groupe.id]).get(groupe.id, 0) if groupe else 0
+    absents = _absents(current.finalized_at, counts.absent if counts else 0, presents, retards, total_etudiants)
+    
+    # SeanceResponse décrit la séance vue par l'enseignant (module, salle, groupe): construite champ par champ
+    seance = SeanceResponse(
+        id=current.id,
+        cours_id=current.cours_id,
+        date=current.date.date(),
+        debut=current.heure_debut,
+        fin=current.heure_fin,
+        module=module.nom if module else "N/A",
+        salle=cours.salle or "",
+        filiere=filiere.code if filiere else None,
+        niveau=module.annee if module else None,
+        groupe=groupe.code if groupe else None,
+        total_etudiants=total_etudiants
+    )
     
     return {
-        "seance": SeanceResponse.from_orm(current),
+        "seance": seance,
         "presents": presents,
         "retards": retards,
         "absents": absents
@@ -529,34 +579,39 @@ async def get_notifications(
 @router.get("/seances")
 async def get_teacher_seances(
     current_user: User = Depends(require_role([UserRole.ENSEIGNANT])),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Liste de toutes les séances d'un enseignant"""
-    cours_list = db.query(Cours).filter(Cours.enseignant_id == current_user.id).all()
-    cours_ids = [c.id for c in cours_list]
-    
-    seances = db.query(Seance).filter(Seance.cours_id.in_(cours_ids)).order_by(Seance.date.desc(), Seance.heure_debut.desc()).all()
+    return await db.run_sync(lambda session: _teacher_seances(current_user, session))
+
+
+def _teacher_seances(current_user: User, db: Session):
+    rows = db.query(Seance, Cours, Module, Groupe, SeanceAttendanceRollup).join(
+        Cours, Seance.cours_id == Cours.id
+    ).outerjoin(Module, Cours.module_id == Module.id).outerjoin(
+        Groupe, Cours.groupe_id == Groupe.id
+    ).outerjoin(
+        SeanceAttendanceRollup, SeanceAttendanceRollup.seance_id == Seance.id
+    ).filter(
+        Cours.enseignant_id == current_user.id, _held(datetime.now())
+    ).order_by(Seance.date.desc(), Seance.heure_debut.desc()).all()
+    
+    # Total étudiants par groupe (une requête pour tous les groupes)
+    group_sizes = _group_sizes(db, {groupe.id for _, _, _, groupe, _ in rows if groupe})
     
     result = []
-    for seance in seances:
-        cours = db.query(Cours).filter(Cours.id == seance.cours_id).first()
-        if not cours:
-            continue
-        
-        module = db.query(Module).filter(Module.id == cours.module_id).first()
-        groupe = db.query(Groupe).filter(Groupe.id == cours.groupe_id).first()
-        
-        # Compter les présences
-        attendances = db.query(Attendance).filter(Attendance.seance_id == seance.id).all()
-        presents = sum(1 for a in attendances if a.status.lower() == "present")
-        retards = sum(1 for a in attendances if a.status.lower() == "late")
-        
-        # Total étudiants du groupe
-        total_etudiants = 0
-        if groupe:
-            total_etudiants = db.query(Student).filter(Student.groupe_id == groupe.id).count()
-        
-        absents = max(0, total_etudiants - presents - retards)
+    for seance, cours, module, groupe, counts in rows:
+        # Compter les présences (rollup de la séance)
+        presents = counts.present if counts else 0
+        retards = counts.late if counts else 0
+        
+        if seance.finalized_at is not None:
+            # Séance clôturée: effectif du groupe à la clôture, absences lues dans le rollup
+            absents = counts.absent if counts else 0
+            total_etudiants = presents + retards + absents
+        else:
+            total_etudiants = group_sizes.get(groupe.id, 0) if groupe else 0
+            absents = _absents(None, 0, presents, retards, total_etudiants)
         
         result.append({
             "id": seance.id,
@@ -579,41 +634,52 @@ async def get_teacher_seances(
 @router.get("/cours")
 async def get_teacher_cours(
     current_user: User = Depends(require_role([UserRole.ENSEIGNANT])),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
+    """Liste des cours d'un enseignant avec statistiques (mise en cache)"""
+    return await response_cache.get_or_compute_async(
+        "cours", current_user.id, lambda: db.run_sync(lambda session: _teacher_cours(current_user, session))
+    )
+
+
+def _teacher_cours(current_user: User, db: Session):
     """Liste des cours d'un enseignant avec statistiques"""
     # Récupérer tous les cours de l'enseignant (enseignant_id référence users.id)
-    cours_list = db.query(Cours).filter(Cours.enseignant_id == current_user.id).all()
+    rows = db.query(Cours, Module, Groupe, Filiere).join(
+        Module, Cours.module_id == Module.id
+    ).join(
+        Groupe, Cours.groupe_id == Groupe.id
+    ).outerjoin(
+        Filiere, Module.filiere_id == Filiere.id
+    ).filter(Cours.enseignant_id == current_user.id).all()
+    cours_ids = [cours.id for cours, _, _, _ in rows]
+    
+    group_sizes = _group_sizes(db, {groupe.id for _, _, groupe, _ in rows})
+    seances_par_cours = dict(
+        db.query(Seance.cours_id, func.count(Seance.id)).filter(
+            Seance.cours_id.in_(cours_ids), _held(datetime.now())
+        ).group_by(Seance.cours_id).all()
+    ) if cours_ids else {}
+    # Présences par cours: somme des rollups cours × étudiant
+    presents_par_cours = dict(
+        db.query(CoursStudentAttendanceRollup.cours_id, func.sum(CoursStudentAttendanceRollup.present)).filter(
+            CoursStudentAttendanceRollup.cours_id.in_(cours_ids)
+        ).group_by(CoursStudentAttendanceRollup.cours_id).all()
+    ) if cours_ids else {}
     
     result = []
-    for cours in cours_list:
-        module = db.query(Module).filter(Module.id == cours.module_id).first()
-        groupe = db.query(Groupe).filter(Groupe.id == cours.groupe_id).first()
-        
-        if not module or not groupe:
-            continue
-        
-        # Obtenir la filière
-        from app.models.filiere import Filiere
-        filiere = db.query(Filiere).filter(Filiere.id == module.filiere_id).first()
+    for cours, module, groupe, filiere in rows:
         filiere_code = filiere.code if filiere else "N/A"
         
         # Compter les étudiants du groupe
-        nb_etudiants = db.query(Student).filter(Student.groupe_id == groupe.id).count()
+        nb_etudiants = group_sizes.get(groupe.id, 0)
         
         # Compter les séances pour ce cours
-        seances = db.query(Seance).filter(Seance.cours_id == cours.id).all()
-        nb_seances = len(seances)
-        
-        # Calculer le taux de présence
-        total_presents = 0
-        total_possible = 0
+        nb_seances = seances_par_cours.get(cours.id, 0)
         
-        for seance in seances:
-            attendances = db.query(Attendance).filter(Attendance.seance_id == seance.id).all()
-            presents = sum(1 for a in attendances if a.status.lower() == "present")
-            total_presents += presents
-            total_possible += nb_etudiants  # Chaque séance devrait avoir nb_etudiants présents max
+        # Calculer le taux de présence (chaque séance devrait avoir nb_etudiants présents max)
+        total_presents = presents_par_cours.get(cours.id) or 0
+        total_possible = nb_etudiants * nb_seances
         
         taux_presence = round((total_presents / total_possible * 100) if total_possible > 0 else 0, 1)
         
@@ -0,0 +1,73 @@
+import asyncio
+import json
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select
+from app.database import AsyncSessionLocal
+from app.models.attendance import Attendance
+from app.models.seance import Seance
+from app.schemas.attendance import AttendanceResponse
+from app.services.attendance_events import attendance_broker
+from app.utils.dependencies import authorize_seance_socket
+
+router = APIRouter(prefix="/events", tags=["Events"])
+
+
+async def _snapshot(seance_id: int) -> str:
+    """État initial envoyé à la connexion; les événements suivants portent l'id des présences (dédoublonnage côté client)"""
+    async with AsyncSessionLocal() as db:
+        seance = await db.get(Seance, seance_id)
+        attendances = (await db.execute(
+            select(Attendance).where(Attendance.seance_id == seance_id).order_by(Attendance.id)
+        )).scalars().all()
+        return json.dumps(jsonable_encoder({
+            "type": "snapshot",
+            "seance_id": seance_id,
+            "is_active": seance.is_active,
+            "finalized": seance.finalized_at is not None,
+            "attendances": [AttendanceResponse.model_validate(attendance) for attendance in attendances],
+        }))
+
+
+@router.websocket("/seances/{seance_id}")
+async def seance_events(websocket: WebSocket, seance_id: int, token: str = Query(...)):
+    """
+    Présences d'une séance en direct: un message "snapshot" à la connexion,
+    puis un message par événement ("attendance", "finalized", "lagged" si
+    la connexion n'a pas suivi et doit se resynchroniser). Jeton d'accès en
+    paramètre `token` (voir authorize_seance_socket).
+    """
+    try:
+        await authorize_seance_socket(token, seance_id)
+    except HTTPException as exc:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=str(exc.detail))
+        return
+
+    await websocket.accept()
+    # Abonné avant la lecture de l'état initial: aucun événement n'est perdu entre les deux
+    subscription = attendance_broker.subscribe(seance_id)
+    try:
+        await websocket.send_text(await _snapshot(seance_id))
+
+        async def forward():
+            while True:
+                await websocket.send_text(await subscription.get())
+
+        async def drain():
+            # Les messages du client sont ignorés; receive() rend la main à la déconnexion
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    return
+
+        tasks = [asyncio.create_task(forward()), asyncio.create_task(drain())]
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        for task in done:
+            if not task.cancelled() and task.exception() and not isinstance(task.exception(), WebSocketDisconnect):
+                raise task.exception()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        attendance_broker.unsubscribe(subscription)
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends
+from app.models.user import User, UserRole
+from app.utils.dependencies import require_role
+from app.services.worker_pool import inference_pool, auth_pool
+from app.services.embedding_index import embedding_index
+from app.services.embedding_extractor import extractor
+from app.services.response_cache import response_cache
+from app.services.user_cache import user_cache
+from app.services.seance_scheduler import seance_scheduler
+from app.services.attendance_events import attendance_broker
+from app.services.recognition_cache import recognition_cache
+from app.database import async_engine, pool_metrics
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+@router.get("/")
+def get_metrics(
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.SUPER_ADMIN]))
+):
+    """Métriques internes (file d'inférence, ...)"""
+    return {
+        "inference_pool": inference_pool.metrics(),
+        "auth_pool": auth_pool.metrics(),
+        "models_loaded": extractor.loaded,
+        "facenet_batcher": extractor.batcher.metrics(),
+        "response_cache": response_cache.metrics(),
+        "user_cache": user_cache.metrics(),
+        "seance_scheduler": seance_scheduler.metrics(),
+        "attendance_events": attendance_broker.metrics(),
+        "recognition_cache": recognition_cache.metrics(),
+        "db_pool": pool_metrics(),
+        "db_pool_async": pool_metrics(async_engine),
+        "embedding_index": {
+            "students": embedding_index.student_count(),
+            "templates": len(embedding_index),
+            "backend": embedding_index.backend()
+        }
+    }
@@ -1,15 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_db, get_async_db, AsyncSessionLocal
 from app.models.attendance import Attendance, AttendanceStatus
 from app.models.seance import Seance
 from app.models.student import Student
-from app.models.student_embedding import StudentEmbedding
 from app.models.user import User, UserRole
-from app.schemas.attendance import AttendanceResponse
-from app.utils.dependencies import require_role
+from app.schemas.attendance import AttendanceResponse, FrameRecognitionResponse
+from app.utils.dependencies import require_role, authorize_seance_socket
 from app.services.embedding_extractor import extractor
-import numpy as np
+from app.services.worker_pool import inference_pool, PoolSaturated
+from app.services.frame_stream import FaceTracker, AdaptiveRate, LatestFrame, analyse_frame
+from app.services.embedding_index import embedding_index
+from app.services.templates import add_templates, sync_index
+from app.services.attendance_service import record_attendance, record_attendances
+from app.services.recognition_cache import recognition_cache, SeanceRecognitionState, seance_state, active_seance
+from app.config import settings
+import asyncio
+import json
+import time as clock
 import traceback
 from datetime import datetime, time, timedelta
 
@@ -107,10 +118,30 @@ def calculate_attendance_status(seance: Seance) -> dict:
         }
 
 
+async def _seance_state(db: AsyncSession, seance_id: int) -> SeanceRecognitionState:
+    return await db.run_sync(lambda session: seance_state(session, seance_id))
+
+
+async def _active_seance(db: AsyncSession, seance_id: int) -> Seance | None:
+    return await db.run_sync(lambda session: active_seance(session, seance_id))
+
+
+async def _learn_marked(db: AsyncSession, state: SeanceRecognitionState, student_ids) -> dict[int, str]:
+    """Statuts des étudiants marqués ailleurs (conflit d'insertion), retenus dans l'état de la séance"""
+    existing = dict((await db.execute(
+        select(Attendance.student_id, Attendance.status).where(
+            Attendance.seance_id == state.id,
+            Attendance.student_id.in_(list(student_ids))
+        )
+    )).all())
+    for student_id, existing_status in existing.items():
+        state.mark(student_id, existing_status)
+    return existing
+
+
 @router.post("/detect-face")
 async def detect_face(
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    file: UploadFile = File(...)
 ):
     """
     Endpoint simplifié pour détecter et reconnaître un visage
@@ -124,7 +155,7 @@ async def detect_face(
         
         print(f"📦 Received image: {len(image_bytes)} bytes")
         
-        embedding = extractor.extract_from_image(image_bytes)
+        embedding = await inference_pool.run(extractor.extract_from_image, image_bytes)
         
         if embedding is None:
             return {
@@ -133,47 +164,23 @@ async def detect_face(
         
         print(f"✅ Embedding extracted: shape {embedding.shape}")
         
-        from sqlalchemy.orm import joinedload
-        students = db.query(Student).options(joinedload(Student.user)).all()
-        
-        if not students:
+        if len(embedding_index) == 0:
             return {
                 "error": "No students in database"
             }
         
-        print(f"🔍 Comparing with {len(students)} students")
-        
-        best_match = None
-        min_distance = float('inf')
-        
-        for student in students:
-            if student.embedding:
-                try:
-                    stored_emb = np.frombuffer(student.embedding, dtype=np.float32)
-                    
-                    if stored_emb.shape != embedding.shape:
-                        print(f"⚠️ Shape mismatch for student {student.id}: {stored_emb.shape} vs {embedding.shape}")
-                        continue
-                    
-                    distance = np.linalg.norm(embedding - stored_emb)
-                    
-                    print(f"  Student {student.id}: distance = {distance:.3f}")
-                    
-                    if distance < min_distance:
-                        min_distance = distance
-                        best_match = student
-                except Exception as e:
-                    print(f"⚠️ Error comparing with student {student.id}: {e}")
-                    continue
-        
-        if best_match is None:
+        print(f"🔍 Comparing with {embedding_index.student_count()} students ({len(embedding_index)} templates)")
+        
+        student_id, min_distance = embedding_index.match(embedding)
+        
+        if student_id is None:
             return {
                 "error": "No valid embeddings found in database"
             }
         
-        threshold = 0.9
+        threshold = settings.RECOGNITION_THRESHOLD
         
-        print(f"🎯 Best match: Student {best_match.id}, distance = {min_distance:.3f}")
+        print(f"🎯 Best match: Student {student_id}, distance = {min_distance:.3f}")
         
         if min_distance > threshold:
             return {
@@ -182,11 +189,9 @@ async def detect_face(
         
         confidence = max(0.0, 1 - (min_distance / threshold))
         
-        student_name = get_student_name(best_match, db)
-        
         return {
-            "student_id": best_match.id,
-            "student_name": student_name,
+            "student_id": student_id,
+            "student_name": embedding_index.name_of(student_id),
             "confidence": float(confidence),
             "distance": float(min_distance),
             "threshold": threshold
@@ -205,21 +210,16 @@ async def recognize_student(
     seance_id: int,
     file: UploadFile = File(...),
     current_user: User = Depends(require_role([UserRole.ENSEIGNANT, UserRole.ADMIN, UserRole.SUPER_ADMIN])),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Endpoint complet pour reconnaître et enregistrer la présence avec logique temporelle
     """
     try:
-        seance = db.query(Seance).filter(Seance.id == seance_id).first()
-        if not seance:
-            raise HTTPException(status_code=404, detail="Séance not found")
-        
-        if not seance.is_active:
-            raise HTTPException(status_code=400, detail="Cette séance est terminée")
+        state = await _seance_state(db, seance_id)
         
         # VÉRIFIER L'HEURE ET LE STATUT
-        status_info = calculate_attendance_status(seance)
+        status_info = calculate_attendance_status(state)
         
         if not status_info["can_detect"]:
             raise HTTPException(
@@ -227,74 +227,60 @@ async def recognize_student(
                 detail=status_info["message"]
             )
         
+        await db.commit()  # Pas de connexion gardée pendant l'inférence (les objets ne sont pas expirés)
+        
         # Extraire embedding
         image_bytes = await file.read()
-        embedding = extractor.extract_from_image(image_bytes)
+        embedding = await inference_pool.run(extractor.extract_from_image, image_bytes)
         if embedding is None:
             raise HTTPException(status_code=400, detail="No face detected")
         
-        # Comparer avec tous les étudiants
-        from sqlalchemy.orm import joinedload
-        students = db.query(Student).options(joinedload(Student.user)).all()
-        
-        best_match = None
-        min_distance = float('inf')
-        
-        for student in students:
-            if student.embedding:
-                try:
-                    stored_emb = np.frombuffer(student.embedding, dtype=np.float32)
-                    
-                    if stored_emb.shape != embedding.shape:
-                        continue
-                    
-                    distance = np.linalg.norm(embedding - stored_emb)
-                    
-                    if distance < min_distance:
-                        min_distance = distance
-                        best_match = student
-                except Exception as e:
-                    print(f"Error comparing with student {student.id}: {e}")
-                    continue
-        
-        if min_distance > 0.9:
+        # Comparer avec les étudiants du groupe de la séance (sauf sonde récente du même visage)
+        student_id, min_distance = recognition_cache.match(
+            state, embedding, lambda probe: embedding_index.match(probe, groupe_id=state.groupe_id)
+        )
+        
+        if student_id is None or min_distance > settings.RECOGNITION_THRESHOLD:
             raise HTTPException(status_code=404, detail="Student not recognized")
         
+        # Déjà marqué(e) dans ce processus: réponse sans toucher la base
+        existing = recognition_cache.already_marked(state, student_id)
+        if existing is not None:
+            raise HTTPException(
+                status_code=400, 
+                detail=f"Déjà marqué(e) comme {existing}"
+            )
+        
         confidence = 1 - min_distance
         
-        # Vérifier si déjà présent
-        existing = db.query(Attendance).filter(
-            Attendance.seance_id == seance_id,
-            Attendance.student_id == best_match.id
-        ).first()
+        seance = await _active_seance(db, seance_id)
+        if seance is None:
+            raise HTTPException(status_code=400, detail="Cette séance est terminée")
+        
+        # Enregistrer présence AVEC LE STATUT (et les rollups dans la même transaction).
+        # L'unicité (séance, étudiant) est garantie par la base: None si déjà présent.
+        attendance = await db.run_sync(
+            lambda session: record_attendance(session, seance, student_id, confidence, status_info["status"])
+        )
         
-        if existing:
+        if attendance is None:
+            existing = (await _learn_marked(db, state, [student_id])).get(student_id)
             raise HTTPException(
                 status_code=400, 
-                detail=f"Déjà marqué(e) comme {existing.status}"
+                detail=f"Déjà marqué(e) comme {existing}"
             )
         
-        # Enregistrer présence AVEC LE STATUT
-        attendance = Attendance(
-            seance_id=seance_id,
-            student_id=best_match.id,
-            confidence=float(confidence),
-            status=status_info["status"]
-        )
-        db.add(attendance)
-        
-        # Sauvegarder embedding pour apprentissage
-        new_emb = StudentEmbedding(
-            student_id=best_match.id,
-            embedding=embedding.tobytes(),
-            is_verified=False
-        )
-        db.add(new_emb)
+        # Sauvegarder embedding pour apprentissage (template récent, si assez fiable)
+        learned = ([], [])
+        if confidence >= settings.TEMPLATE_MIN_CONFIDENCE:
+            learned = await db.run_sync(
+                lambda session: add_templates(session, [(student_id, embedding)], is_verified=False)
+            )
         
-        db.commit()
-        db.refresh(attendance)
+        await db.commit()
+        sync_index(*learned)
         
-        print(f"✅ Attendance recorded: Student {best_match.id} - Status: {status_info['status']}")
+        print(f"✅ Attendance recorded: Student {student_id} - Status: {status_info['status']}")
         
         return attendance
     
@@ -306,6 +292,260 @@ async def recognize_student(
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
 
 
+@router.post("/seance/{seance_id}/frame", response_model=FrameRecognitionResponse)
+async def recognize_frame(
+    seance_id: int,
+    file: UploadFile = File(...),
+    current_user: User = Depends(require_role([UserRole.ENSEIGNANT, UserRole.ADMIN, UserRole.SUPER_ADMIN])),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Reconnaissance de tous les visages d'une image de classe en un seul appel.
+    Les présences sont enregistrées en une seule transaction.
+    """
+    try:
+        state = await _seance_state(db, seance_id)
+        
+        status_info = calculate_attendance_status(state)
+        
+        if not status_info["can_detect"]:
+            raise HTTPException(
+                status_code=400, 
+                detail=status_info["message"]
+            )
+        
+        await db.commit()  # Pas de connexion gardée pendant l'inférence (les objets ne sont pas expirés)
+        
+        image_bytes = await file.read()
+        embeddings = await inference_pool.run(extractor.extract_all_from_image, image_bytes)
+        if embeddings is None:
+            raise HTTPException(status_code=400, detail="Invalid image")
+        
+        matches = recognition_cache.match_many(
+            state, embeddings, lambda probes: embedding_index.match_many(probes, groupe_id=state.groupe_id)
+        )
+        
+        # Meilleur visage par étudiant (un même étudiant peut matcher deux visages)
+        best_by_student = {}
+        unrecognized = 0
+        for row, (student_id, distance) in enumerate(matches):
+            if student_id is None or distance > settings.RECOGNITION_THRESHOLD:
+                unrecognized += 1
+                continue
+            if student_id not in best_by_student or distance < best_by_student[student_id][0]:
+                best_by_student[student_id] = (distance, row)
+        
+        # Les étudiants déjà marqués connus de l'état de la séance ne vont pas jusqu'à la base
+        already_marked = {
+            student_id for student_id in best_by_student if recognition_cache.already_marked(state, student_id)
+        }
+        to_record = {
+            student_id: match for student_id, match in best_by_student.items() if student_id not in already_marked
+        }
+        
+        recognized = []
+        if to_record:
+            seance = await _active_seance(db, seance_id)
+            if seance is None:
+                raise HTTPException(status_code=400, detail="Cette séance est terminée")
+            # INSERT ... ON CONFLICT DO NOTHING: les étudiants déjà marqués sont simplement ignorés
+            entries = [
+                (student_id, 1 - distance, status_info["status"]) for student_id, (distance, _) in to_record.items()
+            ]
+            recognized = await db.run_sync(lambda session: record_attendances(session, seance, entries))
+        new_ids = {attendance.student_id for attendance in recognized}
+        conflicts = set(to_record) - new_ids
+        if conflicts:
+            await _learn_marked(db, state, conflicts)
+        already_marked |= conflicts
+        
+        if recognized:
+            to_learn = [
+                (student_id, embeddings[row]) for student_id, (distance, row) in best_by_student.items()
+                if student_id in new_ids and 1 - distance >= settings.TEMPLATE_MIN_CONFIDENCE
+            ]
+            learned = await db.run_sync(lambda session: add_templates(session, to_learn, is_verified=False))
+            await db.commit()
+            sync_index(*learned)
+        
+        print(f"✅ Frame: {len(matches)} faces, {len(recognized)} new attendances, {len(already_marked)} already marked")
+        
+        return {
+            "faces_detected": len(matches),
+            "recognized": recognized,
+            "already_marked": sorted(already_marked),
+            "unrecognized": unrecognized
+        }
+    
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        print(f"Error in recognize_frame: {e}")
+        print(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
+
+
+async def _record_stream_matches(seance_id: int, groupe_id, tracks, to_recognize, embeddings, status):
+    """
+    Matching des visages nouveaux d'un frame du flux, puis présences et
+    templates comme recognize_frame (la base n'est touchée que s'il reste
+    des étudiants pas encore marqués). Les pistes reconnues gardent leur
+    étudiant (plus de FaceNet pour elles). Retourne (présences créées,
+    déjà marqués), ou None si la séance a été terminée entre-temps.
+    """
+    async with AsyncSessionLocal() as db:
+        try:
+            state = await _seance_state(db, seance_id)
+        except HTTPException:
+            return None
+        await db.commit()
+
+        matches = recognition_cache.match_many(
+            state, embeddings, lambda probes: embedding_index.match_many(probes, groupe_id=groupe_id)
+        )
+        best_by_student = {}
+        for row, (student_id, distance) in enumerate(matches):
+            if student_id is None or distance > settings.RECOGNITION_THRESHOLD:
+                continue
+            tracks[to_recognize[row]].student_id = student_id
+            if student_id not in best_by_student or distance < best_by_student[student_id][0]:
+                best_by_student[student_id] = (distance, row)
+        already_marked = {
+            student_id for student_id in best_by_student if recognition_cache.already_marked(state, student_id)
+        }
+        to_record = {
+            student_id: match for student_id, match in best_by_student.items() if student_id not in already_marked
+        }
+        if not to_record:
+            return [], already_marked
+
+        seance = await _active_seance(db, seance_id)
+        if seance is None:
+            return None
+        entries = [(student_id, 1 - distance, status) for student_id, (distance, _) in to_record.items()]
+        recognized = await db.run_sync(lambda session: record_attendances(session, seance, entries))
+        new_ids = {attendance.student_id for attendance in recognized}
+        conflicts = set(to_record) - new_ids
+        if conflicts:
+            await _learn_marked(db, state, conflicts)
+        learned = ([], [])
+        if recognized:
+            to_learn = [
+                (student_id, embeddings[row]) for student_id, (distance, row) in to_record.items()
+                if student_id in new_ids and 1 - distance >= settings.TEMPLATE_MIN_CONFIDENCE
+            ]
+            learned = await db.run_sync(lambda session: add_templates(session, to_learn, is_verified=False))
+        await db.commit()
+    sync_index(*learned)
+    return recognized, already_marked | conflicts
+
+
+@router.websocket("/seance/{seance_id}/stream")
+async def stream_frames(websocket: WebSocket, seance_id: int, token: str = Query(...)):
+    """
+    Flux continu d'une caméra de salle: le client envoie des frames JPEG
+    (messages binaires) sur une seule connexion, jeton en paramètre `token`.
+    Seul le frame le plus récent est traité (les frames arrivés pendant un
+    traitement sont jetés), la détection suit un rythme adaptatif
+    (AdaptiveRate) et FaceNet ne tourne que sur les visages nouveaux ou
+    déplacés (FaceTracker). Chaque frame traité renvoie un message "frame"
+    (visages suivis, nouvelles présences); "closed" à la fin du créneau.
+    """
+    try:
+        seance = await authorize_seance_socket(token, seance_id)
+        if not seance.is_active:
+            raise HTTPException(status_code=400, detail="Cette séance est terminée")
+    except HTTPException as exc:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=str(exc.detail))
+        return
+
+    await websocket.accept()
+    groupe_id = seance.cours.groupe_id
+    latest = LatestFrame()
+    tracker = FaceTracker(settings.STREAM_TRACK_IOU, settings.STREAM_CHANGE_IOU, settings.STREAM_TRACK_MAX_MISSED)
+    rate = AdaptiveRate(settings.STREAM_MIN_DETECT_INTERVAL_MS / 1000, settings.STREAM_MAX_DETECT_INTERVAL_MS / 1000)
+
+    async def send(payload: dict):
+        await websocket.send_text(json.dumps(jsonable_encoder(payload)))
+
+    async def receive():
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            frame = message.get("bytes")
+            if frame and len(frame) <= settings.STREAM_MAX_FRAME_BYTES:
+                latest.put(frame)
+
+    async def process():
+        while True:
+            frame = await latest.take()
+            status_info = calculate_attendance_status(seance)
+            if not status_info["can_detect"]:
+                await send({"type": "closed", "detail": status_info["message"]})
+                return
+
+            started = clock.perf_counter()
+            try:
+                analysed = await inference_pool.run(analyse_frame, frame, tracker)
+            except PoolSaturated:
+                # Pool saturé: ce frame est jeté, on ralentit
+                await asyncio.sleep(rate.update(rate.max_interval, busy=False))
+                continue
+            if analysed is None:
+                await send({"type": "error", "detail": "Invalid image"})
+                continue
+
+            tracks, to_recognize, embeddings = analysed
+            recorded = ([], set())
+            if to_recognize:
+                recorded = await _record_stream_matches(
+                    seance_id, groupe_id, tracks, to_recognize, embeddings, status_info["status"]
+                )
+                if recorded is None:
+                    await send({"type": "closed", "detail": "Cette séance est terminée"})
+                    return
+
+            processing = clock.perf_counter() - started
+            interval = rate.update(processing, busy=bool(to_recognize))
+            await send({
+                "type": "frame",
+                "faces": [
+                    {
+                        "track": track.id,
+                        "box": list(track.box),
+                        "student_id": track.student_id,
+                        "name": embedding_index.name_of(track.student_id) if track.student_id else None
+                    }
+                    for track in tracks
+                ],
+                "recognized": [AttendanceResponse.model_validate(attendance) for attendance in recorded[0]],
+                "already_marked": sorted(recorded[1]),
+                "embedded": len(to_recognize),
+                "received_frames": latest.received,
+                "dropped_frames": latest.dropped,
+                "processing_ms": round(processing * 1000, 1),
+                "next_interval_ms": round(interval * 1000)
+            })
+            await asyncio.sleep(max(0.0, interval - processing))
+
+    tasks = [asyncio.create_task(receive()), asyncio.create_task(process())]
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        for task in done:
+            if task.exception() and not isinstance(task.exception(), WebSocketDisconnect):
+                print(f"Error in stream_frames: {task.exception()}")
+        if tasks[1] in done and tasks[1].exception() is None:
+            await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
 @router.get("/seance/{seance_id}/status")
 def get_seance_detection_status(
     seance_id: int,
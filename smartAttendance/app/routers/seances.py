@@ -1,15 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
+from datetime import date, datetime, time, timedelta
 from app.database import get_db
 from app.models.seance import Seance
 from app.models.cours import Cours
 from app.models.user import User, UserRole
-from app.schemas.seance import SeanceResponse
+from app.schemas.seance import SeanceResponse, SeanceState
 from app.utils.dependencies import require_role
+from app.services.response_cache import response_cache
+from app.services.attendance_service import finalize_seance
 
 router = APIRouter(prefix="/seances", tags=["Séances"])
 
-@router.post("/start/{cours_id}", response_model=SeanceResponse)
+@router.post("/start/{cours_id}", response_model=SeanceState)
 def start_seance(
     cours_id: int,
     current_user: User = Depends(require_role([UserRole.ENSEIGNANT, UserRole.ADMIN, UserRole.SUPER_ADMIN])),
@@ -22,13 +25,27 @@ def start_seance(
     if current_user.role == UserRole.ENSEIGNANT and cours.enseignant_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not your course")
     
-    # Créer séance avec les heures du cours
-    seance = Seance(
-        cours_id=cours_id,
-        heure_debut=cours.heure_debut,
-        heure_fin=cours.heure_fin
-    )
-    db.add(seance)
+    # Séance du jour créée par le planificateur (services/seance_scheduler.py), ouverte en avance
+    today = datetime.combine(date.today(), time.min)
+    seance = db.query(Seance).filter(
+        Seance.cours_id == cours_id,
+        Seance.date >= today,
+        Seance.date < today + timedelta(days=1),
+        Seance.finalized_at.is_(None)
+    ).order_by(Seance.date).first()
+    
+    if seance:
+        seance.is_active = True
+    else:
+        # Séance hors emploi du temps (rattrapage) ou déjà clôturée aujourd'hui: en créer une
+        seance = Seance(
+            cours_id=cours_id,
+            date=datetime.now(),
+            heure_debut=cours.heure_debut,
+            heure_fin=cours.heure_fin
+        )
+        db.add(seance)
+    response_cache.invalidate_after_commit(db, cours.enseignant_id)
     db.commit()
     db.refresh(seance)
     return seance
@@ -43,9 +60,10 @@ def end_seance(
     if not seance:
         raise HTTPException(status_code=404, detail="Séance not found")
     
-    seance.is_active = False
+    # Clôture: absences écrites pour les étudiants du groupe non reconnus
+    absents = finalize_seance(db, seance)
     db.commit()
-    return {"message": "Séance ended"}
+    return {"message": "Séance ended", "absents": absents}
 
 @router.get("/cours/{cours_id}", response_model=list[SeanceResponse])
 def get_seances_by_cours(
@@ -1,115 +1,91 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from sqlalchemy.orm import Session
-from app.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Response
+from sqlalchemy import select, insert
+from sqlalchemy.orm import Session, selectinload, defer
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_db, get_async_db, release_connection
+from app.models.attendance import Attendance
+from app.models.cours import Cours
+from app.models.seance import Seance
 from app.models.student import Student
-from app.models.student_embedding import StudentEmbedding
 from app.models.user import User, UserRole
-from app.schemas.student import StudentResponse, StudentActivateRequest
+from app.models.attendance_rollup import StudentAttendanceRollup
+from app.schemas.student import StudentResponse, StudentActivateRequest, EnrolmentReport
 from app.utils.dependencies import require_role, get_current_user
 from app.services.embedding_extractor import extractor
-from app.services.presence_service import calculate_presence_percentage
-from datetime import date, datetime, time
+from app.services.worker_pool import inference_pool
+from app.services.embedding_index import embedding_index
+from app.services.templates import add_templates, sync_index
+from app.services.enrolment import list_photos, enrol_photos_pooled
+from app.services.presence_service import calculate_presence_percentages, student_payloads
+from app.services.user_cache import user_cache
+from app.utils.pagination import PageParams, paginate, ndjson_stream
+from datetime import date, datetime, time, timedelta
 from typing import cast
+from pathlib import Path
+import hashlib
 import os
+import shutil
+import zipfile
 import logging
 
 logger = logging.getLogger(__name__) # logger: do not configure handlers here, use app logging config
 
 router = APIRouter(prefix="/students", tags=["Students"])
 
+ENROLMENT_DIR = "enrolment_jobs"  # Hors de /uploads (servi en statique): les archives contiennent des photos
+
+def _student_rows(db: Session):
+    """(Student, User) des comptes étudiants; jointure interne: les students orphelins sont exclus"""
+    return db.query(Student, User).join(User, Student.user_id == User.id).options(
+        defer(Student.embedding)
+    ).filter(User.role == UserRole.STUDENT)
+
+
+def _pending_rows(db: Session):
+    return _student_rows(db).filter(User.is_active == False)
+
+
+def _active_rows(db: Session):
+    return _student_rows(db).filter(User.is_active == True)
+
+
 @router.get("/pending", response_model=list[StudentResponse])
 def get_pending_students(
+    response: Response,
+    page: PageParams = Depends(),
     current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.SUPER_ADMIN])),
     db: Session = Depends(get_db)
 ):
-    """Liste des étudiants non activés (sans groupe)"""
-    # Récupérer tous les users étudiants non activés
-    pending_users = db.query(User).filter(
-        User.role == UserRole.STUDENT,
-        User.is_active == False
-    ).all()
-    
-    result = []
-    for user in pending_users:
-        # Vérifier si student existe
-        student = db.query(Student).filter(Student.user_id == user.id).first()
-        
-        if student:
-            presence = calculate_presence_percentage(student.id, db)
-            result.append({
-                "id": student.id,
-                "user_id": user.id,
-                "groupe_id": student.groupe_id,
-                "photo_path": student.photo_path,
-                "user": {
-                    "id": user.id,
-                    "email": user.email,
-                    "full_name": user.full_name,
-                    "is_active": user.is_active
-                },
-                "presence_percentage": presence
-            })
-        else:
-            # Créer student vide si n'existe pas
-            new_student = Student(user_id=user.id)
-            db.add(new_student)
-            db.commit()
-            db.refresh(new_student)
-            presence = calculate_presence_percentage(new_student.id, db)
-            result.append({
-                "id": new_student.id,
-                "user_id": user.id,
-                "groupe_id": None,
-                "photo_path": None,
-                "user": {
-                    "id": user.id,
-                    "email": user.email,
-                    "full_name": user.full_name,
-                    "is_active": user.is_active
-                },
-                "presence_percentage": presence
-            })
-    
-    return result
+    """Liste des étudiants non activés (sans groupe), paginée ou en flux (voir utils/pagination.py)"""
+    # Créer en une requête les students vides des comptes qui n'en ont pas encore
+    created = db.execute(insert(Student).from_select(
+        ["user_id"],
+        select(User.id).where(
+            User.role == UserRole.STUDENT,
+            User.is_active == False,
+            ~select(Student.id).where(Student.user_id == User.id).exists()
+        )
+    ))
+    if created.rowcount:
+        db.commit()
+
+    if page.stream:
+        return ndjson_stream(_pending_rows, Student.id, lambda session, rows: student_payloads(rows, session), StudentResponse, page)
+    rows = paginate(_pending_rows(db), Student.id, page, response, row_id=lambda row: row.Student.id)
+    return student_payloads(rows, db)
 
 @router.get("/active", response_model=list[StudentResponse])
 def get_active_students(
+    response: Response,
+    page: PageParams = Depends(),
     current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.SUPER_ADMIN, UserRole.ENSEIGNANT])),
     db: Session = Depends(get_db)
 ):
-    """Liste des étudiants activés"""
-    # UTILISER joinedload pour charger user en une seule requête
-    from sqlalchemy.orm import joinedload
-    
-    students = db.query(Student).options(
-        joinedload(Student.user)
-    ).join(User).filter(
-        User.is_active == True,
-        User.role == UserRole.STUDENT
-    ).all()
-    
-    result = []
-    for s in students:
-        # Skip if user relationship is missing
-        if not getattr(s, "user", None):
-            logger.warning("Orphan Student detected in /students/active: student_id=%s user_id=%s", s.id, s.user_id)
-            continue
-        presence = calculate_presence_percentage(s.id, db)
-        result.append({
-            "id": s.id,
-            "user_id": s.user_id,
-            "groupe_id": getattr(s, "groupe_id", None),
-            "photo_path": getattr(s, "photo_path", None),
-            "user": {
-                "id": s.user.id,
-                "email": s.user.email,
-                "full_name": s.user.full_name,
-                "is_active": s.user.is_active
-            },
-            "presence_percentage": presence
-        })
-    
-    return result
+    """Liste des étudiants activés, paginée ou en flux (voir utils/pagination.py)"""
+    if page.stream:
+        return ndjson_stream(_active_rows, Student.id, lambda session, rows: student_payloads(rows, session), StudentResponse, page)
+    rows = paginate(_active_rows(db), Student.id, page, response, row_id=lambda row: row.Student.id)
+    return student_payloads(rows, db)
 
 
 @router.get('/admin/orphan-students')
@@ -142,11 +118,13 @@ async def upload_student_photo(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
+    release_connection(db)  # Pas de connexion gardée pendant l'inférence
+    
     # Lire image
     image_bytes = await file.read()
     
     # Extraire embedding
-    embedding = extractor.extract_from_image(image_bytes)
+    embedding = await inference_pool.run(extractor.extract_from_image, image_bytes)
     if embedding is None:
         raise HTTPException(status_code=400, detail="No face detected in image")
     
@@ -160,17 +138,48 @@ async def upload_student_photo(
     setattr(student, "photo_path", photo_path)
     setattr(student, "embedding", embedding.tobytes())
     
-    # Créer embedding vérifié
-    student_emb = StudentEmbedding(
-        student_id=student.id,
-        embedding=embedding.tobytes(),
-        is_verified=True
-    )
-    db.add(student_emb)
+    # Créer embedding vérifié (les plus anciens au-delà du plafond sont évincés)
+    learned = add_templates(db, [(student.id, embedding)], is_verified=True)
+    profile = (user.full_name, student.groupe_id)
     db.commit()
     
+    # Synchroniser l'index de reconnaissance
+    sync_index(*learned, profiles={student_id: profile})
+    
     return {"message": "Photo uploaded successfully", "photo_path": photo_path}
 
+@router.post("/bulk-enrol", response_model=EnrolmentReport)
+async def bulk_enrol_students(
+    file: UploadFile = File(...),
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.SUPER_ADMIN])),
+):
+    """
+    Inscription en masse depuis une archive zip de photos `<email>.jpg`.
+    L'archive est conservée sous son empreinte SHA-256: renvoyer la même
+    archive après une interruption (ou un 503, pool d'inférence saturé)
+    reprend l'inscription là où elle s'était arrêtée. Chaque chunk passe par
+    inference_pool, comme les autres routes d'inférence.
+    """
+    digest = hashlib.sha256()
+    while chunk := await file.read(1024 * 1024):
+        digest.update(chunk)
+    await file.seek(0)
+
+    os.makedirs(ENROLMENT_DIR, exist_ok=True)
+    archive_path = Path(ENROLMENT_DIR) / f"{digest.hexdigest()}.zip"
+    if not archive_path.exists():
+        with open(archive_path, "wb") as f:
+            shutil.copyfileobj(file.file, f)
+
+    try:
+        photos = list_photos(archive_path)
+    except zipfile.BadZipFile:
+        archive_path.unlink(missing_ok=True)
+        raise HTTPException(status_code=400, detail="File must be a zip archive")
+
+    state_path = archive_path.with_suffix(".state")
+    return await enrol_photos_pooled(photos, inference_pool, state_path)
+
 @router.put("/{student_id}/assign-groupe")
 def assign_groupe(
     student_id: int,
@@ -186,6 +195,8 @@ def assign_groupe(
     student.groupe_id = data.groupe_id
     db.commit()
     
+    embedding_index.move(student.id, data.groupe_id)
+    
     return {"message": "Groupe assigned successfully"}
 
 @router.post("/{student_id}/activate")
@@ -211,6 +222,7 @@ def activate_student(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     setattr(user, "is_active", True)
+    user_cache.invalidate_after_commit(db, user.id)
     db.commit()
     
     return {"message": "Student activated successfully"}
@@ -232,8 +244,10 @@ def delete_student(
     db.delete(student)
     if user:
         db.delete(user)
+        user_cache.invalidate_after_commit(db, user.id)
     
     db.commit()
+    embedding_index.remove(student_id)
     return {"message": "Student deleted"}
 
 @router.get("/groupe/{groupe_id}", response_model=list[StudentResponse])
@@ -243,15 +257,17 @@ def get_students_by_groupe(
     db: Session = Depends(get_db)
 ):
     """Étudiants d'un groupe spécifique"""
-    students = db.query(Student).filter(Student.groupe_id == groupe_id).all()
+    rows = db.query(Student, User).outerjoin(User, Student.user_id == User.id).filter(
+        Student.groupe_id == groupe_id
+    ).all()
+    presences = calculate_presence_percentages([student.id for student, _ in rows], db)
     
     result = []
-    for student in students:
-        user = db.query(User).filter(User.id == student.user_id).first()
+    for student, user in rows:
         if not user:
             logger.warning("Orphan Student detected in /students/groupe/%s: student_id=%s user_id=%s", groupe_id, student.id, student.user_id)
             continue
-        presence = calculate_presence_percentage(student.id, db)
+        presence = presences[student.id]
         result.append({
             "id": student.id,
             "user_id": user.id,
@@ -268,32 +284,37 @@ def get_students_by_groupe(
     
     return result
 
-@router.get("/me/stats")
-async def get_student_stats(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Récupérer les statistiques d'un étudiant"""
-    
+async def _current_student(current_user: User, db: AsyncSession) -> Student:
+    """Étudiant connecté (routes /me)"""
     if current_user.role != UserRole.STUDENT:
         raise HTTPException(status_code=403, detail="Access forbidden")
     
-    # Trouver l'étudiant
-    student = db.query(Student).filter(Student.user_id == current_user.id).first()
+    student = (await db.execute(select(Student).where(Student.user_id == current_user.id))).scalar_one_or_none()
     
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
+    return student
+
+
+def _seance_details():
+    """Cours -> module et enseignant chargés avec les séances (pas de chargement paresseux en async)"""
+    return selectinload(Seance.cours).options(selectinload(Cours.module), selectinload(Cours.enseignant))
+
+
+@router.get("/me/stats")
+async def get_student_stats(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Récupérer les statistiques d'un étudiant"""
+    student = await _current_student(current_user, db)
     
-    # Récupérer toutes les présences
-    from app.models.attendance import Attendance
-    attendances = db.query(Attendance).filter(
-        Attendance.student_id == student.id
-    ).all()
-    
-    total_cours = len(attendances)
-    presences = sum(1 for a in attendances if str(a.status).lower() == "present")
-    absences = sum(1 for a in attendances if str(a.status).lower() == "absent")
-    retards = sum(1 for a in attendances if str(a.status).lower() == "retard")
+    # Compteurs de présences (rollup par étudiant: une lecture par clé primaire)
+    counts = await db.get(StudentAttendanceRollup, student.id)
+    presences = counts.present if counts else 0
+    retards = counts.late if counts else 0
+    absences = counts.absent if counts else 0
+    total_cours = presences + retards + absences
     
     taux_presence = round((presences / total_cours * 100) if total_cours > 0 else 0, 1)
     
@@ -310,18 +331,10 @@ async def get_student_stats(
 async def get_student_schedule(
     week: int = 0,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Récupérer l'emploi du temps d'un étudiant"""
-    from datetime import datetime, timedelta
-    
-    if current_user.role != UserRole.STUDENT:
-        raise HTTPException(status_code=403, detail="Access forbidden")
-    
-    student = db.query(Student).filter(Student.user_id == current_user.id).first()
-    
-    if not student:
-        raise HTTPException(status_code=404, detail="Student not found")
+    student = await _current_student(current_user, db)
     
     # Calculer les dates de la semaine
     today = datetime.now()
@@ -329,14 +342,13 @@ async def get_student_schedule(
     end_of_week = start_of_week + timedelta(days=6)
     
     # Récupérer les séances
-    from app.models.seance import Seance
-    from app.models.cours import Cours
-    
-    seances = db.query(Seance).join(Cours).filter(
-        Cours.groupe_id == student.groupe_id,
-        Seance.date >= start_of_week.date(),
-        Seance.date <= end_of_week.date()
-    ).all()
+    seances = (await db.execute(
+        select(Seance).join(Cours).options(_seance_details()).where(
+            Cours.groupe_id == student.groupe_id,
+            Seance.date >= start_of_week.date(),
+            Seance.date <= end_of_week.date()
+        )
+    )).scalars().all()
     
     schedule = []
     day_mapping = {
@@ -375,23 +387,16 @@ async def get_student_schedule(
 @router.get("/me/attendance")
 async def get_student_attendance(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Récupérer l'historique des présences"""
+    student = await _current_student(current_user, db)
     
-    if current_user.role != UserRole.STUDENT:
-        raise HTTPException(status_code=403, detail="Access forbidden")
-    
-    student = db.query(Student).filter(Student.user_id == current_user.id).first()
-    
-    if not student:
-        raise HTTPException(status_code=404, detail="Student not found")
-    
-    from app.models.attendance import Attendance
-    from app.models.seance import Seance
-    attendances = db.query(Attendance).filter(
-        Attendance.student_id == student.id
-    ).all()
+    attendances = (await db.execute(
+        select(Attendance).options(selectinload(Attendance.seance).options(_seance_details())).where(
+            Attendance.student_id == student.id
+        )
+    )).scalars().all()
     
     records = []
     for attendance in attendances:
@@ -413,10 +418,12 @@ async def get_student_attendance(
                 "room": cours.salle if cours else "N/A"
             })
     
-    total = len(records)
-    present = len([r for r in records if r["status"] == "present"])
-    absent = len([r for r in records if r["status"] == "absent"])
-    late = len([r for r in records if r["status"] == "retard"])
+    # Statistiques lues dans le rollup de l'étudiant
+    counts = await db.get(StudentAttendanceRollup, student.id)
+    present = counts.present if counts else 0
+    late = counts.late if counts else 0
+    absent = counts.absent if counts else 0
+    total = present + late + absent
     rate = round((present / total * 100) if total > 0 else 0)
     
     return {
@@ -434,28 +441,27 @@ async def get_student_attendance(
 @router.get("/me/recent-courses")
 async def get_recent_courses(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Récupérer les cours récents pour le dashboard"""
-    from datetime import datetime, timedelta
-    
-    if current_user.role != UserRole.STUDENT:
-        raise HTTPException(status_code=403, detail="Access forbidden")
-    
-    student = db.query(Student).filter(Student.user_id == current_user.id).first()
-    
-    if not student:
-        raise HTTPException(status_code=404, detail="Student not found")
-    
-    from app.models.seance import Seance
-    from app.models.cours import Cours
-    from app.models.attendance import Attendance
-    
-    today = datetime.now().date()
-    seances = db.query(Seance).join(Cours).filter(
-        Cours.groupe_id == student.groupe_id,
-        Seance.date <= today + timedelta(days=7)
-    ).order_by(Seance.date.desc()).limit(10).all()
+    student = await _current_student(current_user, db)
+    
+    now = datetime.now()
+    today = now.date()
+    seances = (await db.execute(
+        select(Seance).join(Cours).options(_seance_details()).where(
+            Cours.groupe_id == student.groupe_id,
+            Seance.date <= today + timedelta(days=7)
+        ).order_by(Seance.date.desc()).limit(10)
+    )).scalars().all()
+    
+    # Statuts de l'étudiant pour ces séances, en une requête
+    statuses = dict((await db.execute(
+        select(Attendance.seance_id, Attendance.status).where(
+            Attendance.seance_id.in_([seance.id for seance in seances]),
+            Attendance.student_id == student.id
+        )
+    )).all()) if seances else {}
     
     courses = []
     for seance in seances:
@@ -463,34 +469,30 @@ async def get_recent_courses(
         module = cours.module if cours else None
         enseignant = cours.enseignant if cours else None
         
-        attendance = db.query(Attendance).filter(
-            Attendance.seance_id == seance.id,
-            Attendance.student_id == student.id
-        ).first()
-        
         status = "a_venir"
         
         seance_date = cast(datetime, seance.date).date()
+        heure_debut = cast(time | None, seance.heure_debut)
+        heure_fin = cast(time | None, seance.heure_fin)
 
-        if attendance is not None:
-            status = attendance.status
-        elif seance_date < today:
+        if seance.id in statuses:
+            status = statuses[seance.id]
+        elif seance_date < today or (seance_date == today and heure_fin is not None and heure_fin <= now.time()):
             status = "absent"
-        else:
+        elif seance_date == today and (heure_debut is None or heure_debut <= now.time()):
+            # Séances planifiées à l'avance (seance_scheduler): "en_cours" seulement une fois commencées
             status = "en_cours"
 
-        heure_debut = cast(time | None, seance.heure_debut)
-        heure_fin = cast(time | None, seance.heure_fin)        
         courses.append({
             "id": seance.id,
-            "nom": cours.nom if cours else "N/A",
+            "nom": module.nom if module else "N/A",
             "module": module.nom if module else "N/A",
             "date": seance.date.isoformat(),
             "heure": (f"{heure_debut.strftime('%H:%M') if heure_debut else '08:00'} - "
                       f"{heure_fin.strftime('%H:%M') if heure_fin else '10:00'}"),
-            "salle": seance.salle or "N/A",
-            "professeur": enseignant.nom_complet if enseignant else "N/A",
+            "salle": (cours.salle if cours else None) or "N/A",
+            "professeur": enseignant.full_name if enseignant else "N/A",
             "status": status
         })
     
-    return courses
\ No newline at end of file
+    return courses
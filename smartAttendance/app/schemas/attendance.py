@@ -16,4 +16,10 @@ class AttendanceResponse(BaseModel):
     status: str
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class FrameRecognitionResponse(BaseModel):
+    faces_detected: int
+    recognized: list[AttendanceResponse]  # Nouvelles présences enregistrées
+    already_marked: list[int]  # student_ids déjà présents dans la séance
+    unrecognized: int
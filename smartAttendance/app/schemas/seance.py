@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from datetime import date, time
+from datetime import date, datetime, time
 from typing import Optional
 
 class SeanceBase(BaseModel):
@@ -20,6 +20,18 @@ class SeanceResponse(SeanceBase):
     class Config:
         from_attributes = True
 
+class SeanceState(BaseModel):
+    """Séance telle que stockée (POST /seances/start), cf. type Seance du frontend"""
+    id: int
+    cours_id: Optional[int] = None
+    date: datetime
+    heure_debut: Optional[time] = None
+    heure_fin: Optional[time] = None
+    is_active: bool
+
+    class Config:
+        from_attributes = True
+
 class CurrentSeanceResponse(BaseModel):
     seance: Optional[SeanceResponse] = None
     presents: int = 0
@@ -23,4 +23,18 @@ class StudentResponse(BaseModel):
         from_attributes = True
 
 class StudentActivateRequest(BaseModel):
-    groupe_id: int
\ No newline at end of file
+    groupe_id: int
+
+
+class EnrolmentFileResult(BaseModel):
+    file: str
+    email: str
+    student_id: Optional[int]
+    status: str  # enrolled, already_enrolled, unknown_email, no_face, error
+    detail: Optional[str]
+
+
+class EnrolmentReport(BaseModel):
+    total: int
+    summary: dict[str, int]
+    files: list[EnrolmentFileResult]
@@ -0,0 +1,177 @@
+import asyncio
+import json
+import logging
+import threading
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    File bornée d'une connexion (WebSocket), liée à sa boucle d'événements.
+    Si le client ne suit pas, les plus anciens événements sont jetés et
+    comptés: le client reçoit alors un événement "lagged" et se resynchronise,
+    sans jamais ralentir la publication ni les autres connexions.
+    """
+
+    def __init__(self, channel: str, max_size: int):
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue[str] = asyncio.Queue(maxsize=max_size)
+        self._dropped = 0
+
+    def _put(self, message: str):
+        # Toujours dans la boucle de la connexion (call_soon_threadsafe)
+        if self._queue.full():
+            self._queue.get_nowait()
+            self._dropped += 1
+        self._queue.put_nowait(message)
+
+    async def get(self) -> str:
+        if self._dropped:
+            dropped, self._dropped = self._dropped, 0
+            return json.dumps({"type": "lagged", "dropped": dropped})
+        return await self._queue.get()
+
+
+class MemoryBrokerBackend:
+    """Backend par défaut: publication dans le processus (un seul worker, ou un canal par worker)"""
+
+    def __init__(self):
+        self._deliver = None
+
+    def start(self, deliver):
+        self._deliver = deliver
+
+    def publish(self, channel: str, message: str):
+        self._deliver(channel, message)
+
+    def stop(self):
+        pass
+
+
+class RedisBrokerBackend:
+    """
+    Backend partagé entre workers (paquet `redis` requis): publication Redis
+    PUBLISH, un thread par processus relaie les messages vers ses abonnés locaux.
+    """
+
+    def __init__(self, url: str, prefix: str = "sa:events:"):
+        import redis
+        self._redis = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._thread = None
+        self._pubsub = None
+
+    def start(self, deliver):
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.psubscribe(**{
+            self.prefix + "*": lambda item: deliver(item["channel"].decode()[len(self.prefix):], item["data"].decode())
+        })
+        self._thread = self._pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def publish(self, channel: str, message: str):
+        self._redis.publish(self.prefix + channel, message)
+
+    def stop(self):
+        if self._thread is not None:
+            self._thread.stop()
+
+
+class AttendanceBroker:
+    """
+    Pub/sub des événements de présence, un canal par séance ("seance:<id>").
+
+    Les écritures (attendance_service) appellent `publish_after_commit`; les
+    événements partent au commit, jamais pour une transaction annulée. Les
+    abonnés sont les connexions WebSocket de routers/events.py, chacune avec
+    sa file bornée (Subscription).
+    """
+
+    def __init__(self, backend, queue_size: int):
+        self.backend = backend
+        self.queue_size = queue_size
+        self._subscribers: dict[str, set[Subscription]] = {}
+        self._lock = threading.Lock()
+        self._published = 0
+        self._delivered = 0
+        self.backend.start(self._deliver)
+
+    def subscribe(self, seance_id: int) -> Subscription:
+        """À appeler depuis la boucle d'événements de la connexion"""
+        subscription = Subscription(f"seance:{seance_id}", self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(subscription.channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+    def publish(self, seance_id: int, payload: dict):
+        message = json.dumps(jsonable_encoder(payload))
+        with self._lock:
+            self._published += 1
+        try:
+            self.backend.publish(f"seance:{seance_id}", message)
+        except Exception:
+            # Les événements sont un confort d'affichage: ne jamais faire échouer l'écriture
+            logger.exception("Failed to publish attendance event for seance %s", seance_id)
+
+    def publish_after_commit(self, db: Session, seance_id: int, payload: dict):
+        db.info.setdefault("attendance_events", []).append((seance_id, payload))
+
+    def _deliver(self, channel: str, message: str):
+        # Appelé par le thread qui publie (ou celui du backend Redis)
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+            self._delivered += len(subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._put, message)
+            except RuntimeError:
+                self.unsubscribe(subscription)  # Boucle fermée
+
+    def close(self):
+        self.backend.stop()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "backend": type(self.backend).__name__,
+                "channels": len(self._subscribers),
+                "subscribers": sum(len(subscribers) for subscribers in self._subscribers.values()),
+                "published": self._published,
+                "delivered": self._delivered,
+            }
+
+
+def _build_backend():
+    if settings.EVENTS_BACKEND == "redis":
+        return RedisBrokerBackend(settings.EVENTS_REDIS_URL)
+    return MemoryBrokerBackend()
+
+
+attendance_broker = AttendanceBroker(_build_backend(), settings.EVENTS_QUEUE_SIZE)
+
+
+@event.listens_for(Session, "after_commit")
+def _flush_events(session: Session):
+    if session.in_nested_transaction():
+        return
+    for seance_id, payload in session.info.pop("attendance_events", ()):
+        attendance_broker.publish(seance_id, payload)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _drop_events(session: Session, transaction):
+    if transaction.parent is None:
+        session.info.pop("attendance_events", None)
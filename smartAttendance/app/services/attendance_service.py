@@ -0,0 +1,270 @@
+from datetime import datetime, time, timedelta
+from sqlalchemy import func, case, select, delete, insert, literal
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, joinedload
+from app.database import SessionLocal
+from app.models.attendance import Attendance
+from app.models.attendance_rollup import (
+    SeanceAttendanceRollup, CoursStudentAttendanceRollup, StudentAttendanceRollup
+)
+from app.models.seance import Seance
+from app.models.student import Student
+from app.services.response_cache import response_cache
+from app.services.attendance_events import attendance_broker
+from app.services.recognition_cache import recognition_cache
+
+STATUSES = ("present", "late", "absent")
+
+# Rollup -> colonnes de regroupement équivalentes sur attendances ⨝ seances
+ROLLUP_KEYS = {
+    SeanceAttendanceRollup: {"seance_id": Attendance.seance_id},
+    CoursStudentAttendanceRollup: {"cours_id": Seance.cours_id, "student_id": Attendance.student_id},
+    StudentAttendanceRollup: {"student_id": Attendance.student_id},
+}
+
+
+def _normalize_status(status) -> str:
+    status = str(getattr(status, "value", status)).lower()
+    if status not in STATUSES:
+        raise ValueError(f"Unknown attendance status: {status}")
+    return status
+
+
+def dialect_insert(db: Session, model):
+    """INSERT supportant ON CONFLICT (PostgreSQL en production, SQLite en local)"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(model)
+    if dialect == "sqlite":
+        return sqlite.insert(model)
+    raise NotImplementedError(f"ON CONFLICT not supported for dialect {dialect}")
+
+
+def _bump(db: Session, model, rows: list[dict]):
+    """Ajoute des compteurs aux lignes de rollup: INSERT ... ON CONFLICT DO UPDATE (un seul aller-retour)"""
+    if not rows:
+        return
+    keys = [column.name for column in model.__table__.primary_key.columns]
+    # Ordre de clé stable: deux transactions concurrentes verrouillent les lignes dans le même ordre
+    rows = sorted(rows, key=lambda row: tuple(row[key] for key in keys))
+    stmt = dialect_insert(db, model).values([
+        {**row, **{status: row.get(status, 0) for status in STATUSES}} for row in rows
+    ])
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={status: getattr(model, status) + getattr(stmt.excluded, status) for status in STATUSES}
+    ))
+
+
+def _event_fields(attendance: Attendance) -> dict:
+    """Champs d'AttendanceResponse publiés sur le canal de la séance"""
+    return {
+        "id": attendance.id,
+        "seance_id": attendance.seance_id,
+        "student_id": attendance.student_id,
+        "confidence": attendance.confidence,
+        "timestamp": attendance.timestamp,
+        "status": attendance.status,
+    }
+
+
+def record_attendances(db: Session, seance: Seance, entries: list[tuple[int, float, str]]) -> list[Attendance]:
+    """
+    Seul chemin d'écriture des présences: insère une Attendance par
+    (student_id, confidence, status) avec INSERT ... ON CONFLICT DO NOTHING
+    sur (seance_id, student_id), puis met à jour les rollups (séance,
+    cours × étudiant, étudiant) pour les seules lignes insérées, dans la même
+    transaction. Retourne les présences créées (les étudiants déjà marqués
+    n'y figurent pas). Ne commit pas; le cache des pages de l'enseignant est
+    invalidé au commit.
+    """
+    values = {}
+    for student_id, confidence, status in entries:
+        values[student_id] = {
+            "seance_id": seance.id,
+            "student_id": student_id,
+            "confidence": float(confidence),
+            "status": _normalize_status(status)
+        }
+    if not values:
+        return []
+
+    inserted = db.execute(
+        dialect_insert(db, Attendance).values(list(values.values())).on_conflict_do_nothing(
+            index_elements=["seance_id", "student_id"]
+        ).returning(Attendance.id, Attendance.student_id)
+    ).all()
+    if not inserted:
+        return []
+
+    rows = [values[student_id] for _, student_id in inserted]
+    seance_counts = {}
+    for row in rows:
+        seance_counts[row["status"]] = seance_counts.get(row["status"], 0) + 1
+    _bump(db, SeanceAttendanceRollup, [{"seance_id": seance.id, **seance_counts}])
+    if seance.cours_id is not None:
+        _bump(db, CoursStudentAttendanceRollup, [
+            {"cours_id": seance.cours_id, "student_id": row["student_id"], row["status"]: 1} for row in rows
+        ])
+    _bump(db, StudentAttendanceRollup, [{"student_id": row["student_id"], row["status"]: 1} for row in rows])
+
+    response_cache.invalidate_after_commit(db, seance.cours.enseignant_id if seance.cours else None)
+    recognition_cache.mark_after_commit(db, seance.id, [(row["student_id"], row["status"]) for row in rows])
+    created = db.query(Attendance).filter(Attendance.id.in_([attendance_id for attendance_id, _ in inserted])).all()
+    for attendance in created:
+        attendance_broker.publish_after_commit(db, seance.id, {"type": "attendance", "attendance": _event_fields(attendance)})
+    return created
+
+
+def record_attendance(db: Session, seance: Seance, student_id: int, confidence: float, status) -> Attendance | None:
+    """Une présence; None si l'étudiant est déjà marqué pour cette séance"""
+    created = record_attendances(db, seance, [(student_id, confidence, status)])
+    return created[0] if created else None
+
+
+def finalize_seance(db: Session, seance: Seance) -> int:
+    """
+    Clôture une séance: une présence "absent" pour chaque étudiant du groupe
+    sans présence, en un seul INSERT ... SELECT (ON CONFLICT DO NOTHING: une
+    reconnaissance concurrente garde sa ligne), rollups mis à jour pour les
+    seules lignes insérées, puis is_active=False et finalized_at. Idempotent.
+    Retourne le nombre d'absents insérés. Ne commit pas.
+    """
+    if seance.finalized_at is not None:
+        return 0
+
+    absent_ids = []
+    groupe_id = seance.cours.groupe_id if seance.cours else None
+    if groupe_id is not None:
+        missing = select(
+            literal(seance.id), Student.id, literal(0.0), literal("absent")
+        ).where(
+            Student.groupe_id == groupe_id,
+            ~select(Attendance.id).where(
+                Attendance.seance_id == seance.id, Attendance.student_id == Student.id
+            ).exists()
+        )
+        absent_ids = db.execute(
+            dialect_insert(db, Attendance).from_select(
+                ["seance_id", "student_id", "confidence", "status"], missing
+            ).on_conflict_do_nothing(
+                index_elements=["seance_id", "student_id"]
+            ).returning(Attendance.student_id)
+        ).scalars().all()
+
+    if absent_ids:
+        _bump(db, SeanceAttendanceRollup, [{"seance_id": seance.id, "absent": len(absent_ids)}])
+        _bump(db, CoursStudentAttendanceRollup, [
+            {"cours_id": seance.cours_id, "student_id": student_id, "absent": 1} for student_id in absent_ids
+        ])
+        _bump(db, StudentAttendanceRollup, [{"student_id": student_id, "absent": 1} for student_id in absent_ids])
+
+    seance.is_active = False
+    seance.finalized_at = datetime.now()
+    response_cache.invalidate_after_commit(db, seance.cours.enseignant_id if seance.cours else None)
+    attendance_broker.publish_after_commit(db, seance.id, {"type": "finalized", "absent_student_ids": absent_ids})
+    recognition_cache.evict_after_commit(db, seance.id)
+    return len(absent_ids)
+
+
+def _is_over(seance: Seance, now: datetime) -> bool:
+    seance_date = seance.date.date()
+    if seance_date < now.date():
+        return True
+    return seance_date == now.date() and seance.heure_fin is not None and seance.heure_fin <= now.time()
+
+
+def finalize_due_seances(db: Session, now: datetime | None = None) -> int:
+    """
+    Balayage périodique: clôture les séances non finalisées dont heure_fin
+    est passée (ou d'un jour précédent), une transaction par séance.
+    Sans danger si plusieurs processus balaient en même temps (voir
+    finalize_seance). Retourne le nombre de séances clôturées.
+    """
+    now = now or datetime.now()
+    candidates = db.query(Seance).options(joinedload(Seance.cours)).filter(
+        Seance.finalized_at.is_(None),
+        Seance.date < datetime.combine(now.date() + timedelta(days=1), time.min)
+    ).order_by(Seance.id).all()
+
+    finalized = 0
+    for seance in candidates:
+        if _is_over(seance, now):
+            finalize_seance(db, seance)
+            db.commit()
+            finalized += 1
+    return finalized
+
+
+def run_finalization_sweep() -> int:
+    """Un balayage avec sa propre session (tâche de fond de main.py, commande CLI)"""
+    db = SessionLocal()
+    try:
+        return finalize_due_seances(db)
+    finally:
+        db.close()
+
+
+def _expected_counts(model):
+    """SELECT des compteurs attendus pour un rollup, recalculés depuis attendances"""
+    keys = ROLLUP_KEYS[model]
+    counts = [
+        func.sum(case((func.lower(Attendance.status) == status, 1), else_=0)).label(status)
+        for status in STATUSES
+    ]
+    return select(*[column.label(name) for name, column in keys.items()], *counts).select_from(Attendance).join(
+        Seance, Attendance.seance_id == Seance.id
+    ).where(*[column.isnot(None) for column in keys.values()]).group_by(*keys.values())
+
+
+def rebuild_rollups(db: Session):
+    """Recalcule entièrement les rollups (INSERT ... SELECT GROUP BY). Ne commit pas."""
+    for model in ROLLUP_KEYS:
+        db.execute(delete(model))
+        db.execute(insert(model).from_select([*ROLLUP_KEYS[model], *STATUSES], _expected_counts(model)))
+
+
+def reconcile_rollups(db: Session, fix: bool = True) -> dict[str, int]:
+    """
+    Compare les rollups aux attendances et corrige (si `fix`) les lignes qui
+    divergent. Retourne le nombre de lignes divergentes par table. Ne commit pas.
+    """
+    drift = {}
+    for model, keys in ROLLUP_KEYS.items():
+        key_names = list(keys)
+        expected = {
+            tuple(row[:len(key_names)]): tuple(row[len(key_names):])
+            for row in db.execute(_expected_counts(model))
+        }
+        stored = {
+            tuple(row[:len(key_names)]): tuple(row[len(key_names):])
+            for row in db.execute(select(*[getattr(model, k) for k in key_names], *[getattr(model, s) for s in STATUSES]))
+        }
+
+        wrong = [key for key in expected.keys() | stored.keys() if expected.get(key) != stored.get(key)]
+        drift[model.__tablename__] = len(wrong)
+        if not fix:
+            continue
+
+        for key in wrong:
+            filters = dict(zip(key_names, key))
+            row = db.query(model).filter_by(**filters).first()
+            if key not in expected:
+                db.delete(row)
+            elif row is None:
+                db.add(model(**filters, **dict(zip(STATUSES, expected[key]))))
+            else:
+                for status, value in zip(STATUSES, expected[key]):
+                    setattr(row, status, value)
+    return drift
+
+
+def rebuild_rollups_if_empty(db: Session) -> bool:
+    """Au démarrage: construit les rollups d'une base qui a des présences mais pas encore de rollups"""
+    if db.query(StudentAttendanceRollup.student_id).first() is not None:
+        return False
+    if db.query(Attendance.id).first() is None:
+        return False
+    rebuild_rollups(db)
+    db.commit()
+    return True
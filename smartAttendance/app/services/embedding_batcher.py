@@ -0,0 +1,81 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import numpy as np
+
+
+class FaceNetBatcher:
+    """
+    Regroupe les visages envoyés par des requêtes concurrentes et les passe à
+    FaceNet en un seul batch, dès que `max_batch_size` visages sont en attente
+    ou que `max_wait_ms` s'est écoulé depuis le premier. Chaque appelant
+    récupère uniquement ses propres embeddings.
+    """
+
+    def __init__(self, embed_fn, max_batch_size: int, max_wait_ms: float):
+        self._embed_fn = embed_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._batches = 0
+        self._faces = 0
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._loop, name="facenet-batcher", daemon=True)
+                    self._thread.start()
+
+    def embed(self, faces: np.ndarray) -> np.ndarray:
+        """(k, 160, 160, 3) -> (k, 512). Bloquant: à appeler depuis un thread du pool d'inférence."""
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((faces, future))
+        return future.result()
+
+    def _collect(self):
+        items = [self._queue.get()]
+        count = len(items[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while count < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            items.append(item)
+            count += len(item[0])
+        return items
+
+    def _loop(self):
+        while True:
+            items = self._collect()
+            try:
+                embeddings = self._embed_fn(np.concatenate([faces for faces, _ in items]))
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for faces, future in items:
+                future.set_result(embeddings[offset:offset + len(faces)])
+                offset += len(faces)
+
+            self._batches += 1
+            self._faces += offset
+
+    def metrics(self) -> dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": self._batches,
+            "faces": self._faces,
+            "avg_batch_size": round(self._faces / self._batches, 2) if self._batches else 0.0,
+        }
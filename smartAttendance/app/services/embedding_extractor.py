@@ -1,70 +1,206 @@
+import threading
+import time
 import cv2
 import numpy as np
-from mtcnn import MTCNN
-from keras_facenet import FaceNet
+from fastapi import HTTPException
+from app.config import settings
+from app.services.embedding_batcher import FaceNetBatcher
+
+MIN_CONFIDENCE = 0.9
+MIN_FACE_SIZE = 48  # Taille minimale (pixels)
+FACE_INPUT_SIZE = (160, 160)
+
+
+class ModelsDisabled(HTTPException):
+    """503 renvoyé par un worker démarré avec LOAD_ML_MODELS=false (API seule)"""
+
+    def __init__(self):
+        super().__init__(
+            status_code=503,
+            detail="La reconnaissance faciale n'est pas disponible sur ce serveur"
+        )
+
 
 class EmbeddingExtractor:
+    """
+    MTCNN et FaceNet (donc TensorFlow) ne sont importés et construits qu'au
+    premier accès à `mtcnn` / `facenet`: importer les routers ne coûte rien.
+    `warmup()` les construit et exécute une inférence factice au démarrage.
+    """
+
     def __init__(self):
-        self.mtcnn = MTCNN()
-        self.facenet = FaceNet()
-    
-    def extract_from_image(self, image_bytes):
-        # Décoder l'image
+        self._mtcnn = None
+        self._facenet = None
+        self._load_lock = threading.Lock()
+        # Les visages de toutes les requêtes concurrentes passent par un seul batcher
+        self.batcher = FaceNetBatcher(
+            lambda faces: self.facenet.embeddings(faces),
+            settings.EMBED_BATCH_MAX_SIZE,
+            settings.EMBED_BATCH_MAX_WAIT_MS
+        )
+
+    @property
+    def mtcnn(self):
+        if self._mtcnn is None:
+            if not settings.LOAD_ML_MODELS:
+                raise ModelsDisabled()
+            with self._load_lock:
+                if self._mtcnn is None:
+                    from mtcnn import MTCNN
+                    self._mtcnn = MTCNN()
+        return self._mtcnn
+
+    @property
+    def facenet(self):
+        if self._facenet is None:
+            if not settings.LOAD_ML_MODELS:
+                raise ModelsDisabled()
+            with self._load_lock:
+                if self._facenet is None:
+                    from keras_facenet import FaceNet
+                    self._facenet = FaceNet()
+        return self._facenet
+
+    @property
+    def loaded(self) -> bool:
+        return self._mtcnn is not None and self._facenet is not None
+
+    def warmup(self) -> dict:
+        """
+        Construit les modèles puis exécute une inférence factice (MTCNN + FaceNet)
+        pour que la première vraie requête ne paie pas le traçage des graphes.
+        Retourne les durées (ms) de chaque étape.
+        """
+        timings = {}
+
+        start = time.perf_counter()
+        mtcnn, facenet = self.mtcnn, self.facenet
+        timings["load_ms"] = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        mtcnn.detect_faces(np.zeros((*FACE_INPUT_SIZE, 3), dtype=np.uint8))
+        timings["mtcnn_warmup_ms"] = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        facenet.embeddings(np.zeros((1, *FACE_INPUT_SIZE, 3), dtype=np.uint8))
+        timings["facenet_warmup_ms"] = (time.perf_counter() - start) * 1000
+
+        return {name: round(ms, 1) for name, ms in timings.items()}
+
+    def _decode(self, image_bytes):
         nparr = np.frombuffer(image_bytes, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if img is None:
-            return None
-        
-        # Détecter visage avec MTCNN
+        return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
+    def _detect(self, img):
+        mtcnn = self.mtcnn  # Hors du try: ModelsDisabled doit remonter
         try:
-            detections = self.mtcnn.detect_faces(img)
+            return mtcnn.detect_faces(img)
         except Exception as e:
             print(f"MTCNN error: {e}")
+            return []
+
+    def _crop(self, img, detection):
+        """Découpe un visage détecté en 160x160 RGB, ou None s'il ne passe pas les seuils"""
+        if detection['confidence'] < MIN_CONFIDENCE:
             return None
-        
-        if not detections:
-            return None
-        
-        # Prendre la détection avec la meilleure confiance
-        best_detection = max(detections, key=lambda d: d['confidence'])
-        
-        if best_detection['confidence'] < 0.9:
-            return None
-        
+
         # Extraire bbox
-        x, y, w, h = best_detection['box']
-        
+        x, y, w, h = detection['box']
+
         # Vérifier que bbox est valide
         if w <= 0 or h <= 0:
             return None
-        
+
         # S'assurer que bbox est dans l'image
         x = max(0, x)
         y = max(0, y)
         w = min(w, img.shape[1] - x)
         h = min(h, img.shape[0] - y)
-        
-        if w < 48 or h < 48:  # Taille minimale
+
+        if w < MIN_FACE_SIZE or h < MIN_FACE_SIZE:
             return None
-        
+
         face = img[y:y+h, x:x+w]
-        
+
         if face.size == 0:
             return None
-        
+
         # Resize 160x160
-        face_resized = cv2.resize(face, (160, 160))
-        
+        face_resized = cv2.resize(face, FACE_INPUT_SIZE)
+
         # BGR → RGB
-        face_rgb = cv2.cvtColor(face_resized, cv2.COLOR_BGR2RGB)
-        
+        return cv2.cvtColor(face_resized, cv2.COLOR_BGR2RGB)
+
+    def crop_best_face(self, image_bytes):
+        """Décode et détecte (sans FaceNet): visage 160x160 RGB le plus sûr, ou None"""
+        # Décoder l'image
+        img = self._decode(image_bytes)
+
+        if img is None:
+            return None
+
+        # Détecter visage avec MTCNN
+        detections = self._detect(img)
+
+        if not detections:
+            return None
+
+        # Prendre la détection avec la meilleure confiance
+        best_detection = max(detections, key=lambda d: d['confidence'])
+
+        return self._crop(img, best_detection)
+
+    def embed_faces(self, faces: np.ndarray) -> np.ndarray:
+        """(k, 160, 160, 3) -> (k, 512), via le batcher partagé"""
+        return self.batcher.embed(faces)
+
+    def extract_from_image(self, image_bytes):
+        face_rgb = self.crop_best_face(image_bytes)
+
+        if face_rgb is None:
+            return None
+
         # Ajouter dimension batch
         face_batch = np.expand_dims(face_rgb, axis=0)
-        
+
         # Extraire embedding
-        embedding = self.facenet.embeddings(face_batch)[0]
-        
+        embedding = self.batcher.embed(face_batch)[0]
+
         return embedding
 
-extractor = EmbeddingExtractor()
\ No newline at end of file
+    def detect_faces(self, image_bytes):
+        """
+        Décode et détecte (sans FaceNet): liste de (box (x, y, w, h), visage
+        160x160 RGB) des visages valides, ou None si l'image est illisible.
+        """
+        img = self._decode(image_bytes)
+
+        if img is None:
+            return None
+
+        faces = []
+        for detection in self._detect(img):
+            face = self._crop(img, detection)
+            if face is not None:
+                faces.append((tuple(detection['box']), face))
+        return faces
+
+    def extract_all_from_image(self, image_bytes):
+        """
+        Extrait les embeddings de tous les visages valides d'une image (photo de classe).
+        Les visages sont passés à FaceNet en un seul batch.
+        Retourne une matrice (k, 512), vide si aucun visage, ou None si l'image est illisible.
+        """
+        detected = self.detect_faces(image_bytes)
+
+        if detected is None:
+            return None
+
+        faces = [face for _, face in detected]
+
+        if not faces:
+            return np.empty((0, 512), dtype=np.float32)
+
+        return self.batcher.embed(np.stack(faces))
+
+extractor = EmbeddingExtractor()
@@ -0,0 +1,259 @@
+import threading
+import numpy as np
+from sqlalchemy import func, and_, or_, exists
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.student import Student
+from app.models.student_embedding import StudentEmbedding
+from app.models.user import User
+from app.services.matchers import Matcher, ExactMatcher, build_matcher, rebalance
+
+EMBEDDING_DIM = 512
+
+
+def _empty(dim: int) -> Matcher:
+    return ExactMatcher(np.empty(0, dtype=np.int64), np.empty((0, dim), dtype=np.float32))
+
+
+def legacy_key(student_id: int) -> int:
+    """Clé d'un étudiant sans template (seul Student.embedding): négative pour ne pas heurter les ids StudentEmbedding"""
+    return -student_id
+
+
+class EmbeddingIndex:
+    """
+    Index en mémoire des embeddings étudiants, partagé par tout le processus.
+
+    Chaque ligne est un template (StudentEmbedding: les vérifiés et les plus
+    récents capturés en séance) et un étudiant peut en avoir plusieurs. Les
+    lignes sont chargées une fois au démarrage puis tenues à jour par les
+    routes qui modifient un étudiant. La reconnaissance passe par un Matcher
+    (balayage exact, ou IVF approché pour les grandes galeries, voir
+    matchers.py), sans requête sur la table `students`: le template le plus
+    proche donne directement le minimum sur les templates de chaque étudiant.
+
+    Chaque groupe a en plus sa propre partition pour que la reconnaissance
+    d'une séance ne compare qu'aux étudiants de son groupe.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+        self.loaded = False
+        self._lock = threading.Lock()
+        self._names: dict[int, str] = {}
+        self._groupes: dict[int, int | None] = {}
+        self._keys: dict[int, set[int]] = {}  # student_id -> clés de ses templates
+        self._owners: dict[int, int] = {}  # clé de template -> student_id
+        # Snapshots remplacés d'un bloc (ajouts en place dans un tampon, voir matchers.py): les lecteurs n'ont pas besoin du verrou
+        self._snapshot: Matcher = _empty(dim)
+        self._partitions: dict[int, Matcher] = {}
+
+    def _as_vector(self, embedding) -> np.ndarray | None:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        if vector.shape[0] != self.dim:
+            return None
+        return vector
+
+    def _partition_add(self, groupe_id: int | None, key: int, vector: np.ndarray):
+        if groupe_id is None:
+            return
+        partition = self._partitions.get(groupe_id, _empty(self.dim))
+        self._partitions[groupe_id] = rebalance(partition.with_row(key, vector))
+
+    def _partition_drop(self, groupe_id: int | None, key: int):
+        if groupe_id is None or groupe_id not in self._partitions:
+            return
+        partition = self._partitions[groupe_id].without_row(key)
+        if len(partition):
+            self._partitions[groupe_id] = rebalance(partition)
+        else:
+            del self._partitions[groupe_id]
+
+    def _add_row(self, student_id: int, key: int, vector: np.ndarray):
+        self._snapshot = rebalance(self._snapshot.with_row(key, vector))
+        self._partition_add(self._groupes.get(student_id), key, vector)
+        self._keys.setdefault(student_id, set()).add(key)
+        self._owners[key] = student_id
+
+    def _drop_row(self, key: int):
+        student_id = self._owners.pop(key, None)
+        if student_id is None:
+            return
+        self._snapshot = rebalance(self._snapshot.without_row(key))
+        self._partition_drop(self._groupes.get(student_id), key)
+        self._keys[student_id].discard(key)
+
+    def load(self, db: Session):
+        """
+        Charge les templates depuis la base en deux requêtes (colonnes uniquement):
+        par étudiant, les TEMPLATE_MAX_VERIFIED vérifiés et les TEMPLATE_MAX_RECENT
+        non vérifiés les plus récents, plus Student.embedding pour les étudiants sans template.
+        """
+        ranked = db.query(
+            StudentEmbedding.id,
+            StudentEmbedding.student_id,
+            StudentEmbedding.embedding,
+            StudentEmbedding.is_verified,
+            func.row_number().over(
+                partition_by=(StudentEmbedding.student_id, StudentEmbedding.is_verified),
+                order_by=(StudentEmbedding.created_at.desc(), StudentEmbedding.id.desc())
+            ).label("rank")
+        ).subquery()
+
+        template_rows = db.query(
+            ranked.c.id, ranked.c.student_id, ranked.c.embedding, Student.groupe_id, User.full_name
+        ).join(Student, Student.id == ranked.c.student_id).join(
+            User, Student.user_id == User.id
+        ).filter(or_(
+            and_(ranked.c.is_verified == True, ranked.c.rank <= settings.TEMPLATE_MAX_VERIFIED),
+            and_(ranked.c.is_verified == False, ranked.c.rank <= settings.TEMPLATE_MAX_RECENT)
+        )).all()
+
+        legacy_rows = db.query(
+            Student.id, Student.embedding, Student.groupe_id, User.full_name
+        ).join(User, Student.user_id == User.id).filter(
+            Student.embedding.isnot(None),
+            ~exists().where(StudentEmbedding.student_id == Student.id)
+        ).all()
+
+        keys, vectors, owners, names, groupes = [], [], {}, {}, {}
+        for key, student_id, blob, groupe_id, full_name in list(template_rows) + [
+            (legacy_key(sid), sid, blob, gid, name) for sid, blob, gid, name in legacy_rows
+        ]:
+            vector = np.frombuffer(blob, dtype=np.float32)
+            if vector.shape[0] != self.dim:
+                print(f"⚠️ Shape mismatch for student {student_id}: {vector.shape}")
+                continue
+            keys.append(key)
+            vectors.append(vector)
+            owners[key] = student_id
+            names[student_id] = full_name
+            groupes[student_id] = groupe_id
+
+        keys = np.asarray(keys, dtype=np.int64)
+        matrix = np.vstack(vectors) if vectors else np.empty((0, self.dim), dtype=np.float32)
+
+        row_groupes = np.asarray([
+            groupes[owners[int(k)]] if groupes[owners[int(k)]] is not None else -1 for k in keys
+        ], dtype=np.int64)
+        partitions = {}
+        for groupe_id in np.unique(row_groupes):
+            if groupe_id < 0:
+                continue
+            members = row_groupes == groupe_id
+            partitions[int(groupe_id)] = build_matcher(keys[members], matrix[members])
+
+        student_keys: dict[int, set[int]] = {}
+        for key, student_id in owners.items():
+            student_keys.setdefault(student_id, set()).add(key)
+
+        with self._lock:
+            self._snapshot = build_matcher(keys, matrix)
+            self._partitions = partitions
+            self._owners = owners
+            self._keys = student_keys
+            self._names = names
+            self._groupes = groupes
+            self.loaded = True
+
+    def add_template(self, student_id: int, template_id: int, embedding, name: str | None = None, groupe_id: int | None = None):
+        """
+        Ajoute un template (StudentEmbedding) à un étudiant. Le template
+        remplace l'éventuel Student.embedding chargé faute de template.
+        `groupe_id` n'est utilisé que pour un étudiant absent de l'index.
+        """
+        vector = self._as_vector(embedding)
+        if vector is None:
+            raise ValueError(f"Embedding must have {self.dim} dimensions")
+
+        with self._lock:
+            if student_id not in self._groupes:
+                self._groupes[student_id] = groupe_id
+            if name is not None:
+                self._names[student_id] = name
+            self._drop_row(legacy_key(student_id))
+            self._add_row(student_id, template_id, vector)
+
+    def remove_templates(self, template_ids):
+        """Retire des templates évincés (voir services/templates.py)"""
+        with self._lock:
+            for template_id in template_ids:
+                self._drop_row(template_id)
+
+    def move(self, student_id: int, groupe_id: int | None):
+        """Déplace un étudiant vers un autre groupe (seules les deux partitions concernées changent)"""
+        with self._lock:
+            if student_id not in self._groupes:
+                return
+            previous_groupe = self._groupes[student_id]
+            if previous_groupe == groupe_id:
+                return
+            for key in self._keys.get(student_id, ()):
+                self._partition_drop(previous_groupe, key)
+                self._partition_add(groupe_id, key, self._snapshot.vector_of(key))
+            self._groupes[student_id] = groupe_id
+
+    def remove(self, student_id: int):
+        with self._lock:
+            for key in list(self._keys.get(student_id, ())):
+                self._drop_row(key)
+            self._keys.pop(student_id, None)
+            self._groupes.pop(student_id, None)
+            self._names.pop(student_id, None)
+
+    def rename(self, student_id: int, name: str):
+        with self._lock:
+            if student_id in self._names:
+                self._names[student_id] = name
+
+    def name_of(self, student_id: int) -> str:
+        return self._names.get(student_id, f"Student {student_id}")
+
+    def _resolve(self, keys: np.ndarray, distances: np.ndarray) -> list[tuple[int | None, float]]:
+        owners = self._owners
+        return [
+            (owners.get(int(key)) if np.isfinite(distance) else None, float(distance))
+            for key, distance in zip(keys, distances)
+        ]
+
+    def match(self, embedding, groupe_id: int | None = None) -> tuple[int | None, float]:
+        """
+        Retourne (student_id, distance euclidienne) du template le plus proche,
+        ou (None, inf) si aucun candidat.
+
+        Avec groupe_id, la recherche est limitée aux étudiants du groupe.
+        Si RECOGNITION_GLOBAL_FALLBACK est activé et qu'aucun étudiant du
+        groupe n'est sous le seuil, on retente sur l'index global.
+        """
+        vector = self._as_vector(embedding)
+        if vector is None:
+            return None, float("inf")
+        return self.match_many(vector[None, :], groupe_id)[0]
+
+    def match_many(self, embeddings, groupe_id: int | None = None) -> list[tuple[int | None, float]]:
+        """Comme `match`, pour une matrice (k, 512) d'embeddings (plusieurs visages d'une même image)"""
+        vectors = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dim)
+        if vectors.shape[0] == 0:
+            return []
+
+        if groupe_id is None:
+            keys, distances = self._snapshot.search_many(vectors)
+        else:
+            keys, distances = self._partitions.get(groupe_id, _empty(self.dim)).search_many(vectors)
+            misses = distances > settings.RECOGNITION_THRESHOLD
+            if settings.RECOGNITION_GLOBAL_FALLBACK and misses.any():
+                keys[misses], distances[misses] = self._snapshot.search_many(vectors[misses])
+
+        return self._resolve(keys, distances)
+
+    def backend(self) -> str:
+        return type(self._snapshot).__name__
+
+    def student_count(self) -> int:
+        return sum(1 for keys in self._keys.values() if keys)
+
+    def __len__(self):
+        return len(self._snapshot)
+
+
+embedding_index = EmbeddingIndex()
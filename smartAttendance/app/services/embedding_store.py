@@ -0,0 +1,97 @@
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+from pathlib import Path
+
+MATRIX_FILE = "embeddings.f32"
+LABELS_FILE = "labels.json"
+CURRENT_FILE = "CURRENT"
+
+
+class EmbeddingStore:
+    """
+    Stockage disque versionné des embeddings de référence.
+
+    Chaque version est un dossier `vNNNNNN/` contenant la matrice float32 brute
+    (`embeddings.f32`, ouverte avec np.memmap) et un sidecar `labels.json`
+    (dimension, nombre de lignes, label de chaque ligne, seuil). Le fichier
+    `CURRENT` désigne la version active et n'est remplacé que par un
+    os.replace atomique: tous les workers partagent le page cache et voient
+    la nouvelle version sans redémarrage.
+    """
+
+    def __init__(self, root: Path, keep_versions: int = 2):
+        self.root = Path(root)
+        self.keep_versions = keep_versions
+
+    @property
+    def _current_path(self) -> Path:
+        return self.root / CURRENT_FILE
+
+    def current_version(self) -> str | None:
+        try:
+            return self._current_path.read_text().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def current_stamp(self) -> tuple[int, int] | None:
+        """Marqueur bon marché (un stat) pour détecter un changement de version: os.replace change l'inode"""
+        try:
+            st = self._current_path.stat()
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns
+
+    def open(self, version: str | None = None):
+        """Retourne (matrice memmap en lecture seule, métadonnées) ou (None, None) si le store est vide"""
+        version = version or self.current_version()
+        if version is None:
+            return None, None
+
+        directory = self.root / version
+        meta = json.loads((directory / LABELS_FILE).read_text())
+        if meta["count"] == 0:
+            return np.empty((0, meta["dim"]), dtype=np.float32), meta
+        matrix = np.memmap(directory / MATRIX_FILE, dtype=np.float32, mode="r", shape=(meta["count"], meta["dim"]))
+        return matrix, meta
+
+    def publish(self, embeddings, labels: list, seuil_distance: float) -> str:
+        """Écrit une nouvelle version puis la rend active atomiquement"""
+        matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if matrix.ndim != 2 or matrix.shape[0] != len(labels):
+            raise ValueError("embeddings must be a 2D matrix with one label per row")
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        existing = sorted(p.name for p in self.root.glob("v*") if p.is_dir())
+        version = f"v{int(existing[-1][1:]) + 1 if existing else 1:06d}"
+
+        staging = Path(tempfile.mkdtemp(prefix=".staging-", dir=self.root))
+        try:
+            with open(staging / MATRIX_FILE, "wb") as f:
+                matrix.tofile(f)
+                f.flush()
+                os.fsync(f.fileno())
+            (staging / LABELS_FILE).write_text(json.dumps({
+                "dim": int(matrix.shape[1]),
+                "count": int(matrix.shape[0]),
+                "labels": list(labels),
+                "seuil_distance": float(seuil_distance),
+            }))
+            os.rename(staging, self.root / version)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        pointer = self.root / f".{CURRENT_FILE}.tmp"
+        pointer.write_text(version)
+        os.replace(pointer, self._current_path)
+
+        self._prune(existing + [version])
+        return version
+
+    def _prune(self, versions: list[str]):
+        # Les anciennes versions restent lisibles par les workers qui les ont déjà mappées (POSIX)
+        for old in versions[:-self.keep_versions]:
+            shutil.rmtree(self.root / old, ignore_errors=True)
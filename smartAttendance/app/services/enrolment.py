@@ -0,0 +1,200 @@
+import json
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable
+import numpy as np
+from app.config import settings
+from app.database import SessionLocal
+from app.models.student import Student
+from app.models.user import User, UserRole
+from app.services.templates import add_templates, sync_index
+
+PHOTO_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+PHOTO_DIR = "uploads/students"
+
+# Statuts du rapport par fichier
+ENROLLED = "enrolled"
+ALREADY_ENROLLED = "already_enrolled"  # Fait lors d'une exécution précédente (reprise)
+UNKNOWN_EMAIL = "unknown_email"
+NO_FACE = "no_face"
+ERROR = "error"
+
+Photo = tuple[str, Callable[[], bytes]]  # (nom du fichier, lecture des octets)
+
+
+def list_photos(source) -> list[Photo]:
+    """
+    Liste les photos `<email>.jpg` d'un dossier ou d'une archive zip (chemin ou
+    fichier ouvert) sous forme de (nom, lecteur): les octets ne sont lus qu'au traitement.
+    """
+    if not isinstance(source, (str, Path)) or not Path(source).is_dir():
+        archive = zipfile.ZipFile(source)
+        return [
+            (info.filename, lambda info=info: archive.read(info))
+            for info in archive.infolist()
+            if not info.is_dir()
+            and not info.filename.startswith("__MACOSX/")
+            and Path(info.filename).suffix.lower() in PHOTO_EXTENSIONS
+        ]
+
+    return [
+        (str(path), path.read_bytes)
+        for path in sorted(Path(source).rglob("*"))
+        if path.is_file() and path.suffix.lower() in PHOTO_EXTENSIONS
+    ]
+
+
+def _load_state(state_path: Path | None) -> dict[str, int]:
+    """Fichiers déjà inscrits par une exécution précédente (une ligne JSON par fichier) -> student_id"""
+    if state_path is None or not state_path.exists():
+        return {}
+    done = {}
+    with open(state_path) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+                done[entry["file"]] = entry["student_id"]
+            except (ValueError, KeyError):
+                continue  # Ligne tronquée par une interruption
+    return done
+
+
+def _record_state(state_path: Path | None, results: list[dict]):
+    if state_path is None:
+        return
+    with open(state_path, "a") as f:
+        for result in results:
+            if result["status"] == ENROLLED:
+                f.write(json.dumps({"file": result["file"], "student_id": result["student_id"]}) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _enrol_chunk(chunk: list[Photo], executor: ThreadPoolExecutor) -> list[dict]:
+    """Une transaction: lookup des étudiants, détection parallèle, un batch FaceNet, écriture"""
+    from app.services.embedding_extractor import extractor
+
+    emails = {Path(name).stem for name, _ in chunk}
+    results = []
+    db = SessionLocal()
+    try:
+        rows = db.query(Student, User).join(User, Student.user_id == User.id).filter(
+            User.email.in_(emails),
+            User.role == UserRole.STUDENT
+        ).all()
+        by_email = {user.email: (student, user) for student, user in rows}
+
+        pending = []  # (résultat, octets) des fichiers dont l'étudiant existe
+        for name, read in chunk:
+            email = Path(name).stem
+            result = {"file": name, "email": email, "student_id": None, "status": None, "detail": None}
+            results.append(result)
+            if email not in by_email:
+                result["status"] = UNKNOWN_EMAIL
+                continue
+            try:
+                pending.append((result, read()))
+            except (OSError, zipfile.BadZipFile) as e:
+                result["status"], result["detail"] = ERROR, str(e)
+
+        # Décodage + MTCNN en parallèle, puis FaceNet en un seul batch pour le chunk
+        faces = list(executor.map(extractor.crop_best_face, [image for _, image in pending]))
+        detected = [(result, image, face) for (result, image), face in zip(pending, faces) if face is not None]
+        for (result, _), face in zip(pending, faces):
+            if face is None:
+                result["status"] = NO_FACE
+        if not detected:
+            return results
+
+        embeddings = extractor.embed_faces(np.stack([face for _, _, face in detected]))
+
+        os.makedirs(PHOTO_DIR, exist_ok=True)
+        items, profiles = [], {}
+        for (result, image, _), embedding in zip(detected, embeddings):
+            student, user = by_email[result["email"]]
+            photo_path = f"{PHOTO_DIR}/{user.email}.jpg"
+            with open(photo_path, "wb") as f:
+                f.write(image)
+            student.photo_path = photo_path
+            student.embedding = embedding.astype(np.float32).tobytes()
+            items.append((student.id, embedding))
+            profiles[student.id] = (user.full_name, student.groupe_id)
+            result["student_id"] = student.id
+
+        learned = add_templates(db, items, is_verified=True)
+        db.commit()
+        sync_index(*learned, profiles=profiles)
+
+        for result, _, _ in detected:
+            result["status"] = ENROLLED
+        return results
+    except Exception as e:
+        db.rollback()
+        for result in results:
+            if result["status"] is None:
+                result["status"], result["detail"] = ERROR, str(e)
+        return results
+    finally:
+        db.close()
+
+
+def _resume(photos: list[Photo], state_path: Path | None) -> tuple[list[dict], list[Photo]]:
+    """(résultats des fichiers déjà inscrits d'après le fichier d'état, photos restantes)"""
+    done = _load_state(state_path)
+    results = [
+        {"file": name, "email": Path(name).stem, "student_id": done[name], "status": ALREADY_ENROLLED, "detail": None}
+        for name, _ in photos if name in done
+    ]
+    return results, [photo for photo in photos if photo[0] not in done]
+
+
+def _report(photos: list[Photo], results: list[dict]) -> dict:
+    summary = {}
+    for result in results:
+        summary[result["status"]] = summary.get(result["status"], 0) + 1
+    return {"total": len(photos), "summary": summary, "files": results}
+
+
+def enrol_photos(photos: list[Photo], state_path: Path | None = None, chunk_size: int | None = None, on_chunk=None) -> dict:
+    """
+    Inscription en masse: photos traitées par chunks de ENROL_CHUNK_SIZE, chaque
+    chunk dans sa propre transaction. Les fichiers inscrits sont ajoutés au
+    fichier d'état après chaque commit; relancer avec le même `state_path`
+    reprend là où l'exécution précédente s'est arrêtée.
+    """
+    chunk_size = chunk_size or settings.ENROL_CHUNK_SIZE
+    results, todo = _resume(photos, state_path)
+
+    with ThreadPoolExecutor(max_workers=settings.ENROL_WORKERS, thread_name_prefix="enrol") as executor:
+        for start in range(0, len(todo), chunk_size):
+            chunk_results = _enrol_chunk(todo[start:start + chunk_size], executor)
+            _record_state(state_path, chunk_results)
+            results.extend(chunk_results)
+            if on_chunk:
+                on_chunk(len(results), len(photos))
+
+    return _report(photos, results)
+
+
+async def enrol_photos_pooled(photos: list[Photo], pool, state_path: Path | None = None, chunk_size: int | None = None) -> dict:
+    """
+    Comme enrol_photos, depuis la boucle d'événements: chaque chunk est une
+    tâche de `pool` (inference_pool), en concurrence bornée avec la
+    reconnaissance. Pool saturé: PoolSaturated (503) remonte, les chunks
+    déjà commités sont dans le fichier d'état et un nouvel envoi reprend.
+    """
+    chunk_size = chunk_size or settings.ENROL_CHUNK_SIZE
+    results, todo = _resume(photos, state_path)
+
+    def run_chunk(chunk: list[Photo], executor: ThreadPoolExecutor) -> list[dict]:
+        chunk_results = _enrol_chunk(chunk, executor)
+        _record_state(state_path, chunk_results)
+        return chunk_results
+
+    with ThreadPoolExecutor(max_workers=settings.ENROL_WORKERS, thread_name_prefix="enrol") as executor:
+        for start in range(0, len(todo), chunk_size):
+            results.extend(await pool.run(run_chunk, todo[start:start + chunk_size], executor))
+
+    return _report(photos, results)
@@ -1,51 +1,75 @@
 import pickle
 import numpy as np
 from pathlib import Path
+from app.services.embedding_store import EmbeddingStore
+from app.services.matchers import build_matcher
 
 class FaceRecognitionService:
     def __init__(self):
-        self.embeddings_path = Path("models/embeddings_database.pkl")
+        self.legacy_pickle_path = Path("models/embeddings_database.pkl")
+        self.store = EmbeddingStore(Path("models/embedding_store"))
         self.embeddings_db = None
+        self.matcher = None
         self.noms_etudiants = []
         self.seuil_distance = 0.9
-    
+        self._stamp = None
+
+    def _migrate_legacy_pickle(self):
+        """Conversion unique de l'ancien embeddings_database.pkl vers le store memmap"""
+        with open(self.legacy_pickle_path, 'rb') as f:
+            data = pickle.load(f)
+        embeddings = np.asarray(data['embeddings'], dtype=np.float32)
+        noms = list(data['noms_etudiants'])
+        row_labels = data.get('labels', range(len(embeddings)))
+        self.store.publish(embeddings, [noms[int(l)] for l in row_labels], data['seuil_distance'])
+
     def load_embeddings(self):
-        if self.embeddings_db is None:
-            if self.embeddings_path.exists():
-                with open(self.embeddings_path, 'rb') as f:
-                    data = pickle.load(f)
-                    self.embeddings_db = data['embeddings']
-                    self.noms_etudiants = data['noms_etudiants']
-                    self.seuil_distance = data['seuil_distance']
-    
+        """Charge (ou recharge si une nouvelle version a été publiée) la matrice memmap"""
+        stamp = self.store.current_stamp()
+        if stamp is None and self.legacy_pickle_path.exists():
+            self._migrate_legacy_pickle()
+            stamp = self.store.current_stamp()
+
+        if stamp is None or stamp == self._stamp:
+            return
+
+        matrix, meta = self.store.open()
+        self.embeddings_db = matrix
+        # Le moteur exact travaille directement sur le memmap (pas de copie, partagé par le cache de pages);
+        # l'IVF répartit la galerie en listes (copies en mémoire du worker)
+        self.matcher = build_matcher(np.arange(len(matrix)), matrix)
+        self.noms_etudiants = meta['labels']
+        self.seuil_distance = meta['seuil_distance']
+        self._stamp = stamp
+
     def recognize_face(self, embedding):
         """
         Reconnaissance par distance euclidienne.
         Pas de SVM, juste comparaison de similarité.
         """
         self.load_embeddings()
-        
-        if self.embeddings_db is None:
+
+        if self.embeddings_db is None or len(self.embeddings_db) == 0:
             return None, 0.0
-        
-        # Calculer distances avec TOUS les embeddings
-        distances = np.linalg.norm(self.embeddings_db - embedding, axis=1)
-        
-        # Trouver le plus proche
-        min_idx = np.argmin(distances)
-        min_distance = distances[min_idx]
-        
+
+        # Trouver le plus proche (balayage exact ou IVF selon la taille de la galerie)
+        min_idx, min_distance = self.matcher.search(np.asarray(embedding, dtype=np.float32).ravel())
+
         # Vérifier le seuil
         if min_distance > self.seuil_distance:
             return None, 0.0
-        
+
         # Récupérer le nom
-        label = self.embeddings_db['labels'][min_idx] if 'labels' in self.embeddings_db else min_idx
-        nom = self.noms_etudiants[label]
-        
+        nom = self.noms_etudiants[min_idx]
+
         # Calculer confiance (1 = identique, 0 = seuil)
         confidence = 1 - (min_distance / self.seuil_distance)
-        
+
         return nom, confidence
 
-face_service = FaceRecognitionService()
\ No newline at end of file
+    def publish_embeddings(self, embeddings, noms, seuil_distance=None):
+        """Publie une nouvelle version; les autres workers la chargeront à leur prochain appel"""
+        self.store.publish(embeddings, noms, seuil_distance if seuil_distance is not None else self.seuil_distance)
+        self.load_embeddings()
+
+face_service = FaceRecognitionService()
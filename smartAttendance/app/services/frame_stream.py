@@ -0,0 +1,138 @@
+import asyncio
+import itertools
+import numpy as np
+from app.services.embedding_extractor import extractor
+
+
+def iou(a, b) -> float:
+    """Intersection sur union de deux boîtes (x, y, w, h)"""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    inter_w = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    inter_h = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = inter_w * inter_h
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+class Track:
+    def __init__(self, track_id: int, box):
+        self.id = track_id
+        self.box = box
+        self.attempted_box = None  # Boîte du dernier passage dans FaceNet
+        self.student_id: int | None = None
+        self.missed = 0
+
+
+class FaceTracker:
+    """
+    Suivi des visages d'une caméra d'un frame à l'autre, par recouvrement
+    des boîtes (IoU, appariement glouton). Un visage n'est envoyé à FaceNet
+    que s'il est nouveau, ou pas encore reconnu et déplacé depuis le dernier
+    essai (IoU < change_iou); un visage reconnu garde son étudiant tant qu'il
+    reste suivi. Une piste disparaît après `max_missed` frames sans visage.
+    """
+
+    def __init__(self, match_iou: float, change_iou: float, max_missed: int):
+        self.match_iou = match_iou
+        self.change_iou = change_iou
+        self.max_missed = max_missed
+        self.tracks: list[Track] = []
+        self._ids = itertools.count(1)
+
+    def update(self, boxes) -> tuple[list[Track], list[int]]:
+        """Pistes des boîtes (même ordre), et indices des boîtes à reconnaître"""
+        pairs = sorted(
+            ((iou(track.box, box), t, b) for t, track in enumerate(self.tracks) for b, box in enumerate(boxes)),
+            reverse=True
+        )
+        assigned: dict[int, Track] = {}
+        used = set()
+        for overlap, t, b in pairs:
+            if overlap < self.match_iou:
+                break
+            if t in used or b in assigned:
+                continue
+            assigned[b] = self.tracks[t]
+            used.add(t)
+
+        for t, track in enumerate(self.tracks):
+            if t not in used:
+                track.missed += 1
+        self.tracks = [track for t, track in enumerate(self.tracks) if t in used or track.missed <= self.max_missed]
+
+        tracks, to_recognize = [], []
+        for b, box in enumerate(boxes):
+            track = assigned.get(b)
+            if track is None:
+                track = Track(next(self._ids), box)
+                self.tracks.append(track)
+            track.box = box
+            track.missed = 0
+            if track.student_id is None and (
+                track.attempted_box is None or iou(track.attempted_box, box) < self.change_iou
+            ):
+                track.attempted_box = box
+                to_recognize.append(b)
+            tracks.append(track)
+        return tracks, to_recognize
+
+
+class AdaptiveRate:
+    """
+    Intervalle entre deux détections: au minimum quand des visages
+    nouveaux arrivent, allongé (x1.5 jusqu'au maximum) quand la scène est
+    stable, et jamais plus court que la dernière durée de traitement.
+    """
+
+    def __init__(self, min_interval: float, max_interval: float):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+
+    def update(self, processing: float, busy: bool) -> float:
+        if busy:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * 1.5)
+        self.interval = max(self.interval, processing)
+        return self.interval
+
+
+class LatestFrame:
+    """Boîte à un emplacement: un frame reçu remplace celui qui attend encore (compté comme jeté)"""
+
+    def __init__(self):
+        self._frame: bytes | None = None
+        self._ready = asyncio.Event()
+        self.received = 0
+        self.dropped = 0
+
+    def put(self, frame: bytes):
+        self.received += 1
+        if self._frame is not None:
+            self.dropped += 1
+        self._frame = frame
+        self._ready.set()
+
+    async def take(self) -> bytes:
+        await self._ready.wait()
+        frame, self._frame = self._frame, None
+        self._ready.clear()
+        return frame
+
+
+def analyse_frame(frame: bytes, tracker: FaceTracker):
+    """
+    Dans le pool d'inférence: détection, suivi, puis FaceNet sur les seuls
+    visages à reconnaître. Retourne (pistes, indices reconnus, embeddings),
+    ou None si l'image est illisible.
+    """
+    detected = extractor.detect_faces(frame)
+    if detected is None:
+        return None
+    tracks, to_recognize = tracker.update([box for box, _ in detected])
+    if not to_recognize:
+        return tracks, [], np.empty((0, 512), dtype=np.float32)
+    embeddings = extractor.embed_faces(np.stack([detected[b][1] for b in to_recognize]))
+    return tracks, to_recognize, embeddings
@@ -0,0 +1,306 @@
+import numpy as np
+from app.config import settings
+
+
+class Matcher:
+    """
+    Interface commune des moteurs de recherche du plus proche voisin.
+
+    `with_row` / `without_row` retournent un nouveau matcher et le matcher
+    d'origine reste lisible tel quel (au plus, une ligne supprimée y devient
+    introuvable): les lecteurs travaillent sur un snapshot sans verrou.
+    L'écrivain (sous le verrou de l'index) dérive toujours du dernier matcher.
+    """
+
+    def search(self, vector: np.ndarray) -> tuple[int | None, float]:
+        ids, distances = self.search_many(vector[None, :])
+        return (int(ids[0]) if np.isfinite(distances[0]) else None), float(distances[0])
+
+    def search_many(self, vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        raise NotImplementedError
+
+    def with_row(self, row_id: int, vector: np.ndarray) -> "Matcher":
+        raise NotImplementedError
+
+    def without_row(self, row_id: int) -> "Matcher":
+        raise NotImplementedError
+
+    def vector_of(self, row_id: int) -> np.ndarray | None:
+        raise NotImplementedError
+
+    def rows(self) -> tuple[np.ndarray, np.ndarray]:
+        """(ids, matrice) des lignes vivantes, pour reconstruire un autre moteur"""
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+
+def _no_match(count: int):
+    # Les ids peuvent être négatifs: c'est la distance infinie qui signale l'absence de match
+    return np.zeros(count, dtype=np.int64), np.full(count, np.inf)
+
+
+def _nearest(ids, matrix, sq_norms, vectors):
+    # ||a - b||² = ||a||² - 2 a.b + ||b||²
+    sq_distances = (
+        sq_norms[None, :]
+        - 2.0 * (vectors @ matrix.T)
+        + np.einsum("ij,ij->i", vectors, vectors)[:, None]
+    )
+    best = np.argmin(sq_distances, axis=1)
+    best_sq = np.maximum(sq_distances[np.arange(len(vectors)), best], 0.0)
+    return ids[best], np.sqrt(best_sq)
+
+
+def _capacity(rows: int) -> int:
+    # Marge de 25% (croissance géométrique: ajouts en O(1) amorti)
+    return rows + max(8, rows // 4)
+
+
+class _Gallery:
+    """
+    Tampons à capacité partagés par les ExactMatcher successifs d'une même lignée.
+
+    Sans marge (capacity == nombre de lignes), `ids` et `matrix` sont ceux
+    de l'appelant, sans copie: le memmap de l'EmbeddingStore reste partagé
+    entre workers par le cache de pages. Seules les normes (écrites par les
+    pierres tombales) sont propres à la galerie; le premier ajout recopie
+    dans des tampons à marge (ExactMatcher._writable).
+    """
+
+    def __init__(self, ids: np.ndarray, matrix: np.ndarray, capacity: int):
+        rows, dim = matrix.shape
+        if capacity == rows:
+            self.ids = ids
+            self.matrix = matrix
+        else:
+            self.ids = np.empty(capacity, dtype=np.int64)
+            self.matrix = np.empty((capacity, dim), dtype=np.float32)
+            self.ids[:rows] = ids
+            self.matrix[:rows] = matrix
+        self.sq_norms = np.empty(capacity, dtype=np.float32)
+        self.sq_norms[:rows] = np.einsum("ij,ij->i", matrix, matrix)
+        self.positions = {int(row_id): position for position, row_id in enumerate(ids)}  # Lignes vivantes du dernier matcher
+        self.version = 0
+
+
+class ExactMatcher(Matcher):
+    """
+    Balayage exact: une seule multiplication matricielle sur toute la galerie.
+
+    Les lignes vivent dans un tampon à capacité (_Gallery) partagé avec les
+    matchers précédents: un ajout écrit après la dernière ligne, une
+    suppression pose une pierre tombale (norme infinie: jamais la plus
+    proche). Pas de copie de la galerie par template appris ou évincé; un
+    ancien matcher garde sa longueur et ne voit pas les ajouts suivants.
+    Le tampon n'est recopié que plein, à moitié fait de pierres tombales,
+    ou si l'on dérive d'un matcher qui n'est plus le dernier. Construit, le
+    matcher lit directement `matrix` (memmap compris): la marge n'est
+    allouée qu'au premier ajout.
+    """
+
+    def __init__(self, ids: np.ndarray, matrix: np.ndarray):
+        ids = np.asarray(ids, dtype=np.int64)
+        matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        self._gallery = _Gallery(ids, matrix, len(ids))
+        self._set_view(len(ids), len(ids))
+
+    def _set_view(self, size: int, count: int):
+        self._size = size
+        self._count = count
+        self._version = self._gallery.version
+        self.ids = self._gallery.ids[:size]
+        self.matrix = self._gallery.matrix[:size]
+        self.sq_norms = self._gallery.sq_norms[:size]
+
+    def _derive(self, size: int, count: int) -> "ExactMatcher":
+        self._gallery.version += 1
+        clone = object.__new__(ExactMatcher)
+        clone._gallery = self._gallery
+        clone._set_view(size, count)
+        return clone
+
+    def _writable(self, extra: int) -> "ExactMatcher":
+        """Ce matcher s'il peut écrire en place dans le tampon, sinon une copie compactée"""
+        is_latest = self._version == self._gallery.version
+        has_room = self._size + extra <= len(self._gallery.ids)
+        mostly_live = self._size - self._count <= self._count
+        if is_latest and has_room and mostly_live:
+            return self
+        ids, matrix = self.rows()
+        compacted = object.__new__(ExactMatcher)
+        compacted._gallery = _Gallery(ids, matrix, _capacity(len(ids) + extra))
+        compacted._set_view(len(ids), len(ids))
+        return compacted
+
+    def search_many(self, vectors):
+        if self._count == 0:
+            return _no_match(len(vectors))
+        return _nearest(self.ids, self.matrix, self.sq_norms, vectors)
+
+    def with_row(self, row_id, vector):
+        base = self._writable(1)
+        gallery = base._gallery
+        count = base._count
+        position = gallery.positions.pop(row_id, None)
+        if position is not None:
+            gallery.sq_norms[position] = np.inf
+            count -= 1
+        gallery.ids[base._size] = row_id
+        gallery.matrix[base._size] = vector
+        gallery.sq_norms[base._size] = np.dot(gallery.matrix[base._size], gallery.matrix[base._size])
+        gallery.positions[row_id] = base._size
+        return base._derive(base._size + 1, count + 1)
+
+    def without_row(self, row_id):
+        if self.vector_of(row_id) is None:
+            return self
+        base = self._writable(0)
+        position = base._gallery.positions.pop(row_id)
+        base._gallery.sq_norms[position] = np.inf
+        return base._derive(base._size, base._count - 1)
+
+    def vector_of(self, row_id):
+        if self._version == self._gallery.version:
+            position = self._gallery.positions.get(row_id)
+            return None if position is None else self.matrix[position]
+        positions = np.flatnonzero((self.ids == row_id) & np.isfinite(self.sq_norms))
+        return self.matrix[positions[0]] if positions.size else None
+
+    def rows(self):
+        live = np.isfinite(self.sq_norms)
+        return self.ids[live], self.matrix[live]
+
+    def __len__(self):
+        return self._count
+
+
+class IVFMatcher(Matcher):
+    """
+    Recherche approchée type IVF: un quantificateur grossier (k-means, ~√N
+    centroïdes) répartit la galerie en listes; une requête ne compare qu'aux
+    `nprobe` listes dont le centroïde est le plus proche.
+    Les ajouts/suppressions ne touchent qu'une liste; le k-means est relancé
+    quand la galerie a doublé depuis l'entraînement.
+    """
+
+    def __init__(self, ids, matrix, nprobe: int, centroids: np.ndarray | None = None, n_iter: int = 10, seed: int = 0):
+        ids = np.asarray(ids, dtype=np.int64)
+        matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        self.nprobe = nprobe
+        self.size = len(ids)
+        self.centroids = centroids if centroids is not None else self._train(matrix, n_iter, seed)
+        self.trained_size = len(ids)
+
+        assignments = self._assign(matrix)
+        self.lists = []
+        for list_no in range(len(self.centroids)):
+            members = assignments == list_no
+            self.lists.append(ExactMatcher(ids[members], matrix[members]))
+        self._list_of = {int(row_id): int(list_no) for row_id, list_no in zip(ids, assignments)}
+
+    @staticmethod
+    def _train(matrix: np.ndarray, n_iter: int, seed: int) -> np.ndarray:
+        rng = np.random.default_rng(seed)
+        nlist = max(1, int(np.sqrt(len(matrix))))
+        sample = matrix[rng.choice(len(matrix), size=min(len(matrix), nlist * 64), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(n_iter):
+            labels = _nearest(np.arange(nlist), centroids, np.einsum("ij,ij->i", centroids, centroids), sample)[0]
+            for list_no in range(nlist):
+                members = sample[labels == list_no]
+                if len(members):
+                    centroids[list_no] = members.mean(axis=0)
+        return centroids
+
+    def _assign(self, matrix: np.ndarray, chunk: int = 4096) -> np.ndarray:
+        if len(matrix) == 0:
+            return np.empty(0, dtype=np.int64)
+        sq = np.einsum("ij,ij->i", self.centroids, self.centroids)
+        labels = np.arange(len(self.centroids))
+        return np.concatenate([
+            _nearest(labels, self.centroids, sq, matrix[start:start + chunk])[0]
+            for start in range(0, len(matrix), chunk)
+        ])
+
+    def _probe_lists(self, vectors: np.ndarray) -> np.ndarray:
+        sq_distances = (
+            np.einsum("ij,ij->i", self.centroids, self.centroids)[None, :]
+            - 2.0 * (vectors @ self.centroids.T)
+        )
+        nprobe = min(self.nprobe, len(self.centroids))
+        return np.argpartition(sq_distances, nprobe - 1, axis=1)[:, :nprobe]
+
+    def search_many(self, vectors):
+        ids, distances = _no_match(len(vectors))
+        for row, probed in enumerate(self._probe_lists(vectors)):
+            for list_no in probed:
+                candidate_ids, candidate_distances = self.lists[list_no].search_many(vectors[row:row + 1])
+                if candidate_distances[0] < distances[row]:
+                    ids[row], distances[row] = candidate_ids[0], candidate_distances[0]
+        return ids, distances
+
+    def _copy_with(self, list_no: int, new_list: ExactMatcher, size: int) -> "IVFMatcher":
+        clone = object.__new__(IVFMatcher)
+        clone.nprobe = self.nprobe
+        clone.centroids = self.centroids
+        clone.trained_size = self.trained_size
+        clone.size = size
+        clone.lists = list(self.lists)
+        clone.lists[list_no] = new_list
+        clone._list_of = self._list_of  # Partagé, tenu à jour par l'écrivain (seul le dernier matcher le lit)
+        return clone
+
+    def with_row(self, row_id, vector):
+        current = self._list_of.get(row_id)
+        base = self.without_row(row_id) if current is not None else self
+        list_no = int(base._assign(vector[None, :])[0])
+        clone = base._copy_with(list_no, base.lists[list_no].with_row(row_id, vector), base.size + 1)
+        clone._list_of[row_id] = list_no
+        return clone
+
+    def without_row(self, row_id):
+        list_no = self._list_of.get(row_id)
+        if list_no is None:
+            return self
+        clone = self._copy_with(list_no, self.lists[list_no].without_row(row_id), self.size - 1)
+        del clone._list_of[row_id]
+        return clone
+
+    def vector_of(self, row_id):
+        list_no = self._list_of.get(row_id)
+        return None if list_no is None else self.lists[list_no].vector_of(row_id)
+
+    def rows(self):
+        rows = [l.rows() for l in self.lists]
+        return np.concatenate([ids for ids, _ in rows]), np.vstack([matrix for _, matrix in rows])
+
+    def __len__(self):
+        return self.size
+
+
+def build_matcher(ids, matrix) -> Matcher:
+    """
+    Choisit le moteur selon MATCHER_BACKEND: "exact", "ivf", ou "auto"
+    (IVF à partir de ANN_MIN_GALLERY_SIZE embeddings).
+    """
+    backend = settings.MATCHER_BACKEND
+    if backend == "auto":
+        backend = "ivf" if len(ids) >= settings.ANN_MIN_GALLERY_SIZE else "exact"
+    if backend == "ivf" and len(ids) > 0:
+        return IVFMatcher(ids, matrix, nprobe=settings.ANN_NPROBE)
+    return ExactMatcher(ids, matrix)
+
+
+def rebalance(matcher: Matcher) -> Matcher:
+    """Après un ajout/suppression: change de moteur si le seuil est franchi, ré-entraîne l'IVF si la galerie a doublé"""
+    backend = settings.MATCHER_BACKEND
+    wants_ivf = backend == "ivf" or (backend == "auto" and len(matcher) >= settings.ANN_MIN_GALLERY_SIZE)
+    if isinstance(matcher, IVFMatcher):
+        if wants_ivf and len(matcher) <= 2 * matcher.trained_size:
+            return matcher
+        return build_matcher(*matcher.rows())
+    if wants_ivf and len(matcher):
+        return build_matcher(*matcher.rows())
+    return matcher
@@ -1,18 +1,58 @@
 from sqlalchemy.orm import Session
-from app.models.attendance import Attendance
-from app.models.seance import Seance
+from app.models.attendance_rollup import StudentAttendanceRollup
+
+
+def calculate_presence_percentages(student_ids, db: Session) -> dict[int, float]:
+    """
+    Pourcentages de présence de plusieurs étudiants en une seule requête,
+    lue dans les rollups par étudiant (voir services/attendance_service.py).
+    Les étudiants sans séance ont 0.0.
+    """
+    student_ids = list(student_ids)
+    percentages = {student_id: 0.0 for student_id in student_ids}
+    if not student_ids:
+        return percentages
+
+    rows = db.query(
+        StudentAttendanceRollup.student_id,
+        StudentAttendanceRollup.present,
+        StudentAttendanceRollup.late,
+        StudentAttendanceRollup.absent
+    ).filter(StudentAttendanceRollup.student_id.in_(student_ids)).all()
+
+    for student_id, present, late, absent in rows:
+        total_seances = present + late + absent
+        if total_seances:
+            percentages[student_id] = round((present / total_seances) * 100, 1)
+    return percentages
+
 
 def calculate_presence_percentage(student_id: int, db: Session) -> float:
     """
     Calcule le pourcentage de présence d'un étudiant
     """
-    total_seances = db.query(Seance).join(Attendance).filter(Attendance.student_id == student_id).count()
-    if total_seances == 0:
-        return 0.0
-    
-    presents = db.query(Attendance).filter(
-        Attendance.student_id == student_id,
-        Attendance.statut == "present"
-    ).count()
-    
-    return round((presents / total_seances) * 100, 1)
\ No newline at end of file
+    return calculate_presence_percentages([student_id], db)[student_id]
+
+
+def student_payloads(rows, db: Session) -> list[dict]:
+    """
+    Lignes (Student, User) -> dicts StudentResponse, avec les pourcentages
+    de présence du lot en une requête (listes paginées et flux NDJSON).
+    """
+    presences = calculate_presence_percentages([student.id for student, _ in rows], db)
+    return [
+        {
+            "id": student.id,
+            "user_id": user.id,
+            "groupe_id": student.groupe_id,
+            "photo_path": student.photo_path,
+            "user": {
+                "id": user.id,
+                "email": user.email,
+                "full_name": user.full_name,
+                "is_active": user.is_active
+            },
+            "presence_percentage": presences[student.id]
+        }
+        for student, user in rows
+    ]
@@ -0,0 +1,234 @@
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.orm import Session, joinedload
+from app.config import settings
+from app.models.attendance import Attendance
+from app.models.seance import Seance
+
+
+def _normalize_status(status) -> str:
+    # Import local: attendance_service importe ce module
+    from app.services.attendance_service import _normalize_status
+    return _normalize_status(status)
+
+
+class SeanceRecognitionState:
+    """
+    État de reconnaissance d'une séance ouverte, par processus: horaires et
+    groupe (pour calculate_attendance_status et le matching, sans relire la
+    séance), statut des étudiants déjà marqués, et sondes récentes (embedding
+    -> résultat du matching) pour ne pas refaire le matching d'un même visage.
+    """
+
+    def __init__(self, seance, marked: dict[int, str], probe_ttl: float, probe_epsilon: float, max_probes: int):
+        self.id = seance.id
+        self.groupe_id = seance.cours.groupe_id if seance.cours else None
+        self.heure_debut = seance.heure_debut
+        self.heure_fin = seance.heure_fin
+        self.probe_ttl = probe_ttl
+        self.probe_epsilon = probe_epsilon
+        self.max_probes = max_probes
+        self._marked = {student_id: _normalize_status(status) for student_id, status in marked.items()}
+        self._probes: list[tuple[float, np.ndarray, int | None, float]] = []
+        self._lock = threading.Lock()
+        self.last_used = time.monotonic()
+
+    def status_of(self, student_id: int) -> str | None:
+        """Statut déjà enregistré pour l'étudiant dans cette séance, ou None"""
+        with self._lock:
+            return self._marked.get(student_id)
+
+    def mark(self, student_id: int, status: str):
+        with self._lock:
+            self._marked[student_id] = _normalize_status(status)
+
+    def lookup_probe(self, embedding) -> tuple[int | None, float] | None:
+        """Résultat d'une sonde récente à moins de probe_epsilon de `embedding`, ou None"""
+        now = time.monotonic()
+        with self._lock:
+            self._probes = [probe for probe in self._probes if probe[0] > now]
+            if not self._probes:
+                return None
+            vectors = np.stack([probe[1] for probe in self._probes])
+            distances = np.linalg.norm(vectors - np.asarray(embedding, dtype=np.float32), axis=1)
+            nearest = int(np.argmin(distances))
+            if distances[nearest] > self.probe_epsilon:
+                return None
+            _, _, student_id, distance = self._probes[nearest]
+            return student_id, distance
+
+    def remember_probe(self, embedding, student_id: int | None, distance: float):
+        with self._lock:
+            self._probes.append((time.monotonic() + self.probe_ttl, np.asarray(embedding, dtype=np.float32), student_id, distance))
+            del self._probes[:-self.max_probes]
+
+
+class RecognitionCache:
+    """
+    États de reconnaissance par séance (SeanceRecognitionState), pour que la
+    re-reconnaissance d'un étudiant déjà marqué s'arrête avant la base.
+
+    Une séance terminée ici (end_seance, balayage) est évincée au commit de
+    sa clôture; terminée par un autre processus, elle est détectée à la
+    première écriture (la séance y est relue) ou expire après idle_ttl sans
+    reconnaissance. Les étudiants marqués par un autre processus sont
+    appris au premier conflit d'insertion.
+    """
+
+    def __init__(self, idle_ttl: float, probe_ttl: float, probe_epsilon: float, max_probes: int, max_seances: int):
+        self.idle_ttl = idle_ttl
+        self.probe_ttl = probe_ttl
+        self.probe_epsilon = probe_epsilon
+        self.max_probes = max_probes
+        self.max_seances = max_seances
+        self._states: OrderedDict[int, SeanceRecognitionState] = OrderedDict()
+        self._lock = threading.Lock()
+        self._probe_hits = 0
+        self._probe_misses = 0
+        self._short_circuits = 0
+        self._evictions = 0
+
+    def get(self, seance_id: int) -> SeanceRecognitionState | None:
+        with self._lock:
+            state = self._states.get(seance_id)
+            if state is None:
+                return None
+            if state.last_used + self.idle_ttl < time.monotonic():
+                del self._states[seance_id]
+                return None
+            state.last_used = time.monotonic()
+            self._states.move_to_end(seance_id)
+            return state
+
+    def open(self, seance, marked: dict[int, str]) -> SeanceRecognitionState:
+        """État d'une séance active (cours chargé) et de ses présences déjà enregistrées"""
+        state = SeanceRecognitionState(seance, marked, self.probe_ttl, self.probe_epsilon, self.max_probes)
+        with self._lock:
+            self._states[seance.id] = state
+            while len(self._states) > self.max_seances:
+                self._states.popitem(last=False)
+        return state
+
+    def match(self, state: SeanceRecognitionState, embedding, match_fn) -> tuple[int | None, float]:
+        """`match_fn(embedding)` sauf si une sonde récente de la séance est assez proche"""
+        cached = state.lookup_probe(embedding)
+        with self._lock:
+            if cached is not None:
+                self._probe_hits += 1
+            else:
+                self._probe_misses += 1
+        if cached is not None:
+            return cached
+        student_id, distance = match_fn(embedding)
+        state.remember_probe(embedding, student_id, distance)
+        return student_id, distance
+
+    def already_marked(self, state: SeanceRecognitionState, student_id: int) -> str | None:
+        """Statut si l'étudiant est déjà marqué (compté comme court-circuit), sinon None"""
+        status = state.status_of(student_id)
+        if status is not None:
+            with self._lock:
+                self._short_circuits += 1
+        return status
+
+    def evict(self, seance_id: int):
+        with self._lock:
+            if self._states.pop(seance_id, None) is not None:
+                self._evictions += 1
+
+    def mark_after_commit(self, db: Session, seance_id: int, marks: list[tuple[int, str]]):
+        """Marque les étudiants dans l'état de la séance quand leurs présences sont commitées"""
+        db.info.setdefault("recognition_marks", []).append((seance_id, marks))
+
+    def evict_after_commit(self, db: Session, seance_id: int):
+        """Évince quand la clôture de la séance est commitée"""
+        db.info.setdefault("evict_seances", set()).add(seance_id)
+
+    def match_many(self, state: SeanceRecognitionState, embeddings, match_many_fn) -> list[tuple[int | None, float]]:
+        """Comme `match`, un seul appel à `match_many_fn` pour les embeddings sans sonde récente"""
+        results = [state.lookup_probe(embedding) for embedding in embeddings]
+        misses = [row for row, result in enumerate(results) if result is None]
+        with self._lock:
+            self._probe_hits += len(results) - len(misses)
+            self._probe_misses += len(misses)
+        if misses:
+            for row, (student_id, distance) in zip(misses, match_many_fn(np.stack([embeddings[row] for row in misses]))):
+                state.remember_probe(embeddings[row], student_id, distance)
+                results[row] = (student_id, distance)
+        return results
+
+    def metrics(self) -> dict:
+        with self._lock:
+            lookups = self._probe_hits + self._probe_misses
+            return {
+                "seances": len(self._states),
+                "probe_hits": self._probe_hits,
+                "probe_misses": self._probe_misses,
+                "probe_hit_rate": round(self._probe_hits / lookups, 3) if lookups else 0.0,
+                "already_marked_short_circuits": self._short_circuits,
+                "evictions": self._evictions,
+            }
+
+
+recognition_cache = RecognitionCache(
+    settings.RECOGNITION_CACHE_IDLE_TTL,
+    settings.RECOGNITION_PROBE_TTL,
+    settings.RECOGNITION_PROBE_EPSILON,
+    settings.RECOGNITION_PROBE_MAX_ENTRIES,
+    settings.RECOGNITION_CACHE_MAX_SEANCES,
+)
+
+
+def seance_state(db: Session, seance_id: int) -> SeanceRecognitionState:
+    """
+    État de reconnaissance d'une séance active, commun à toutes les routes
+    de reconnaissance: la séance, son cours et ses présences ne sont lus
+    qu'à la première reconnaissance (ou après une éviction).
+    """
+    state = recognition_cache.get(seance_id)
+    if state is not None:
+        return state
+    seance = db.query(Seance).options(joinedload(Seance.cours)).filter(Seance.id == seance_id).first()
+    if not seance:
+        raise HTTPException(status_code=404, detail="Séance not found")
+    if not seance.is_active:
+        raise HTTPException(status_code=400, detail="Cette séance est terminée")
+    if seance.cours is None:
+        raise HTTPException(status_code=404, detail="Cours not found")
+    marked = db.query(Attendance.student_id, Attendance.status).filter(Attendance.seance_id == seance_id).all()
+    return recognition_cache.open(seance, dict(marked))
+
+
+def active_seance(db: Session, seance_id: int) -> Seance | None:
+    """Séance relue avant d'écrire: terminée (ici ou par un autre worker), son état est évincé"""
+    seance = db.query(Seance).options(joinedload(Seance.cours)).filter(
+        Seance.id == seance_id
+    ).populate_existing().first()
+    if seance is None or not seance.is_active:
+        recognition_cache.evict(seance_id)
+        return None
+    return seance
+
+
+@event.listens_for(Session, "after_commit")
+def _flush_recognition_state(session: Session):
+    if session.in_nested_transaction():
+        return
+    for seance_id, marks in session.info.pop("recognition_marks", ()):
+        state = recognition_cache.get(seance_id)
+        if state is not None:
+            for student_id, status in marks:
+                state.mark(student_id, status)
+    for seance_id in session.info.pop("evict_seances", ()):
+        recognition_cache.evict(seance_id)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _drop_recognition_state(session: Session, transaction):
+    if transaction.parent is None:
+        session.info.pop("recognition_marks", None)
+        session.info.pop("evict_seances", None)
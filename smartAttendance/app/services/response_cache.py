@@ -0,0 +1,173 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.config import settings
+
+
+class MemoryCacheBackend:
+    """Backend par défaut: LRU en mémoire du processus, avec expiration par entrée"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._generations: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def generation(self, scope: str) -> int:
+        return self._generations.get(scope, 0)
+
+    def bump(self, scope: str):
+        with self._lock:
+            self._generations[scope] = self._generations.get(scope, 0) + 1
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    """Backend partagé entre workers (paquet `redis` requis); LRU assuré par maxmemory-policy côté Redis"""
+
+    def __init__(self, url: str, prefix: str = "sa:cache:"):
+        import redis
+        self._redis = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key: str) -> str | None:
+        value = self._redis.get(self.prefix + key)
+        return value.decode() if value is not None else None
+
+    def set(self, key: str, value: str, ttl: float):
+        self._redis.set(self.prefix + key, value, px=int(ttl * 1000))
+
+    def generation(self, scope: str) -> int:
+        return int(self._redis.get(self.prefix + "gen:" + scope) or 0)
+
+    def bump(self, scope: str):
+        self._redis.incr(self.prefix + "gen:" + scope)
+
+    def size(self) -> int:
+        return -1  # Non suivi: la base Redis peut être partagée
+
+
+class ResponseCache:
+    """
+    Cache des réponses des pages enseignant, clé (endpoint, enseignant, paramètres).
+
+    L'invalidation est faite par génération: chaque enseignant a un compteur
+    inclus dans les clés, et `invalidate_teacher` l'incrémente, ce qui rend
+    toutes ses entrées inaccessibles d'un coup (elles expirent ensuite par TTL
+    ou sont évincées par le LRU). Les valeurs sont stockées en JSON.
+    """
+
+    def __init__(self, backend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    def _key(self, endpoint: str, teacher_id: int, params: dict | None) -> str:
+        generation = self.backend.generation(f"teacher:{teacher_id}")
+        return f"{endpoint}:{teacher_id}:{generation}:{json.dumps(params or {}, sort_keys=True, default=str)}"
+
+    def _lookup(self, key: str):
+        cached = self.backend.get(key)
+        with self._lock:
+            if cached is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return cached
+
+    def _store(self, key: str, value):
+        value = jsonable_encoder(value)
+        self.backend.set(key, json.dumps(value), self.ttl)
+        return value
+
+    def get_or_compute(self, endpoint: str, teacher_id: int, compute, params: dict | None = None):
+        key = self._key(endpoint, teacher_id, params)
+        cached = self._lookup(key)
+        if cached is not None:
+            return json.loads(cached)
+        return self._store(key, compute())
+
+    async def get_or_compute_async(self, endpoint: str, teacher_id: int, compute, params: dict | None = None):
+        """Comme get_or_compute, `compute` retournant un awaitable (routes sur get_async_db)"""
+        key = self._key(endpoint, teacher_id, params)
+        cached = self._lookup(key)
+        if cached is not None:
+            return json.loads(cached)
+        return self._store(key, await compute())
+
+    def invalidate_teacher(self, teacher_id: int | None):
+        if teacher_id is None:
+            return
+        self.backend.bump(f"teacher:{teacher_id}")
+        with self._lock:
+            self._invalidations += 1
+
+    def invalidate_after_commit(self, db: Session, teacher_id: int | None):
+        """Invalide quand la transaction en cours est commitée (pas avant: un lecteur remettrait l'ancienne valeur en cache)"""
+        if teacher_id is not None:
+            db.info.setdefault("invalidate_teachers", set()).add(teacher_id)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "backend": type(self.backend).__name__,
+                "ttl_s": self.ttl,
+                "entries": self.backend.size(),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "invalidations": self._invalidations,
+            }
+
+
+def _build_backend():
+    if settings.RESPONSE_CACHE_BACKEND == "redis":
+        return RedisCacheBackend(settings.RESPONSE_CACHE_URL)
+    return MemoryCacheBackend(settings.RESPONSE_CACHE_MAX_ENTRIES)
+
+
+response_cache = ResponseCache(_build_backend(), settings.RESPONSE_CACHE_TTL)
+
+
+@event.listens_for(Session, "after_commit")
+def _flush_invalidations(session: Session):
+    if session.in_nested_transaction():
+        return  # RELEASE SAVEPOINT: rien n'est encore visible des autres transactions
+    for teacher_id in session.info.pop("invalidate_teachers", ()):
+        response_cache.invalidate_teacher(teacher_id)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _drop_invalidations(session: Session, transaction):
+    # Fin de la transaction externe sans commit (rollback); les savepoints sont ignorés
+    if transaction.parent is None:
+        session.info.pop("invalidate_teachers", None)
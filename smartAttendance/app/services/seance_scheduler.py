@@ -0,0 +1,138 @@
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models.attendance import Attendance
+from app.models.cours import Cours, JourSemaine
+from app.models.seance import Seance
+from app.services.attendance_service import dialect_insert, finalize_due_seances
+
+WEEKDAYS = {
+    JourSemaine.LUNDI: 0,
+    JourSemaine.MARDI: 1,
+    JourSemaine.MERCREDI: 2,
+    JourSemaine.JEUDI: 3,
+    JourSemaine.VENDREDI: 4,
+    JourSemaine.SAMEDI: 5,
+}
+
+
+def seance_start(cours: Cours, day: date) -> datetime:
+    """Seance.date d'un cours pour un jour donné: clé (cours_id, date) des séances planifiées"""
+    return datetime.combine(day, cours.heure_debut)
+
+
+def plan_seances(db: Session, now: datetime, days: int, cours_ids=None) -> int:
+    """
+    Crée les séances des `days` jours à partir d'aujourd'hui depuis l'emploi
+    du temps (Cours.jour, heure_debut, heure_fin), fermées jusqu'à leur
+    heure de début; les créneaux déjà terminés sont ignorés (ils seraient
+    clôturés avec tout le groupe absent). Un seul INSERT ... ON CONFLICT (cours_id, date) DO NOTHING:
+    relancer la planification ne crée pas de doublon. Retourne le nombre de
+    séances créées. Ne commit pas.
+    """
+    query = db.query(Cours)
+    if cours_ids is not None:
+        query = query.filter(Cours.id.in_(list(cours_ids)))
+
+    rows = []
+    for cours in query:
+        weekday = WEEKDAYS[cours.jour]
+        for offset in range(days):
+            day = now.date() + timedelta(days=offset)
+            if day.weekday() == weekday and datetime.combine(day, cours.heure_fin) > now:
+                rows.append({
+                    "cours_id": cours.id,
+                    "date": seance_start(cours, day),
+                    "heure_debut": cours.heure_debut,
+                    "heure_fin": cours.heure_fin,
+                    "is_active": False,
+                })
+    if not rows:
+        return 0
+
+    created = db.execute(
+        dialect_insert(db, Seance).values(rows).on_conflict_do_nothing(
+            index_elements=["cours_id", "date"]
+        ).returning(Seance.id)
+    ).all()
+    return len(created)
+
+
+def unplan_seances(db: Session, cours_id: int, now: datetime) -> int:
+    """
+    Supprime les séances planifiées d'un cours qui n'ont pas commencé (ni
+    présence, ni clôture): avant une modification de l'emploi du temps ou
+    la suppression du cours. Ne commit pas.
+    """
+    result = db.execute(
+        delete(Seance).where(
+            Seance.cours_id == cours_id,
+            Seance.date > now,
+            Seance.finalized_at.is_(None),
+            ~select(Attendance.id).where(Attendance.seance_id == Seance.id).exists()
+        ).execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def open_due_seances(db: Session, now: datetime) -> int:
+    """Ouvre (is_active) les séances du jour commencées et pas encore terminées. Ne commit pas."""
+    day_start = datetime.combine(now.date(), time.min)
+    result = db.execute(
+        update(Seance).where(
+            Seance.is_active == False,
+            Seance.finalized_at.is_(None),
+            Seance.date >= day_start,
+            Seance.date <= now,
+            Seance.heure_fin > now.time()
+        ).values(is_active=True).execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+class SeanceScheduler:
+    """
+    Tâche de fond du serveur (main.py), toutes les SCHEDULER_INTERVAL
+    secondes: planifie les séances à SEANCE_HORIZON_DAYS jours une fois par
+    jour, ouvre les fenêtres de détection à l'heure de début et clôture les
+    séances terminées (absences, attendance_service.finalize_due_seances).
+    Chaque étape est idempotente: plusieurs workers peuvent la lancer.
+    """
+
+    def __init__(self, horizon_days: int):
+        self.horizon_days = horizon_days
+        self._planned_day: date | None = None
+        self._last_tick: datetime | None = None
+        self._totals = {"planned": 0, "opened": 0, "finalized": 0}
+
+    def tick(self, now: datetime | None = None) -> dict[str, int]:
+        now = now or datetime.now()
+        stats = {"planned": 0, "opened": 0, "finalized": 0}
+        db = SessionLocal()
+        try:
+            if self._planned_day != now.date():
+                stats["planned"] = plan_seances(db, now, self.horizon_days)
+                db.commit()
+                self._planned_day = now.date()
+            stats["opened"] = open_due_seances(db, now)
+            db.commit()
+            stats["finalized"] = finalize_due_seances(db, now)
+        finally:
+            db.close()
+        self._last_tick = now
+        for key, value in stats.items():
+            self._totals[key] += value
+        return stats
+
+    def metrics(self) -> dict:
+        return {
+            "horizon_days": self.horizon_days,
+            "planned_day": self._planned_day.isoformat() if self._planned_day else None,
+            "last_tick": self._last_tick.isoformat() if self._last_tick else None,
+            **self._totals,
+        }
+
+
+seance_scheduler = SeanceScheduler(settings.SEANCE_HORIZON_DAYS)
@@ -0,0 +1,64 @@
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.student_embedding import StudentEmbedding
+from app.services.embedding_index import embedding_index
+
+
+def add_templates(db: Session, items: list[tuple[int, np.ndarray]], is_verified: bool):
+    """
+    Ajoute un template par (student_id, embedding) puis évince, pour chaque
+    étudiant concerné, les plus anciens au-delà du plafond de la catégorie
+    (TEMPLATE_MAX_VERIFIED ou TEMPLATE_MAX_RECENT). Ne commit pas.
+
+    Retourne ([(template_id, student_id, embedding)], ids évincés), à passer
+    à `sync_index` après le commit (valeurs simples: rien à recharger après expiration).
+    """
+    templates = [
+        StudentEmbedding(
+            student_id=student_id,
+            embedding=np.asarray(embedding, dtype=np.float32).tobytes(),
+            is_verified=is_verified
+        )
+        for student_id, embedding in items
+    ]
+    if not templates:
+        return [], []
+
+    db.add_all(templates)
+    db.flush()
+
+    cap = settings.TEMPLATE_MAX_VERIFIED if is_verified else settings.TEMPLATE_MAX_RECENT
+    ranked = db.query(
+        StudentEmbedding.id,
+        func.row_number().over(
+            partition_by=StudentEmbedding.student_id,
+            order_by=(StudentEmbedding.created_at.desc(), StudentEmbedding.id.desc())
+        ).label("rank")
+    ).filter(
+        StudentEmbedding.student_id.in_({t.student_id for t in templates}),
+        StudentEmbedding.is_verified == is_verified
+    ).subquery()
+    evicted = [template_id for (template_id,) in db.query(ranked.c.id).filter(ranked.c.rank > cap).all()]
+
+    if evicted:
+        db.query(StudentEmbedding).filter(StudentEmbedding.id.in_(evicted)).delete(synchronize_session=False)
+
+    added = [(t.id, student_id, embedding) for t, (student_id, embedding) in zip(templates, items)]
+    return added, evicted
+
+
+def sync_index(added: list[tuple], evicted: list[int], profiles: dict[int, tuple[str, int | None]] | None = None):
+    """
+    Répercute `add_templates` sur l'index en mémoire (après le commit).
+    `profiles` (student_id -> (nom, groupe_id)) sert aux étudiants encore absents de l'index.
+    """
+    profiles = profiles or {}
+    evicted_set = set(evicted)
+    for template_id, student_id, embedding in added:
+        if template_id in evicted_set:
+            continue
+        name, groupe_id = profiles.get(student_id, (None, None))
+        embedding_index.add_template(student_id, template_id, embedding, name=name, groupe_id=groupe_id)
+    embedding_index.remove_templates(evicted)
@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from app.config import settings
+from app.models.user import User
+
+
+def _snapshot(user: User) -> User:
+    """Copie détachée des colonnes (pas de relations): partageable entre requêtes, jamais rattachée à une session"""
+    snapshot = User(**{attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs})
+    make_transient_to_detached(snapshot)
+    return snapshot
+
+
+class UserCache:
+    """
+    Utilisateurs authentifiés par id, pour que get_current_user n'interroge
+    pas la table users à chaque requête.
+
+    Les écritures qui changent ce que l'authentification lit (rôle, compte
+    actif, suppression) appellent `invalidate_after_commit`; le TTL borne
+    l'obsolescence entre processus (chaque worker a son cache). Un compteur
+    de version par id empêche une lecture commencée avant l'invalidation de
+    remettre l'ancienne valeur en cache.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[int, tuple[float, User]] = OrderedDict()
+        self._versions: dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    def get(self, user_id: int) -> User | None:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(user_id, None)
+                self._misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self._hits += 1
+            return entry[1]
+
+    def version(self, user_id: int) -> int:
+        """À lire avant de charger l'utilisateur, puis à passer à `put`"""
+        with self._lock:
+            return self._versions.get(user_id, 0)
+
+    def put(self, user: User, version: int) -> User:
+        snapshot = _snapshot(user)
+        with self._lock:
+            if self._versions.get(user.id, 0) == version:
+                self._entries[user.id] = (time.monotonic() + self.ttl, snapshot)
+                self._entries.move_to_end(user.id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return snapshot
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            self._invalidations += 1
+
+    def invalidate_after_commit(self, db: Session, user_id: int | None):
+        """Invalide quand la transaction en cours est commitée (comme ResponseCache)"""
+        if user_id is not None:
+            db.info.setdefault("invalidate_users", set()).add(user_id)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "ttl_s": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "invalidations": self._invalidations,
+            }
+
+
+user_cache = UserCache(settings.USER_CACHE_TTL, settings.USER_CACHE_MAX_ENTRIES)
+
+
+@event.listens_for(Session, "after_commit")
+def _flush_invalidations(session: Session):
+    if session.in_nested_transaction():
+        return
+    for user_id in session.info.pop("invalidate_users", ()):
+        user_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _drop_invalidations(session: Session, transaction):
+    if transaction.parent is None:
+        session.info.pop("invalidate_users", None)
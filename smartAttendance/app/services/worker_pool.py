@@ -0,0 +1,96 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+from app.config import settings
+
+
+class PoolSaturated(HTTPException):
+    """503 renvoyé quand la file d'un pool est pleine (les appelants doivent réessayer plus tard)"""
+
+    def __init__(self, pool_name: str, retry_after: int = 1):
+        super().__init__(
+            status_code=503,
+            detail=f"Serveur occupé ({pool_name}), réessayez dans quelques secondes",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+class BoundedWorkerPool:
+    """
+    Exécute du code bloquant (inférence TensorFlow, ...) hors de la boucle
+    d'événements, sur un nombre fixe de threads et avec une file bornée.
+    Au-delà de `max_workers + max_queue` tâches en attente, `run` lève PoolSaturated.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._pending = 0  # en file + en cours
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._total_run = 0.0
+
+    async def run(self, fn, *args, **kwargs):
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise PoolSaturated(self.name)
+            self._pending += 1
+
+        enqueued_at = time.perf_counter()
+
+        def task():
+            started_at = time.perf_counter()
+            wait = started_at - enqueued_at
+            with self._lock:
+                self._running += 1
+                self._total_wait += wait
+                self._max_wait = max(self._max_wait, wait)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._pending -= 1
+                    self._completed += 1
+                    self._total_run += time.perf_counter() - started_at
+
+        loop = asyncio.get_running_loop()
+        try:
+            future = loop.run_in_executor(self._executor, task)
+        except RuntimeError:
+            # Executor arrêté (shutdown): la tâche n'a jamais été soumise
+            with self._lock:
+                self._pending -= 1
+            raise
+        return await future
+
+    def metrics(self) -> dict:
+        with self._lock:
+            completed = self._completed
+            return {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queue_depth": self._pending - self._running,
+                "running": self._running,
+                "completed": completed,
+                "rejected": self._rejected,
+                "avg_wait_ms": round(self._total_wait / completed * 1000, 2) if completed else 0.0,
+                "max_wait_ms": round(self._max_wait * 1000, 2),
+                "avg_run_ms": round(self._total_run / completed * 1000, 2) if completed else 0.0,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+inference_pool = BoundedWorkerPool("inference", settings.INFERENCE_WORKERS, settings.INFERENCE_QUEUE_SIZE)
+auth_pool = BoundedWorkerPool("auth", settings.AUTH_HASH_WORKERS, settings.AUTH_HASH_QUEUE_SIZE)
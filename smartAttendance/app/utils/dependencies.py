@@ -2,40 +2,62 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi import Security
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from app.config import settings
-from app.database import get_db
+from app.database import get_db, AsyncSessionLocal
+from app.models.seance import Seance
 from app.models.user import User, UserRole
 from app.schemas.user import TokenData
+from app.services.user_cache import user_cache
 
 security = HTTPBearer()
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Security(security),
-    db: Session = Depends(get_db)
-) -> User:
+def authenticate_token(token: str, db: Session) -> User:
+    """
+    Utilisateur d'un jeton d'accès (en-tête Bearer, ou paramètre `token` des
+    WebSockets). Le rôle et le compte actif contrôlés ensuite (require_role)
+    viennent de user_cache, jamais du jeton: une modification est vue
+    immédiatement par le worker qui l'a commitée, et au plus après
+    USER_CACHE_TTL secondes par les autres workers.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    token = credentials.credentials  # Le token est ici
-    
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
-        token_data = TokenData(email=email)
+        token_data = TokenData(email=email, user_id=payload.get("uid"))
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.email == token_data.email).first()
+    # Jetons récents: id dans le jeton -> cache, la base n'est lue qu'en cas d'absence
+    if token_data.user_id is not None:
+        user = user_cache.get(token_data.user_id)
+        if user is not None:
+            return user
+        version = user_cache.version(token_data.user_id)
+        user = db.get(User, token_data.user_id)
+    else:
+        # Jetons émis avant l'ajout de "uid": recherche par email
+        user = db.query(User).filter(User.email == token_data.email).first()
+        version = user_cache.version(user.id) if user else 0
+    
     if user is None:
         raise credentials_exception
-    return user
+    return user_cache.put(user, version)
+
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Security(security),
+    db: Session = Depends(get_db)
+) -> User:
+    return authenticate_token(credentials.credentials, db)  # Le token est ici
 
 from typing import Optional
 
@@ -54,4 +76,23 @@ def require_role(allowed_roles: list[UserRole]):
                 detail="You don't have permission to access this resource"
             )
         return current_user
-    return role_checker
\ No newline at end of file
+    return role_checker
+SEANCE_ROLES = (UserRole.ENSEIGNANT, UserRole.ADMIN, UserRole.SUPER_ADMIN)
+
+
+async def authorize_seance_socket(token: str, seance_id: int) -> Seance:
+    """
+    Contrôle d'accès des WebSockets d'une séance (jeton en paramètre `token`:
+    les navigateurs n'envoient pas d'en-tête Authorization): rôle, compte
+    actif, et pour un enseignant son propre cours. Retourne la séance (cours chargé).
+    """
+    async with AsyncSessionLocal() as db:
+        user = await db.run_sync(lambda session: authenticate_token(token, session))
+        if not user.is_active or user.role not in SEANCE_ROLES:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You don't have permission to access this resource")
+        seance = await db.get(Seance, seance_id, options=[selectinload(Seance.cours)])
+        if not seance:
+            raise HTTPException(status_code=404, detail="Séance not found")
+        if user.role == UserRole.ENSEIGNANT and (seance.cours is None or seance.cours.enseignant_id != user.id):
+            raise HTTPException(status_code=403, detail="Not your course")
+        return seance
@@ -0,0 +1,98 @@
+from typing import Callable, Optional
+from fastapi import HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.orm import Query as ORMQuery, Session
+from app.database import SessionLocal
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _parse_cursor(cursor: Optional[str]) -> Optional[int]:
+    """Valeur de X-Next-Cursor renvoyée par le client; un curseur invalide est une erreur du client (400)"""
+    if cursor is None:
+        return None
+    try:
+        after_id = int(cursor)
+    except ValueError:
+        after_id = None
+    if after_id is None or not -2**63 <= after_id < 2**63:  # Hors BIGINT: erreur de la base, pas du client
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return after_id
+
+
+class PageParams:
+    """
+    Paramètres communs des listes:
+    - sans paramètre: liste complète (comportement historique du frontend);
+    - `limit` (+ `after_id`): page triée par id, le curseur suivant est dans
+      l'en-tête X-Next-Cursor (absent sur la dernière page);
+    - `stream=true`: NDJSON (un objet par ligne) lu par lots avec un curseur
+      côté serveur, mémoire constante quelle que soit la taille de la table.
+    """
+
+    def __init__(
+        self,
+        after_id: Optional[str] = Query(None, description="Curseur: id du dernier élément de la page précédente"),
+        limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+        stream: bool = Query(False, description="Réponse NDJSON en flux"),
+    ):
+        self.after_id = _parse_cursor(after_id)
+        self.limit = limit if limit is not None or after_id is None else DEFAULT_PAGE_SIZE
+        self.stream = stream
+
+
+def keyset(query: ORMQuery, id_column, after_id: Optional[int]) -> ORMQuery:
+    """Ordre stable par id, reprise après `after_id`"""
+    if after_id is not None:
+        query = query.filter(id_column > after_id)
+    return query.order_by(id_column)
+
+
+def paginate(query: ORMQuery, id_column, page: PageParams, response: Response, row_id: Callable = lambda row: row.id) -> list:
+    """Exécute `query` pour la page demandée et pose X-Next-Cursor s'il reste des lignes"""
+    query = keyset(query, id_column, page.after_id)
+    if page.limit is None:
+        return query.all()
+
+    rows = query.limit(page.limit + 1).all()
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        response.headers[NEXT_CURSOR_HEADER] = str(row_id(rows[-1]))
+    return rows
+
+
+def ndjson_stream(
+    build_query: Callable[[Session], ORMQuery],
+    id_column,
+    serialize: Callable[[Session, list], list],
+    model: type[BaseModel],
+    page: PageParams,
+) -> StreamingResponse:
+    """
+    Flux NDJSON: `build_query(db)` est lu par lots de STREAM_BATCH_SIZE
+    (yield_per: curseur côté serveur sur PostgreSQL), chaque lot passe par
+    `serialize(db, rows)` puis est validé par `model`. Le flux ouvre sa
+    propre session: celle de la requête est fermée avant la fin de l'envoi.
+    """
+    def encode(db: Session, rows: list) -> bytes:
+        return "".join(model.model_validate(item).model_dump_json() + "\n" for item in serialize(db, rows)).encode()
+
+    def generate():
+        with SessionLocal() as db:
+            query = keyset(build_query(db), id_column, page.after_id)
+            if page.limit is not None:
+                query = query.limit(page.limit)
+            rows = []
+            for row in query.yield_per(STREAM_BATCH_SIZE):
+                rows.append(row)
+                if len(rows) == STREAM_BATCH_SIZE:
+                    yield encode(db, rows)
+                    rows = []
+            if rows:
+                yield encode(db, rows)
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
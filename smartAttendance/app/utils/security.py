@@ -5,11 +5,15 @@ from passlib.context import CryptContext
 from app.config import settings
 from app.models.user import UserRole
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """(mot de passe valide, nouveau hash si le hash stocké n'a plus le coût/schéma courant)"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
@@ -23,6 +27,17 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
+def user_claims(user) -> dict:
+    """
+    Claims du jeton d'accès: email ("sub") et id ("uid", clé de user_cache).
+    Ni rôle ni compte actif: figés pour la durée du jeton, ils ne
+    refléteraient pas une désactivation ou un changement de rôle.
+    """
+    return {
+        "sub": user.email,
+        "uid": user.id,
+    }
+
 def determine_role_from_email(email: str) -> UserRole:
     """
     Détermine le rôle basé sur le domaine email:
@@ -0,0 +1,148 @@
+"""
+Latence sous concurrence d'une route `async def` qui lit la base:
+session synchrone (requêtes exécutées sur la boucle d'événements, ancien
+comportement) contre session async (get_async_db + run_sync).
+
+`--clients` clients appellent le dashboard enseignant (sans cache de
+réponses) en boucle pendant qu'une sonde appelle une route sans base
+(/ping) toutes les 10 ms: avec la session synchrone, chaque requête SQL
+bloque aussi la sonde. Base SQLite fichier (aiosqlite pour la session async);
+SQLite local répondant en quelques microsecondes, chaque requête de
+dashboard commence par une requête lente simulée (`--slow-query-ms`, une
+fonction SQL qui dort côté base), comme une requête PostgreSQL coûteuse.
+
+Usage (depuis smartAttendance/):
+    python -m benchmarks.bench_async --clients 20 --requests 10 --cours 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("LOAD_ML_MODELS", "false")
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from app.database import Base, create_async_db_engine, create_db_engine
+from app.routers.enseignants import _teacher_dashboard
+from benchmarks.bench_dashboard import populate
+
+
+SLOW_QUERY = text("SELECT bench_sleep(:ms)")
+
+
+def register_sleep(engine):
+    @event.listens_for(engine, "connect")
+    def _sleep_function(dbapi_connection, record):
+        dbapi_connection.create_function("bench_sleep", 1, lambda ms: time.sleep(ms / 1000))
+
+
+def build_app(sync_engine, async_engine, teacher, slow_query_ms: float) -> FastAPI:
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)
+    AsyncSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    app = FastAPI()
+
+    def get_sync_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def get_async_db():
+        async with AsyncSession() as db:
+            yield db
+
+    @app.get("/sync")
+    async def dashboard_sync(db=Depends(get_sync_db)):
+        db.execute(SLOW_QUERY, {"ms": slow_query_ms})
+        return _teacher_dashboard(teacher, db)
+
+    @app.get("/async")
+    async def dashboard_async(db=Depends(get_async_db)):
+        await db.execute(SLOW_QUERY, {"ms": slow_query_ms})
+        return await db.run_sync(lambda session: _teacher_dashboard(teacher, session))
+
+    @app.get("/ping")
+    async def ping():
+        return {}
+
+    return app
+
+
+def percentile(values, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000 if values else 0.0
+
+
+async def run(app, path: str, clients: int, requests: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        latencies, pings = [], []
+        done = asyncio.Event()
+
+        async def worker():
+            for _ in range(requests):
+                start = time.perf_counter()
+                response = await client.get(path)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        async def probe():
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get("/ping")
+                pings.append(time.perf_counter() - start)
+                await asyncio.sleep(0.01)
+
+        probe_task = asyncio.create_task(probe())
+        await asyncio.gather(*[worker() for _ in range(clients)])
+        done.set()
+        await probe_task
+    return latencies, pings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=10, help="Requêtes par client")
+    parser.add_argument("--cours", type=int, default=10)
+    parser.add_argument("--students", type=int, default=30)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--slow-query-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{tmp}/bench.db"
+        # Une connexion par client: on mesure le blocage de la boucle, pas l'attente du pool (voir load_burst)
+        pool = {"pool_size": args.clients, "max_overflow": 5}
+        sync_engine = create_db_engine(url, **pool)
+        register_sleep(sync_engine)
+        Base.metadata.create_all(sync_engine)
+        with sessionmaker(bind=sync_engine)() as db:
+            teacher = populate(db, args.cours, args.students, args.days, random.Random(0))
+            db.refresh(teacher)
+            db.expunge(teacher)
+        async_engine = create_async_db_engine(url, **pool)
+        register_sleep(async_engine.sync_engine)
+        app = build_app(sync_engine, async_engine, teacher, args.slow_query_ms)
+
+        print(f"{'session':>8} {'p50_ms':>8} {'p99_ms':>8} {'ping_p50':>9} {'ping_p99':>9}")
+        for mode in ("sync", "async"):
+            latencies, pings = asyncio.run(run(app, f"/{mode}", args.clients, args.requests))
+            print(
+                f"{mode:>8} {percentile(latencies, 0.5):>8.1f} {percentile(latencies, 0.99):>8.1f} "
+                f"{percentile(pings, 0.5):>9.1f} {percentile(pings, 0.99):>9.1f}"
+            )
+        asyncio.run(async_engine.dispose())
+        sync_engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
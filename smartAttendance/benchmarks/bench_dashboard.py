@@ -0,0 +1,100 @@
+"""
+Nombre de requêtes SQL et latence de GET /enseignants/dashboard.
+
+Base SQLite en mémoire: un enseignant avec `--cours` cours (un groupe de
+`--students` étudiants chacun) et `--days` jours de séances avec présences.
+Le nombre de requêtes ne doit pas dépendre de la taille des données: c'est
+vérifié par tests/test_dashboard_queries.py.
+
+Usage (depuis smartAttendance/):
+    python -m benchmarks.bench_dashboard --cours 5 20 --students 30 --days 30
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta, time as dtime
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("LOAD_ML_MODELS", "false")
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.models import user, filiere, groupe, student, module, cours, seance, attendance, student_embedding, notification, enseignant, attendance_rollup  # noqa: F401
+from app.models.cours import Cours, JourSemaine
+from app.models.enseignant import Enseignant
+from app.models.filiere import Filiere
+from app.models.groupe import Groupe
+from app.models.module import Module
+from app.models.seance import Seance
+from app.models.student import Student
+from app.models.user import User, UserRole
+from app.routers.enseignants import _teacher_dashboard  # Sans le cache de réponses
+from app.services.attendance_service import record_attendances
+
+
+def populate(db, nb_cours: int, nb_students: int, days: int, rng):
+    teacher = User(email="prof@bench", hashed_password="x", full_name="Prof", role=UserRole.ENSEIGNANT, is_active=True)
+    filiere = Filiere(code="GI", nom="Génie Informatique")
+    db.add_all([teacher, filiere])
+    db.flush()
+    db.add(Enseignant(user_id=teacher.id))
+
+    for c in range(nb_cours):
+        groupe = Groupe(code=f"G{c}", filiere_id=filiere.id, annee=1 + c % 3)
+        module = Module(code=f"M{c}", nom=f"Module {c}", filiere_id=filiere.id, annee=1 + c % 3)
+        db.add_all([groupe, module])
+        db.flush()
+        cours = Cours(module_id=module.id, groupe_id=groupe.id, enseignant_id=teacher.id, jour=JourSemaine.LUNDI,
+                      heure_debut=dtime(8), heure_fin=dtime(10))
+        db.add(cours)
+        students = []
+        for i in range(nb_students):
+            u = User(email=f"s{c}_{i}@bench", hashed_password="x", full_name=f"Student {c}-{i}", role=UserRole.STUDENT, is_active=True)
+            db.add(u)
+            db.flush()
+            students.append(Student(user_id=u.id, groupe_id=groupe.id))
+        db.add_all(students)
+        db.flush()
+
+        for d in range(days):
+            seance = Seance(cours_id=cours.id, date=datetime.now() - timedelta(days=d), heure_debut=dtime(8), heure_fin=dtime(10))
+            db.add(seance)
+            db.flush()
+            record_attendances(db, seance, [
+                (s.id, 0.9, rng.choice(["present", "present", "late"])) for s in students if rng.random() < 0.8
+            ])
+    db.commit()
+    return teacher
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cours", type=int, nargs="+", default=[2, 10])
+    parser.add_argument("--students", type=int, default=30)
+    parser.add_argument("--days", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'cours':>6} {'students':>9} {'seances':>8} {'queries':>8} {'ms':>8}")
+    for nb_cours in args.cours:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        db = sessionmaker(bind=engine)()
+        teacher = populate(db, nb_cours, args.students, args.days, rng)
+        db.refresh(teacher)
+        db.expunge_all()  # Identity map vide: chaque objet lu par le dashboard passe par une requête
+
+        queries = []
+        event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *a: queries.append(statement))
+        start = time.perf_counter()
+        _teacher_dashboard(teacher, db)
+        ms = (time.perf_counter() - start) * 1000
+
+        print(f"{nb_cours:>6} {nb_cours * args.students:>9} {nb_cours * args.days:>8} {len(queries):>8} {ms:>8.1f}")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
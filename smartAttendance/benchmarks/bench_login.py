@@ -0,0 +1,109 @@
+"""
+Débit de POST /auth/login en rafale (rentrée: des centaines de connexions
+en quelques minutes), via l'application réelle sur une base SQLite fichier.
+
+`--users` comptes sont créés avec un hash de coût `--stored-rounds`; si ce
+coût diffère de BCRYPT_ROUNDS (`--rounds`), la première connexion de chaque
+compte refait son hash (compté en fin de mesure). Pendant la rafale, une
+sonde appelle GET / toutes les 10 ms pour vérifier que bcrypt n'occupe pas
+la boucle d'événements.
+
+Pour comparer avec l'ancien login (bcrypt dans le threadpool, recherche
+email OR full_name), lancer le script sur les deux révisions
+(git checkout <rev> -- app/).
+
+Usage (depuis smartAttendance/):
+    python -m benchmarks.bench_login --users 200 --concurrency 50 --rounds 10
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=10, help="BCRYPT_ROUNDS de l'application")
+    parser.add_argument("--stored-rounds", type=int, default=None, help="Coût des hashes existants (défaut: --rounds)")
+    parser.add_argument("--by-name", action="store_true", help="Connexion par nom complet plutôt que par email")
+    return parser.parse_args()
+
+
+def percentile(values, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000 if values else 0.0
+
+
+async def burst(app, usernames, concurrency: int):
+    import httpx
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies, statuses, pings = [], {}, []
+        done = asyncio.Event()
+
+        async def login(username):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/auth/login", json={"username": username, "password": "secret"})
+                latencies.append(time.perf_counter() - start)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        async def probe():
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get("/")
+                pings.append(time.perf_counter() - start)
+                await asyncio.sleep(0.01)
+
+        probe_task = asyncio.create_task(probe())
+        start = time.perf_counter()
+        await asyncio.gather(*[login(username) for username in usernames])
+        elapsed = time.perf_counter() - start
+        done.set()
+        await probe_task
+    return elapsed, latencies, statuses, pings
+
+
+def main():
+    args = parse_args()
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/login.db"
+    os.environ["LOAD_ML_MODELS"] = "false"
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+
+    from passlib.context import CryptContext
+    from sqlalchemy import select
+    from app.main import app
+    from app.database import SessionLocal
+    from app.models.user import User, UserRole
+
+    stored = CryptContext(schemes=["bcrypt"], bcrypt__rounds=args.stored_rounds or args.rounds).hash("secret")
+    with SessionLocal() as db:
+        db.add_all([
+            User(email=f"student{i}@emsi-edu.ma", full_name=f"Student {i}", hashed_password=stored,
+                 role=UserRole.STUDENT, is_active=True)
+            for i in range(args.users)
+        ])
+        db.commit()
+
+    usernames = [f"Student {i}" if args.by_name else f"student{i}@emsi-edu.ma" for i in range(args.users)]
+    elapsed, latencies, statuses, pings = asyncio.run(burst(app, usernames, args.concurrency))
+
+    with SessionLocal() as db:
+        rehashed = sum(1 for (h,) in db.execute(select(User.hashed_password)) if h != stored)
+
+    print(f"{args.users} logins, concurrency {args.concurrency}, rounds {args.rounds}: {args.users / elapsed:.1f} logins/s")
+    print(f"  latency p50 {percentile(latencies, 0.5):.0f} ms, p99 {percentile(latencies, 0.99):.0f} ms; statuses {statuses}")
+    print(f"  event loop probe p50 {percentile(pings, 0.5):.1f} ms, p99 {percentile(pings, 0.99):.1f} ms")
+    print(f"  rehashed on login: {rehashed}/{args.users}")
+    if statuses.get(200, 0) + statuses.get(503, 0) != args.users:
+        sys.exit("unexpected login failures")
+
+
+if __name__ == "__main__":
+    main()
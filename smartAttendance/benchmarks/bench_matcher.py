@@ -0,0 +1,69 @@
+"""
+Rappel et latence du moteur IVF par rapport au balayage exact.
+
+Galerie synthétique: N identités (vecteurs 512-d normalisés, comme FaceNet),
+requêtes = identité + bruit. Le rappel@1 mesure la part des requêtes pour
+lesquelles l'IVF retourne le même voisin que le balayage exact.
+
+Usage (depuis smartAttendance/):
+    python -m benchmarks.bench_matcher --sizes 1000 5000 20000 --nprobe 1 4 8 16
+"""
+import argparse
+import time
+import numpy as np
+from app.services.matchers import ExactMatcher, IVFMatcher
+
+
+def make_gallery(size: int, dim: int, rng):
+    gallery = rng.standard_normal((size, dim)).astype(np.float32)
+    gallery /= np.linalg.norm(gallery, axis=1, keepdims=True)
+    return gallery
+
+
+def make_queries(gallery, count: int, noise: float, rng):
+    picks = rng.choice(len(gallery), size=count)
+    queries = gallery[picks] + noise * rng.standard_normal((count, gallery.shape[1])).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return queries
+
+
+def time_per_query(matcher, queries) -> float:
+    start = time.perf_counter()
+    for q in queries:
+        matcher.search(q)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000, 50000])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--noise", type=float, default=0.03)
+    parser.add_argument("--dim", type=int, default=512)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'N':>7} {'backend':>10} {'nprobe':>7} {'build ms':>9} {'ms/query':>9} {'recall@1':>9}")
+    for size in args.sizes:
+        gallery = make_gallery(size, args.dim, rng)
+        queries = make_queries(gallery, args.queries, args.noise, rng)
+        ids = np.arange(size)
+
+        start = time.perf_counter()
+        exact = ExactMatcher(ids, gallery)
+        build_ms = (time.perf_counter() - start) * 1000
+        truth = exact.search_many(queries)[0]
+        print(f"{size:>7} {'exact':>10} {'-':>7} {build_ms:>9.1f} {time_per_query(exact, queries):>9.3f} {1.0:>9.3f}")
+
+        start = time.perf_counter()
+        ivf = IVFMatcher(ids, gallery, nprobe=1)
+        build_ms = (time.perf_counter() - start) * 1000
+        for nprobe in args.nprobe:
+            ivf.nprobe = nprobe
+            recall = float(np.mean(ivf.search_many(queries)[0] == truth))
+            print(f"{size:>7} {'ivf':>10} {nprobe:>7} {build_ms:>9.1f} {time_per_query(ivf, queries):>9.3f} {recall:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
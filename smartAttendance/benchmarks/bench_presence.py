@@ -0,0 +1,94 @@
+"""
+Nombre de requêtes et latence du calcul des pourcentages de présence:
+une requête par étudiant (ancien code des listes) contre la lecture des
+rollups par étudiant.
+
+Base SQLite en mémoire peuplée de N étudiants ayant chacun `--seances`
+présences/retards/absences.
+
+Usage (depuis smartAttendance/):
+    python -m benchmarks.bench_presence --sizes 100 1000 10000
+"""
+import argparse
+import os
+import random
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.models import user, filiere, groupe, student, module, cours, seance, attendance, student_embedding, notification, enseignant, attendance_rollup  # noqa: F401
+from app.models.attendance import Attendance
+from app.models.seance import Seance
+from app.models.student import Student
+from app.models.user import User, UserRole
+from app.services.presence_service import calculate_presence_percentages
+from app.services.attendance_service import rebuild_rollups
+
+
+def populate(db, size: int, seances: int, rng):
+    users = [
+        {"email": f"student{i}@bench", "hashed_password": "x", "full_name": f"Student {i}", "role": UserRole.STUDENT, "is_active": True}
+        for i in range(size)
+    ]
+    db.bulk_insert_mappings(User, users)
+    user_ids = [uid for (uid,) in db.query(User.id).order_by(User.id)]
+    db.bulk_insert_mappings(Student, [{"user_id": uid} for uid in user_ids])
+    student_ids = [sid for (sid,) in db.query(Student.id).order_by(Student.id)]
+    db.bulk_insert_mappings(Seance, [{"cours_id": None} for _ in range(seances)])
+    seance_ids = [sid for (sid,) in db.query(Seance.id)]
+    db.bulk_insert_mappings(Attendance, [
+        {"seance_id": seance_id, "student_id": student_id, "confidence": 1.0,
+         "status": rng.choice(["present", "present", "late", "absent"])}
+        for student_id in student_ids for seance_id in seance_ids
+    ])
+    rebuild_rollups(db)
+    db.commit()
+    return student_ids
+
+
+def per_student(student_ids, db):
+    """Ancien comportement des listes: deux COUNT par étudiant"""
+    result = {}
+    for student_id in student_ids:
+        total = db.query(Seance).join(Attendance).filter(Attendance.student_id == student_id).count()
+        presents = db.query(Attendance).filter(Attendance.student_id == student_id, Attendance.status == "present").count()
+        result[student_id] = round(presents / total * 100, 1) if total else 0.0
+    return result
+
+
+def measure(fn, student_ids, db, counter):
+    counter["queries"] = 0
+    start = time.perf_counter()
+    result = fn(student_ids, db)
+    return result, counter["queries"], (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--seances", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'students':>9} {'method':>12} {'queries':>8} {'ms':>10}")
+    for size in args.sizes:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        counter = {"queries": 0}
+        event.listen(engine, "before_cursor_execute", lambda *a: counter.__setitem__("queries", counter["queries"] + 1))
+        db = sessionmaker(bind=engine)()
+        student_ids = populate(db, size, args.seances, rng)
+
+        expected, queries, ms = measure(per_student, student_ids, db, counter)
+        print(f"{size:>9} {'per-student':>12} {queries:>8} {ms:>10.1f}")
+        batched, queries, ms = measure(calculate_presence_percentages, student_ids, db, counter)
+        print(f"{size:>9} {'rollup':>12} {queries:>8} {ms:>10.1f}")
+        assert batched == expected
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
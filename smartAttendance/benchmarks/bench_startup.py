@@ -0,0 +1,64 @@
+"""
+Coût d'import des routers et latence de la première inférence.
+
+Chaque mesure tourne dans un interpréteur neuf (sous-processus) pour ne pas
+profiter des modules déjà importés. Pour comparer avant/après, lancer le
+script sur les deux révisions (git checkout <rev> -- app/).
+
+Usage (depuis smartAttendance/):
+    python -m benchmarks.bench_startup --image uploads/students/exemple.jpg
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+IMPORT_SNIPPET = """
+import json, sys, time
+start = time.perf_counter()
+import app.routers.students
+print(json.dumps({
+    "import_ms": (time.perf_counter() - start) * 1000,
+    "tensorflow_imported": "tensorflow" in sys.modules,
+}))
+"""
+
+FIRST_REQUEST_SNIPPET = """
+import json, time
+from app.services.embedding_extractor import extractor
+image = open({image!r}, "rb").read()
+timings = extractor.warmup() if {warmup} else {{}}
+start = time.perf_counter()
+extractor.extract_from_image(image)
+timings["first_request_ms"] = (time.perf_counter() - start) * 1000
+start = time.perf_counter()
+extractor.extract_from_image(image)
+timings["second_request_ms"] = (time.perf_counter() - start) * 1000
+print(json.dumps(timings))
+"""
+
+
+def run(snippet: str, env_overrides: dict | None = None) -> dict:
+    import os
+    env = dict(os.environ, **(env_overrides or {}))
+    out = subprocess.run([sys.executable, "-c", snippet], capture_output=True, text=True, env=env, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image", help="Photo contenant un visage (mesure de la première requête)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for _ in range(args.repeat):
+        print("import app.routers.students:", run(IMPORT_SNIPPET))
+
+    if args.image:
+        for warmup in (False, True):
+            label = "with warmup" if warmup else "cold"
+            print(f"first request ({label}):", run(FIRST_REQUEST_SNIPPET.format(image=args.image, warmup=warmup)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Rafale de captures: `--classrooms` séances envoient leur image au même
+instant (capture toutes les 30 s), comme POST /recognition/recognize-frame.
+
+Chaque requête simulée suit le chemin réel: lecture de la séance sur la
+boucle d'événements, inférence sur un BoundedWorkerPool (remplacée par une
+attente de `--inference-ms`), puis écriture des présences et commit.
+Deux modes:
+  - hold: la connexion reste prise pendant l'inférence (ancien comportement);
+    dès que le pool est plein, la requête suivante bloque la boucle jusqu'à
+    DB_POOL_TIMEOUT et les requêtes échouent (QueuePool limit).
+  - release: release_connection() avant l'inférence (comportement actuel).
+
+Base SQLite fichier temporaire, pool instrumenté de app.database.
+
+Usage (depuis smartAttendance/):
+    python -m benchmarks.load_burst --classrooms 40 --pool-size 5 --max-overflow 5
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("LOAD_ML_MODELS", "false")
+
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.orm import sessionmaker
+from app.database import Base, create_db_engine, pool_metrics, release_connection
+from app.models import user, filiere, groupe, student, module, cours, seance, attendance, student_embedding, notification, enseignant, attendance_rollup  # noqa: F401
+from app.models.seance import Seance
+from app.services.attendance_service import record_attendances
+from app.services.worker_pool import BoundedWorkerPool
+
+
+async def capture(Session, pool, seance_id: int, args, release: bool) -> tuple[str, float]:
+    start = time.perf_counter()
+    db = Session()
+    try:
+        seance = db.query(Seance).filter(Seance.id == seance_id).first()
+        if release:
+            release_connection(db)
+        await pool.run(time.sleep, args.inference_ms / 1000)
+        record_attendances(db, seance, [(student_id, 0.9, "present") for student_id in range(1, args.faces + 1)])
+        db.commit()
+        return "ok", time.perf_counter() - start
+    except PoolTimeout:
+        return "pool_timeout", time.perf_counter() - start
+    finally:
+        db.close()
+
+
+async def burst(Session, seance_ids, args, release: bool):
+    pool = BoundedWorkerPool("bench", args.workers, len(seance_ids))
+    try:
+        return await asyncio.gather(*[capture(Session, pool, seance_id, args, release) for seance_id in seance_ids])
+    finally:
+        pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--classrooms", type=int, default=40)
+    parser.add_argument("--faces", type=int, default=25, help="Présences écrites par capture")
+    parser.add_argument("--inference-ms", type=float, default=150.0)
+    parser.add_argument("--workers", type=int, default=2, help="Threads d'inférence (INFERENCE_WORKERS)")
+    parser.add_argument("--pool-size", type=int, default=5)
+    parser.add_argument("--max-overflow", type=int, default=5)
+    parser.add_argument("--pool-timeout", type=float, default=1.0)
+    args = parser.parse_args()
+
+    print(f"{'mode':>8} {'ok':>5} {'timeouts':>9} {'p95_ms':>8} {'max_ms':>8} {'wait_p95':>9} {'wait_max':>9}")
+    for mode in ("hold", "release"):
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_db_engine(
+                f"sqlite:///{tmp}/burst.db", pool_size=args.pool_size, max_overflow=args.max_overflow,
+                pool_timeout=args.pool_timeout
+            )
+            Base.metadata.create_all(engine)
+            Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+            with Session() as db:
+                seances = [Seance(cours_id=None) for _ in range(args.classrooms)]
+                db.add_all(seances)
+                db.commit()
+                seance_ids = [s.id for s in seances]
+
+            results = asyncio.run(burst(Session, seance_ids, args, release=mode == "release"))
+            latencies = sorted(elapsed for _, elapsed in results)
+            ok = sum(1 for status, _ in results if status == "ok")
+            stats = pool_metrics(engine)
+            print(
+                f"{mode:>8} {ok:>5} {stats['timeouts']:>9} {latencies[int(len(latencies) * 0.95) - 1] * 1000:>8.0f} "
+                f"{latencies[-1] * 1000:>8.0f} {stats['p95_wait_ms']:>9.1f} {stats['max_wait_ms']:>9.1f}"
+            )
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Index des chemins chauds et unicité (seance_id, student_id) sur attendances
+
+Les tables elles-mêmes sont créées par Base.metadata.create_all au démarrage
+(avec ces index pour une base neuve); cette révision met à niveau une base
+existante. Les doublons de présence éventuels sont supprimés (on garde la
+première ligne) avant de poser l'index unique, et les rollups sont alors
+vidés pour être reconstruits au prochain démarrage.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# (table, nom, colonnes, unique)
+INDEXES = [
+    ("attendances", "uq_attendances_seance_student", ["seance_id", "student_id"], True),
+    ("attendances", "ix_attendances_student_seance", ["student_id", "seance_id"], False),
+    ("students", "ix_students_groupe_id", ["groupe_id"], False),
+    ("cours", "ix_cours_enseignant_groupe", ["enseignant_id", "groupe_id"], False),
+    ("cours", "ix_cours_groupe_id", ["groupe_id"], False),
+    ("seances", "ix_seances_cours_date", ["cours_id", "date"], False),
+    ("seances", "ix_seances_date", ["date"], False),
+    ("student_embeddings", "ix_student_embeddings_student_verified_created", ["student_id", "is_verified", "created_at"], False),
+]
+
+ROLLUP_TABLES = ["seance_attendance_rollups", "cours_student_attendance_rollups", "student_attendance_rollups"]
+
+
+def _existing_indexes(inspector, table: str) -> set[str]:
+    return {index["name"] for index in inspector.get_indexes(table)}
+
+
+def _remove_duplicate_attendances(tables: set[str]):
+    removed = op.get_bind().execute(sa.text(
+        "DELETE FROM attendances WHERE id NOT IN ("
+        " SELECT MIN(id) FROM attendances GROUP BY seance_id, student_id"
+        ")"
+    )).rowcount
+    if removed:
+        print(f"🧹 {removed} duplicate attendances removed")
+        for table in ROLLUP_TABLES:
+            if table in tables:
+                op.execute(f"DELETE FROM {table}")  # Reconstruits par rebuild_rollups_if_empty
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    for table, name, columns, unique in INDEXES:
+        if table not in tables or name in _existing_indexes(inspector, table):
+            continue
+        if unique:
+            _remove_duplicate_attendances(tables)
+        op.create_index(name, table, columns, unique=unique)
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    for table, name, _, _ in reversed(INDEXES):
+        if table in tables and name in _existing_indexes(inspector, table):
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,28 @@
+"""Index sur users.full_name (connexion par nom complet)
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def _has_index(name: str) -> bool:
+    inspector = sa.inspect(op.get_bind())
+    return "users" in inspector.get_table_names() and name in {index["name"] for index in inspector.get_indexes("users")}
+
+
+def upgrade():
+    if not _has_index("ix_users_full_name"):
+        op.create_index("ix_users_full_name", "users", ["full_name"])
+
+
+def downgrade():
+    if _has_index("ix_users_full_name"):
+        op.drop_index("ix_users_full_name", table_name="users")
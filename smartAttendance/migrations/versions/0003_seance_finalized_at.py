@@ -0,0 +1,58 @@
+"""seances.finalized_at (clôture des séances et absences)
+
+Les séances déjà terminées sont marquées clôturées sans écrire d'absences:
+sinon le premier balayage (finalize_due_seances) écrirait des absences pour
+tout l'historique, y compris les séances où l'appel n'a jamais été fait.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from datetime import datetime, time, timedelta
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def _has_column(name: str) -> bool:
+    inspector = sa.inspect(op.get_bind())
+    return "seances" in inspector.get_table_names() and name in {column["name"] for column in inspector.get_columns("seances")}
+
+
+def upgrade():
+    if not _has_column("finalized_at"):
+        op.add_column("seances", sa.Column("finalized_at", sa.DateTime(timezone=True), nullable=True))
+
+    # Même critère que attendance_service._is_over: jour précédent, ou aujourd'hui après heure_fin
+    now = datetime.now()
+    today = datetime.combine(now.date(), time.min)
+    seances = sa.table(
+        "seances",
+        sa.column("date", sa.DateTime(timezone=True)),
+        sa.column("heure_fin", sa.Time()),
+        sa.column("is_active", sa.Boolean()),
+        sa.column("finalized_at", sa.DateTime(timezone=True)),
+    )
+    op.execute(
+        seances.update().where(
+            seances.c.finalized_at.is_(None),
+            sa.or_(
+                seances.c.date < today,
+                sa.and_(
+                    seances.c.date < today + timedelta(days=1),
+                    seances.c.heure_fin.isnot(None),
+                    seances.c.heure_fin <= now.time(),
+                ),
+            ),
+        ).values(finalized_at=now, is_active=False)
+    )
+
+
+def downgrade():
+    if _has_column("finalized_at"):
+        with op.batch_alter_table("seances") as batch_op:
+            batch_op.drop_column("finalized_at")
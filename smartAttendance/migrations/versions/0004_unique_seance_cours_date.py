@@ -0,0 +1,44 @@
+"""Unicité (cours_id, date) sur seances (planification des séances)
+
+Remplace l'index non unique ix_seances_cours_date de la révision 0001.
+Les séances créées jusqu'ici par POST /seances/start portent l'heure exacte
+du démarrage: deux séances d'un même cours ne partagent pas ce timestamp.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def _existing_indexes() -> set[str] | None:
+    inspector = sa.inspect(op.get_bind())
+    if "seances" not in inspector.get_table_names():
+        return None
+    return {index["name"] for index in inspector.get_indexes("seances")}
+
+
+def upgrade():
+    indexes = _existing_indexes()
+    if indexes is None:
+        return
+    if "uq_seances_cours_date" not in indexes:
+        op.create_index("uq_seances_cours_date", "seances", ["cours_id", "date"], unique=True)
+    if "ix_seances_cours_date" in indexes:
+        op.drop_index("ix_seances_cours_date", table_name="seances")
+
+
+def downgrade():
+    indexes = _existing_indexes()
+    if indexes is None:
+        return
+    if "ix_seances_cours_date" not in indexes:
+        op.create_index("ix_seances_cours_date", "seances", ["cours_id", "date"])
+    if "uq_seances_cours_date" in indexes:
+        op.drop_index("uq_seances_cours_date", table_name="seances")
@@ -0,0 +1,28 @@
+"""
+Configuration commune des tests (depuis smartAttendance/: `python -m pytest`).
+
+Base SQLite jetable (jamais DATABASE_URL: TEST_DATABASE_URL pour en
+choisir une autre), modèles ML jamais chargés, planificateur arrêté, et
+`cv2` remplacé par un module vide s'il n'est pas installé: aucun test
+n'exécute la détection de visages.
+"""
+import os
+import sys
+import tempfile
+import types
+
+os.environ["DATABASE_URL"] = os.environ.get(
+    "TEST_DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='smartattendance-tests-')}/test.db"
+)
+os.environ["LOAD_ML_MODELS"] = "false"
+os.environ["SCHEDULER_INTERVAL"] = "0"
+
+try:
+    import cv2  # noqa: F401
+except ImportError:
+    sys.modules["cv2"] = types.ModuleType("cv2")
+
+# Tous les modèles déclarés: les relations nommées par chaîne (relationship("StudentEmbedding")) se résolvent
+from app.models import (  # noqa: E402, F401
+    user, filiere, groupe, student, module, cours, seance, attendance, student_embedding, notification, enseignant, attendance_rollup
+)
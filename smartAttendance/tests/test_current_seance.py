@@ -0,0 +1,91 @@
+"""GET /enseignants/seances/current pendant une séance en cours"""
+from datetime import datetime, time
+import pytest
+from fastapi.testclient import TestClient
+from app.database import Base, SessionLocal, engine
+from app.main import app
+from app.models.cours import Cours, JourSemaine
+from app.models.enseignant import Enseignant
+from app.models.filiere import Filiere
+from app.models.groupe import Groupe
+from app.models.module import Module
+from app.models.seance import Seance
+from app.models.student import Student
+from app.models.user import User, UserRole
+from app.services.attendance_service import record_attendances
+from app.services.response_cache import response_cache
+from app.utils.dependencies import get_current_user
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(engine)
+    session = SessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(engine)
+
+
+@pytest.fixture
+def teacher(db):
+    user = User(email="prof@test.ma", hashed_password="x", full_name="Prof", role=UserRole.ENSEIGNANT, is_active=True)
+    db.add(user)
+    db.flush()
+    db.add(Enseignant(user_id=user.id))
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def client(teacher):
+    app.dependency_overrides[get_current_user] = lambda: teacher
+    response_cache.invalidate_teacher(teacher.id)  # Les ids repartent de 1 à chaque test
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_current_user, None)
+
+
+def test_current_seance_while_running(db, teacher, client):
+    filiere = Filiere(code="GI", nom="Génie Informatique")
+    db.add(filiere)
+    db.flush()
+    groupe = Groupe(code="GI1-A", filiere_id=filiere.id, annee=1)
+    module = Module(code="ALGO", nom="Algorithmique", filiere_id=filiere.id, annee=1)
+    db.add_all([groupe, module])
+    db.flush()
+    # Créneau couvrant toute la journée: la séance est en cours quelle que soit l'heure du test
+    cours = Cours(module_id=module.id, groupe_id=groupe.id, enseignant_id=teacher.id, jour=JourSemaine.LUNDI,
+                  heure_debut=time(0, 0), heure_fin=time(23, 59, 59), salle="B12")
+    db.add(cours)
+    students = []
+    for i in range(3):
+        user = User(email=f"s{i}@test.ma", hashed_password="x", full_name=f"Student {i}", role=UserRole.STUDENT, is_active=True)
+        db.add(user)
+        db.flush()
+        students.append(Student(user_id=user.id, groupe_id=groupe.id))
+    db.add_all(students)
+    db.flush()
+    seance = Seance(cours_id=cours.id, date=datetime.now(), heure_debut=cours.heure_debut, heure_fin=cours.heure_fin, is_active=True)
+    db.add(seance)
+    db.flush()
+    record_attendances(db, seance, [(students[0].id, 0.9, "present"), (students[1].id, 0.8, "late")])
+    db.commit()
+
+    response = client.get("/enseignants/seances/current")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["seance"]["id"] == seance.id
+    assert body["seance"]["module"] == "Algorithmique"
+    assert body["seance"]["salle"] == "B12"
+    assert body["seance"]["groupe"] == "GI1-A"
+    assert body["seance"]["filiere"] == "GI"
+    assert body["seance"]["date"] == datetime.now().date().isoformat()
+    assert body["seance"]["total_etudiants"] == 3
+    assert (body["presents"], body["retards"], body["absents"]) == (1, 1, 1)
+
+
+def test_current_seance_without_running_seance(client):
+    response = client.get("/enseignants/seances/current")
+
+    assert response.status_code == 200
+    assert response.json() is None
@@ -0,0 +1,37 @@
+"""Garde-fou du dashboard enseignant: un nombre fixe de requêtes, quelle que soit la taille des données"""
+import random
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.routers.enseignants import _teacher_dashboard  # Sans le cache de réponses
+from benchmarks.bench_dashboard import populate
+
+MAX_QUERIES = 10
+
+
+def dashboard_queries(nb_cours: int, nb_students: int, days: int) -> int:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        teacher = populate(db, nb_cours, nb_students, days, random.Random(0))
+        db.refresh(teacher)
+        db.expunge_all()  # Identity map vide: chaque objet lu par le dashboard passe par une requête
+
+        queries = []
+        event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *a: queries.append(statement))
+        _teacher_dashboard(teacher, db)
+        return len(queries)
+    finally:
+        db.close()
+        engine.dispose()
+
+
+@pytest.mark.parametrize("nb_cours", [2, 10])
+def test_dashboard_query_count_is_bounded(nb_cours):
+    assert dashboard_queries(nb_cours, nb_students=10, days=5) <= MAX_QUERIES
+
+
+def test_dashboard_query_count_does_not_grow_with_data():
+    assert dashboard_queries(2, nb_students=5, days=3) == dashboard_queries(8, nb_students=15, days=10)
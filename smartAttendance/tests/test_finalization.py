@@ -0,0 +1,143 @@
+"""Clôture des séances: absences du groupe, rollups, balayage et rattrapage de la migration 0003"""
+from datetime import date, datetime, time, timedelta
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import text
+from app.database import Base, SessionLocal, engine
+from app.models.attendance import Attendance
+from app.models.attendance_rollup import SeanceAttendanceRollup, StudentAttendanceRollup
+from app.models.cours import Cours, JourSemaine
+from app.models.filiere import Filiere
+from app.models.groupe import Groupe
+from app.models.module import Module
+from app.models.seance import Seance
+from app.models.student import Student
+from app.models.user import User, UserRole
+from app.services.attendance_service import _is_over, finalize_due_seances, finalize_seance, record_attendances
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(engine)
+    session = SessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(engine)
+
+
+@pytest.fixture
+def cours(db):
+    """Cours de 8h à 10h d'un groupe de 3 étudiants"""
+    teacher = User(email="prof@test.ma", hashed_password="x", full_name="Prof", role=UserRole.ENSEIGNANT, is_active=True)
+    filiere = Filiere(code="GI", nom="Génie Informatique")
+    db.add_all([teacher, filiere])
+    db.flush()
+    groupe = Groupe(code="GI1-A", filiere_id=filiere.id, annee=1)
+    module = Module(code="ALGO", nom="Algorithmique", filiere_id=filiere.id, annee=1)
+    db.add_all([groupe, module])
+    db.flush()
+    cours = Cours(module_id=module.id, groupe_id=groupe.id, enseignant_id=teacher.id, jour=JourSemaine.LUNDI,
+                  heure_debut=time(8, 0), heure_fin=time(10, 0), salle="B12")
+    db.add(cours)
+    for i in range(3):
+        user = User(email=f"s{i}@test.ma", hashed_password="x", full_name=f"Student {i}", role=UserRole.STUDENT, is_active=True)
+        db.add(user)
+        db.flush()
+        db.add(Student(user_id=user.id, groupe_id=groupe.id))
+    db.commit()
+    return cours
+
+
+def new_seance(db, cours, day: date) -> Seance:
+    seance = Seance(cours_id=cours.id, date=datetime.combine(day, cours.heure_debut),
+                    heure_debut=cours.heure_debut, heure_fin=cours.heure_fin, is_active=True)
+    db.add(seance)
+    db.commit()
+    return seance
+
+
+def statuses(db, seance) -> dict[int, str]:
+    return dict(db.query(Attendance.student_id, Attendance.status).filter(Attendance.seance_id == seance.id).all())
+
+
+def seance_counts(db, seance) -> tuple[int, int, int]:
+    rollup = db.get(SeanceAttendanceRollup, seance.id)
+    return rollup.present, rollup.late, rollup.absent
+
+
+def test_finalize_writes_absents_once(db, cours):
+    seance = new_seance(db, cours, date.today())
+    student_ids = [student.id for student in db.query(Student).order_by(Student.id)]
+
+    assert finalize_seance(db, seance) == 3
+    db.commit()
+    assert finalize_seance(db, seance) == 0
+    db.commit()
+
+    assert statuses(db, seance) == {student_id: "absent" for student_id in student_ids}
+    assert seance_counts(db, seance) == (0, 0, 3)
+    assert seance.is_active is False and seance.finalized_at is not None
+
+
+def test_recognition_before_finalization_keeps_its_row(db, cours):
+    seance = new_seance(db, cours, date.today())
+    first, second, third = [student.id for student in db.query(Student).order_by(Student.id)]
+    record_attendances(db, seance, [(first, 0.9, "present"), (second, 0.8, "late")])
+    db.commit()
+
+    assert finalize_seance(db, seance) == 1
+    db.commit()
+
+    assert statuses(db, seance) == {first: "present", second: "late", third: "absent"}
+    # Rollups: seules les lignes insérées par la clôture y sont ajoutées
+    assert seance_counts(db, seance) == (1, 1, 1)
+    per_student = {
+        row.student_id: (row.present, row.late, row.absent) for row in db.query(StudentAttendanceRollup)
+    }
+    assert per_student == {first: (1, 0, 0), second: (0, 1, 0), third: (0, 0, 1)}
+
+
+def test_is_over_today_before_and_after_heure_fin():
+    today = date.today()
+    seance = Seance(date=datetime.combine(today, time(8, 0)), heure_debut=time(8, 0), heure_fin=time(10, 0))
+
+    assert not _is_over(seance, datetime.combine(today, time(9, 59)))
+    assert _is_over(seance, datetime.combine(today, time(10, 0)))
+    assert _is_over(seance, datetime.combine(today + timedelta(days=1), time(7, 0)))
+    assert not _is_over(seance, datetime.combine(today - timedelta(days=1), time(23, 0)))
+
+
+def test_sweep_finalizes_only_seances_that_are_over(db, cours):
+    today = date.today()
+    yesterday = new_seance(db, cours, today - timedelta(days=1))
+    current = new_seance(db, cours, today)
+
+    assert finalize_due_seances(db, now=datetime.combine(today, time(9, 0))) == 1
+    assert finalize_due_seances(db, now=datetime.combine(today, time(9, 0))) == 0
+    db.refresh(current)
+    assert current.finalized_at is None and current.is_active
+
+    assert finalize_due_seances(db, now=datetime.combine(today, time(10, 30))) == 1
+    db.refresh(yesterday)
+    db.refresh(current)
+    assert yesterday.finalized_at is not None and current.finalized_at is not None
+
+
+def test_migration_0003_closes_past_seances_without_absents(db, cours):
+    config = Config("alembic.ini")
+    command.stamp(config, "0002")
+    try:
+        now = datetime.now()
+        past = new_seance(db, cours, now.date() - timedelta(days=7))
+        future = new_seance(db, cours, now.date() + timedelta(days=7))
+
+        command.upgrade(config, "0003")
+
+        db.expire_all()
+        assert past.finalized_at is not None and past.is_active is False
+        assert future.finalized_at is None and future.is_active is True
+        assert db.query(Attendance).count() == 0
+    finally:
+        with engine.begin() as connection:
+            connection.execute(text("DROP TABLE IF EXISTS alembic_version"))
@@ -0,0 +1,104 @@
+"""Flux WebSocket de frames: suivi des visages (FaceTracker) et cadence de détection (AdaptiveRate)"""
+import asyncio
+import pytest
+from app.services.frame_stream import AdaptiveRate, FaceTracker, LatestFrame, iou
+
+LEFT = (0, 0, 100, 100)
+RIGHT = (300, 0, 100, 100)
+
+
+def shifted(box, dx):
+    x, y, w, h = box
+    return (x + dx, y, w, h)
+
+
+@pytest.fixture
+def tracker():
+    return FaceTracker(match_iou=0.3, change_iou=0.6, max_missed=2)
+
+
+def test_iou():
+    assert iou(LEFT, LEFT) == 1.0
+    assert iou(LEFT, RIGHT) == 0.0
+    assert iou(LEFT, shifted(LEFT, 50)) == pytest.approx(50 / 150)
+
+
+def test_tracks_follow_faces_across_frames(tracker):
+    tracks, to_recognize = tracker.update([LEFT, RIGHT])
+    assert to_recognize == [0, 1]
+    left_id, right_id = tracks[0].id, tracks[1].id
+    tracks[0].student_id = 7  # Reconnu
+
+    # Les visages bougent un peu et l'ordre des boîtes change
+    tracks, to_recognize = tracker.update([shifted(RIGHT, 10), shifted(LEFT, 10)])
+
+    assert [track.id for track in tracks] == [right_id, left_id]
+    assert tracks[1].student_id == 7
+    assert to_recognize == []  # Reconnu: gardé; non reconnu mais presque immobile: pas de nouvel essai
+
+
+def test_unrecognized_face_is_retried_once_it_moves(tracker):
+    tracker.update([LEFT])
+    retried = []
+    for step in range(1, 4):
+        tracks, to_recognize = tracker.update([shifted(LEFT, 15 * step)])
+        retried.append(to_recognize)
+    assert len(tracker.tracks) == 1
+    # IoU avec le dernier essai: 0.74 (gardé), 0.54 < change_iou (nouvel essai), puis 0.74 depuis ce nouvel essai
+    assert retried == [[], [0], []]
+    assert tracks[0].attempted_box == shifted(LEFT, 30)
+
+
+def test_track_survives_missed_frames_then_expires(tracker):
+    tracks, _ = tracker.update([LEFT])
+    track_id = tracks[0].id
+    tracks[0].student_id = 7
+
+    tracker.update([])
+    tracker.update([])
+    tracks, to_recognize = tracker.update([LEFT])
+    assert tracks[0].id == track_id and tracks[0].student_id == 7
+    assert to_recognize == []
+
+    for _ in range(3):  # max_missed + 1 frames sans le visage
+        tracker.update([])
+    assert tracker.tracks == []
+    tracks, to_recognize = tracker.update([LEFT])
+    assert tracks[0].id != track_id and tracks[0].student_id is None
+    assert to_recognize == [0]
+
+
+def test_new_face_far_from_every_track_gets_its_own_track(tracker):
+    tracks, _ = tracker.update([LEFT])
+    tracks, to_recognize = tracker.update([LEFT, RIGHT])
+    assert tracks[0].id != tracks[1].id
+    assert to_recognize == [1]
+
+
+def test_rate_backs_off_when_stable_and_resets_on_new_faces():
+    rate = AdaptiveRate(min_interval=0.2, max_interval=2.0)
+
+    intervals = [rate.update(processing=0.05, busy=False) for _ in range(8)]
+    assert intervals == sorted(intervals)
+    assert intervals[0] == pytest.approx(0.3)
+    assert intervals[-1] == 2.0
+
+    assert rate.update(processing=0.05, busy=True) == 0.2
+
+
+def test_rate_never_shorter_than_processing():
+    rate = AdaptiveRate(min_interval=0.2, max_interval=2.0)
+
+    # Frames lents: l'intervalle suit la durée de traitement, même avec des visages nouveaux
+    assert rate.update(processing=0.9, busy=True) == 0.9
+    assert rate.update(processing=3.0, busy=False) == 3.0
+    assert rate.update(processing=0.1, busy=True) == 0.2
+
+
+def test_latest_frame_keeps_only_the_newest():
+    slot = LatestFrame()
+    for frame in (b"1", b"2", b"3"):
+        slot.put(frame)
+
+    assert asyncio.run(slot.take()) == b"3"
+    assert (slot.received, slot.dropped) == (3, 2)
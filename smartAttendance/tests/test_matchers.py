@@ -0,0 +1,131 @@
+"""Moteurs de recherche du plus proche voisin (services/matchers.py)"""
+import numpy as np
+import pytest
+from app.services.embedding_index import EmbeddingIndex
+from app.services.embedding_store import EmbeddingStore
+from app.services.matchers import ExactMatcher, IVFMatcher
+
+
+def test_exact_matcher_reads_the_memmap_without_copy(tmp_path):
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(50, 16)).astype(np.float32)
+    store = EmbeddingStore(tmp_path)
+    store.publish(embeddings, [f"s{i}" for i in range(50)], 0.9)
+    memmap, _ = store.open()
+
+    matcher = ExactMatcher(np.arange(len(memmap)), memmap)
+    assert np.shares_memory(matcher.matrix, memmap)
+
+    # Une pierre tombale n'écrit que les normes: toujours le memmap
+    removed = matcher.without_row(7)
+    assert np.shares_memory(removed.matrix, memmap)
+    assert removed.search(embeddings[7])[0] != 7
+
+    # Le premier ajout recopie dans un tampon à marge; le memmap (lecture seule) est intact
+    added = removed.with_row(100, embeddings[7])
+    assert not np.shares_memory(added.matrix, memmap)
+    assert added.search(embeddings[7]) == (100, pytest.approx(0.0, abs=1e-2))
+    assert np.array_equal(np.asarray(memmap), embeddings)
+
+
+def brute_force(rows: dict[int, np.ndarray], vectors: np.ndarray):
+    ids = np.asarray(list(rows), dtype=np.int64)
+    matrix = np.vstack(list(rows.values()))
+    distances = np.linalg.norm(vectors[:, None, :] - matrix[None, :, :], axis=2)
+    best = np.argmin(distances, axis=1)
+    return ids[best], distances[np.arange(len(vectors)), best]
+
+
+def test_exact_matcher_grows_past_its_capacity():
+    rng = np.random.default_rng(1)
+    initial = rng.normal(size=(3, 16)).astype(np.float32)
+    first = ExactMatcher(np.arange(3), initial)
+
+    matcher = first
+    added = rng.normal(size=(200, 16)).astype(np.float32)
+    for row_id, vector in enumerate(added, start=3):
+        matcher = matcher.with_row(row_id, vector)
+
+    assert len(matcher) == 203
+    assert list(matcher.search_many(added)[0]) == list(range(3, 203))
+    # Un ancien matcher garde ses lignes et ne voit pas les ajouts
+    assert len(first) == 3
+    assert list(first.search_many(initial)[0]) == [0, 1, 2]
+
+
+def test_removed_rows_are_never_returned():
+    rng = np.random.default_rng(2)
+    matrix = rng.normal(size=(40, 16)).astype(np.float32)
+    matcher = ExactMatcher(np.arange(40), matrix)
+
+    # Assez de suppressions pour compacter le tampon (plus de la moitié de pierres tombales)
+    removed = set(range(0, 40, 2)) | {1, 3, 5}
+    for row_id in sorted(removed):
+        matcher = matcher.without_row(row_id)
+        assert matcher.vector_of(row_id) is None
+
+    assert len(matcher) == 40 - len(removed)
+    found = set(matcher.search_many(matrix)[0].tolist())
+    assert found and not found & removed
+    assert set(matcher.rows()[0].tolist()) == set(range(40)) - removed
+
+    # Ré-ajoutée, une ligne supprimée redevient trouvable
+    matcher = matcher.with_row(4, matrix[4])
+    assert matcher.search(matrix[4]) == (4, pytest.approx(0.0, abs=1e-2))
+
+
+@pytest.mark.parametrize("make", [
+    lambda ids, matrix: ExactMatcher(ids, matrix),
+    lambda ids, matrix: IVFMatcher(ids, matrix, nprobe=1_000),  # Toutes les listes sondées: exact
+], ids=["exact", "ivf"])
+def test_search_matches_brute_force_after_adds_and_removes(make):
+    rng = np.random.default_rng(3)
+    rows = {row_id: rng.normal(size=16).astype(np.float32) for row_id in range(64)}
+    matcher = make(np.asarray(list(rows), dtype=np.int64), np.vstack(list(rows.values())))
+    next_id = 64
+
+    for step in range(400):
+        operation = rng.random()
+        if operation < 0.45 or len(rows) < 5:
+            rows[next_id] = rng.normal(size=16).astype(np.float32)
+            matcher = matcher.with_row(next_id, rows[next_id])
+            next_id += 1
+        elif operation < 0.6:
+            # Remplacement d'une ligne existante
+            row_id = int(rng.choice(list(rows)))
+            rows[row_id] = rng.normal(size=16).astype(np.float32)
+            matcher = matcher.with_row(row_id, rows[row_id])
+        else:
+            row_id = int(rng.choice(list(rows)))
+            del rows[row_id]
+            matcher = matcher.without_row(row_id)
+        matcher = matcher.without_row(10_000 + step)  # Ligne inconnue: sans effet
+
+        if step % 20 == 0:
+            queries = np.vstack([rng.normal(size=(8, 16)), list(rows.values())[:8]]).astype(np.float32)
+            ids, distances = matcher.search_many(queries)
+            expected_ids, expected_distances = brute_force(rows, queries)
+            assert len(matcher) == len(rows)
+            assert ids.tolist() == expected_ids.tolist()
+            # ||a||² - 2a.b + ||b||² en float32: ~1e-3 d'erreur près de zéro
+            np.testing.assert_allclose(distances, expected_distances, rtol=1e-4, atol=1e-2)
+
+
+def test_index_never_matches_evicted_templates_or_removed_students():
+    rng = np.random.default_rng(4)
+    index = EmbeddingIndex(dim=16)
+    templates = {template_id: rng.normal(size=16).astype(np.float32) for template_id in range(1, 7)}
+    for template_id, vector in templates.items():
+        student_id = 100 + (template_id - 1) // 2  # Deux templates par étudiant
+        index.add_template(student_id, template_id, vector, name=f"S{student_id}", groupe_id=1)
+
+    index.remove_templates([1])
+    assert index.match(templates[1], groupe_id=1)[0] is not None
+    assert all(index.match(templates[1], groupe_id=groupe)[1] > 0 for groupe in (None, 1))
+    assert index.match(templates[2]) == (100, pytest.approx(0.0, abs=1e-2))
+
+    index.remove(101)
+    for template_id in (3, 4):
+        assert index.match(templates[template_id])[0] != 101
+        assert index.match(templates[template_id], groupe_id=1)[0] != 101
+    assert len(index) == 3
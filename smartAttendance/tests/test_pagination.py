@@ -0,0 +1,102 @@
+"""Pagination par curseur (utils/pagination.py): pages complètes, sans doublon, curseur invalide refusé"""
+import json
+from datetime import time
+import pytest
+from fastapi.testclient import TestClient
+from app.database import Base, SessionLocal, engine
+from app.main import app
+from app.models.cours import Cours, JourSemaine
+from app.models.enseignant import Enseignant
+from app.models.filiere import Filiere
+from app.models.groupe import Groupe
+from app.models.module import Module
+from app.models.student import Student
+from app.models.user import User, UserRole
+from app.utils.dependencies import get_current_user
+from app.utils.pagination import NEXT_CURSOR_HEADER
+
+NB_STUDENTS = 11
+
+
+@pytest.fixture
+def users():
+    """Un admin, un enseignant avec deux cours dans le même groupe, des étudiants homonymes"""
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    admin = User(email="admin@test.ma", hashed_password="x", full_name="Admin", role=UserRole.ADMIN, is_active=True)
+    teacher = User(email="prof@test.ma", hashed_password="x", full_name="Prof", role=UserRole.ENSEIGNANT, is_active=True)
+    filiere = Filiere(code="GI", nom="Génie Informatique")
+    db.add_all([admin, teacher, filiere])
+    db.flush()
+    db.add(Enseignant(user_id=teacher.id))
+    groupe = Groupe(code="GI1-A", filiere_id=filiere.id, annee=1)
+    module = Module(code="ALGO", nom="Algorithmique", filiere_id=filiere.id, annee=1)
+    db.add_all([groupe, module])
+    db.flush()
+    for jour in (JourSemaine.LUNDI, JourSemaine.MARDI):
+        db.add(Cours(module_id=module.id, groupe_id=groupe.id, enseignant_id=teacher.id, jour=jour,
+                     heure_debut=time(8, 0), heure_fin=time(10, 0), salle="B12"))
+    student_ids = []
+    for i in range(NB_STUDENTS):
+        user = User(email=f"s{i}@test.ma", hashed_password="x", full_name="Même Nom", role=UserRole.STUDENT, is_active=True)
+        db.add(user)
+        db.flush()
+        student = Student(user_id=user.id, groupe_id=groupe.id)
+        db.add(student)
+        db.flush()
+        student_ids.append(student.id)
+    db.commit()
+    yield admin, teacher, student_ids
+    app.dependency_overrides.pop(get_current_user, None)
+    db.close()
+    Base.metadata.drop_all(engine)
+
+
+def client_as(user) -> TestClient:
+    app.dependency_overrides[get_current_user] = lambda: user
+    return TestClient(app)
+
+
+def all_pages(client: TestClient, url: str, limit: int) -> list[list[int]]:
+    pages, params = [], {"limit": limit}
+    while True:
+        response = client.get(url, params=params)
+        assert response.status_code == 200
+        pages.append([item["id"] for item in response.json()])
+        if NEXT_CURSOR_HEADER not in response.headers:
+            return pages
+        params = {"limit": limit, "after_id": response.headers[NEXT_CURSOR_HEADER]}
+
+
+@pytest.mark.parametrize("url, role", [("/students/active", "admin"), ("/enseignants/students", "teacher")])
+def test_pages_cover_every_row_once(users, url, role):
+    admin, teacher, student_ids = users
+    client = client_as(admin if role == "admin" else teacher)
+
+    pages = all_pages(client, url, limit=4)
+
+    assert [len(page) for page in pages] == [4, 4, 3]
+    assert [student_id for page in pages for student_id in page] == sorted(student_ids)
+    # Sans paramètre: la liste complète, comme avant la pagination
+    assert sorted(item["id"] for item in client.get(url).json()) == sorted(student_ids)
+
+
+def test_stream_resumes_after_cursor(users):
+    admin, _, student_ids = users
+    client = client_as(admin)
+
+    response = client.get("/students/active", params={"stream": "true", "after_id": student_ids[2], "limit": 5})
+
+    assert response.status_code == 200
+    assert [json.loads(line)["id"] for line in response.text.splitlines()] == student_ids[3:8]
+
+
+@pytest.mark.parametrize("cursor", ["abc", "1.5", "", "9" * 30])
+def test_malformed_cursor_is_rejected(users, cursor):
+    admin, _, _ = users
+    client = client_as(admin)
+
+    for params in ({"after_id": cursor}, {"after_id": cursor, "stream": "true"}):
+        response = client.get("/students/active", params=params)
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid cursor"
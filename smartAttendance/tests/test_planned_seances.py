@@ -0,0 +1,102 @@
+"""Séances planifiées à l'avance (seance_scheduler.plan_seances): pas encore tenues, absentes des pages"""
+from datetime import date, datetime, time, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from app.database import Base, SessionLocal, engine
+from app.main import app
+from app.models.cours import Cours
+from app.models.enseignant import Enseignant
+from app.models.filiere import Filiere
+from app.models.groupe import Groupe
+from app.models.module import Module
+from app.models.seance import Seance
+from app.models.student import Student
+from app.models.user import User, UserRole
+from app.routers.enseignants import _teacher_cours, _teacher_dashboard, _teacher_seances  # Sans le cache de réponses
+from app.services.attendance_service import finalize_seance, record_attendances
+from app.services.seance_scheduler import WEEKDAYS, plan_seances
+from app.utils.dependencies import get_current_user
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(engine)
+    session = SessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(engine)
+
+
+@pytest.fixture
+def teacher(db):
+    """Un cours d'un autre jour que aujourd'hui (ses séances planifiées sont toutes à venir), une séance passée clôturée"""
+    user = User(email="prof@test.ma", hashed_password="x", full_name="Prof", role=UserRole.ENSEIGNANT, is_active=True)
+    filiere = Filiere(code="GI", nom="Génie Informatique")
+    db.add_all([user, filiere])
+    db.flush()
+    db.add(Enseignant(user_id=user.id))
+    groupe = Groupe(code="GI1-A", filiere_id=filiere.id, annee=1)
+    module = Module(code="ALGO", nom="Algorithmique", filiere_id=filiere.id, annee=1)
+    db.add_all([groupe, module])
+    db.flush()
+    jour = next(jour for jour, weekday in WEEKDAYS.items() if weekday != date.today().weekday())
+    cours = Cours(module_id=module.id, groupe_id=groupe.id, enseignant_id=user.id, jour=jour,
+                  heure_debut=time(8, 0), heure_fin=time(10, 0), salle="B12")
+    db.add(cours)
+    students = []
+    for i in range(3):
+        student_user = User(email=f"s{i}@test.ma", hashed_password="x", full_name=f"Student {i}", role=UserRole.STUDENT, is_active=True)
+        db.add(student_user)
+        db.flush()
+        students.append(Student(user_id=student_user.id, groupe_id=groupe.id))
+    db.add_all(students)
+    db.flush()
+    seance = Seance(cours_id=cours.id, date=datetime.combine(date.today() - timedelta(days=1), time(8, 0)),
+                    heure_debut=cours.heure_debut, heure_fin=cours.heure_fin, is_active=True)
+    db.add(seance)
+    db.flush()
+    record_attendances(db, seance, [(students[0].id, 0.9, "present"), (students[1].id, 0.8, "late")])
+    finalize_seance(db, seance)
+    db.commit()
+    return user
+
+
+def teacher_pages(db, teacher):
+    db.expire_all()
+    return _teacher_dashboard(teacher, db), _teacher_cours(teacher, db), _teacher_seances(teacher, db)
+
+
+def test_planned_seances_do_not_change_teacher_pages(db, teacher):
+    before = teacher_pages(db, teacher)
+
+    assert plan_seances(db, datetime.now(), 14) >= 2
+    db.commit()
+
+    assert teacher_pages(db, teacher) == before
+    _, cours, seances = before
+    assert cours[0]["nbSeances"] == 1
+    assert cours[0]["tauxPresence"] == pytest.approx(33.3)
+    assert [(s["presents"], s["retards"], s["absents"]) for s in seances] == [(1, 1, 1)]
+
+
+def test_recent_courses_planned_seances_are_upcoming(db, teacher):
+    cours = db.query(Cours).one()
+    student = db.query(Student).order_by(Student.id.desc()).first()  # Absent de la séance passée
+    # Séance du jour en cours quelle que soit l'heure du test
+    db.add(Seance(cours_id=cours.id, date=datetime.combine(date.today(), time(0, 0)),
+                  heure_debut=time(0, 0), heure_fin=time(23, 59, 59), is_active=True))
+    plan_seances(db, datetime.now(), 14)
+    db.commit()
+    student_user = db.get(User, student.user_id)
+
+    app.dependency_overrides[get_current_user] = lambda: student_user
+    try:
+        response = TestClient(app).get("/students/me/recent-courses")
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+
+    assert response.status_code == 200
+    statuses = {course["date"][:10]: course["status"] for course in response.json()}
+    assert statuses.pop((date.today() - timedelta(days=1)).isoformat()) == "absent"
+    assert statuses.pop(date.today().isoformat()) == "en_cours"
+    assert statuses and set(statuses.values()) == {"a_venir"}
@@ -0,0 +1,105 @@
+"""
+Plans d'exécution des requêtes des pages enseignant (dashboard, séance en
+cours, liste des cours, pourcentages de présence): aucune ne doit parcourir
+entièrement une table volumineuse au lieu d'utiliser les index déclarés
+dans les modèles / la migration 0001.
+
+Les requêtes émises par chaque page sont capturées puis rejouées sous
+EXPLAIN QUERY PLAN (SQLite, base en mémoire) ou EXPLAIN avec enable_seqscan
+désactivé (PostgreSQL, TEST_DATABASE_URL): un "Seq Scan" y signale
+l'absence d'index utilisable. Ignoré pour les autres bases.
+"""
+import os
+import random
+import re
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.models.student import Student
+from app.routers.enseignants import _teacher_dashboard, _current_seance, _teacher_cours
+from app.services.presence_service import calculate_presence_percentages
+from benchmarks.bench_dashboard import populate
+
+# Tables dont la taille croît avec l'historique: un parcours complet y est interdit
+HOT_TABLES = {
+    "attendances", "seances", "students", "cours", "student_embeddings",
+    "seance_attendance_rollups", "cours_student_attendance_rollups", "student_attendance_rollups",
+}
+
+PAGES = {
+    "dashboard": lambda teacher, db, student_ids: _teacher_dashboard(teacher, db),
+    "seances/current": lambda teacher, db, student_ids: _current_seance(teacher, db),
+    "cours": lambda teacher, db, student_ids: _teacher_cours(teacher, db),
+    "presence": lambda teacher, db, student_ids: calculate_presence_percentages(student_ids, db),
+}
+
+
+def _sqlite_scans(conn, statement, parameters) -> list[str]:
+    plan = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+    return [
+        row[-1] for row in plan
+        if row[-1].startswith("SCAN ") and row[-1].split()[1] in HOT_TABLES and "INDEX" not in row[-1]
+    ]
+
+
+def _postgresql_scans(conn, statement, parameters) -> list[str]:
+    plan = conn.exec_driver_sql("EXPLAIN " + statement, parameters).scalars().all()
+    return [
+        line.strip() for line in plan
+        if (match := re.search(r"Seq Scan on (\w+)", line)) and match.group(1) in HOT_TABLES
+    ]
+
+
+@pytest.fixture(scope="module")
+def populated():
+    url = make_url(os.environ["DATABASE_URL"])
+    if url.get_backend_name() == "sqlite":
+        engine = create_engine("sqlite://")
+    elif url.get_backend_name() == "postgresql":
+        engine = create_engine(url)
+        Base.metadata.drop_all(engine)
+    else:
+        pytest.skip(f"EXPLAIN non vérifié pour {url.get_backend_name()}")
+
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    teacher = populate(db, 5, 30, 10, random.Random(0))
+    db.refresh(teacher)
+    student_ids = [sid for (sid,) in db.query(Student.id)]
+    yield engine, db, teacher, student_ids
+    db.close()
+    if engine.dialect.name == "postgresql":
+        Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+@pytest.mark.parametrize("page", list(PAGES))
+def test_no_full_scan_on_hot_tables(populated, page):
+    engine, db, teacher, student_ids = populated
+    db.expunge_all()
+    db.add(teacher)
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        PAGES[page](teacher, db, student_ids)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    db.rollback()
+    assert statements
+
+    scans = []
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.exec_driver_sql("SET enable_seqscan = off")
+        for statement, parameters in statements:
+            found = (_postgresql_scans if engine.dialect.name == "postgresql" else _sqlite_scans)(conn, statement, parameters)
+            scans.extend(f"{scan}  <-  {' '.join(statement.split())[:160]}" for scan in found)
+    assert not scans, "\n".join(scans)
@@ -0,0 +1,143 @@
+"""Re-reconnaissance d'un étudiant déjà marqué: réponse sans toucher la base (recognition_cache)"""
+from datetime import datetime, time
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.database import Base, SessionLocal, async_engine, engine
+from app.main import app
+from app.models.attendance import Attendance
+from app.models.cours import Cours, JourSemaine
+from app.models.filiere import Filiere
+from app.models.groupe import Groupe
+from app.models.module import Module
+from app.models.seance import Seance
+from app.models.student import Student
+from app.models.user import User, UserRole
+from app.services.attendance_service import finalize_seance
+from app.services.embedding_extractor import extractor
+from app.services.embedding_index import embedding_index
+from app.services.recognition_cache import recognition_cache
+from app.utils.dependencies import get_current_user
+
+FACE = np.full(512, 0.1, dtype=np.float32)
+
+
+@pytest.fixture
+def seance():
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    filiere = Filiere(code="GI", nom="Génie Informatique")
+    db.add(filiere)
+    db.flush()
+    groupe = Groupe(code="GI1-A", filiere_id=filiere.id, annee=1)
+    module = Module(code="ALGO", nom="Algorithmique", filiere_id=filiere.id, annee=1)
+    teacher = User(email="prof@test.ma", hashed_password="x", full_name="Prof", role=UserRole.ENSEIGNANT, is_active=True)
+    db.add_all([groupe, module, teacher])
+    db.flush()
+    cours = Cours(module_id=module.id, groupe_id=groupe.id, enseignant_id=teacher.id, jour=JourSemaine.LUNDI,
+                  heure_debut=time(0, 0), heure_fin=time(23, 59, 59), salle="B12")
+    user = User(email="s0@test.ma", hashed_password="x", full_name="Student 0", role=UserRole.STUDENT, is_active=True)
+    db.add_all([cours, user])
+    db.flush()
+    student = Student(user_id=user.id, groupe_id=groupe.id)
+    db.add(student)
+    db.flush()
+    seance = Seance(cours_id=cours.id, date=datetime.now(), heure_debut=cours.heure_debut, heure_fin=cours.heure_fin, is_active=True)
+    db.add(seance)
+    db.commit()
+    yield db, seance, student
+    recognition_cache.evict(seance.id)
+    db.close()
+    Base.metadata.drop_all(engine)
+
+
+@pytest.fixture
+def recognizes(monkeypatch, seance):
+    """Chaque image contient le visage de l'étudiant; compte les appels au matching"""
+    _, _, student = seance
+    calls = []
+    monkeypatch.setattr(extractor, "extract_from_image", lambda image_bytes: FACE)
+    monkeypatch.setattr(embedding_index, "match", lambda embedding, groupe_id=None: calls.append(groupe_id) or (student.id, 0.2))
+    return calls
+
+
+def count_statements():
+    """Requêtes émises sur les deux engines (routes sync et async)"""
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    engines = (engine, async_engine.sync_engine)
+    for target in engines:
+        event.listen(target, "before_cursor_execute", listener)
+
+    def stop():
+        for target in engines:
+            event.remove(target, "before_cursor_execute", listener)
+    return statements, stop
+
+
+def test_mark_twice_short_circuits_second_time(seance, recognizes):
+    _, current, _ = seance
+    client = TestClient(app)
+
+    first = client.post(f"/attendance/mark/{current.id}", files={"file": ("face.jpg", b"jpeg")})
+    assert first.status_code == 200
+    status = first.json()["status"]  # "present" ou "late" selon l'heure du test
+
+    statements, stop = count_statements()
+    try:
+        second = client.post(f"/attendance/mark/{current.id}", files={"file": ("face.jpg", b"jpeg")})
+    finally:
+        stop()
+    assert second.status_code == 400
+    assert second.json()["detail"] == f"Présence déjà enregistrée ({status})"
+    assert statements == []
+    assert len(recognizes) == 1  # Même visage: résultat de la sonde précédente
+
+
+def test_finalized_seance_is_evicted(seance, recognizes):
+    db, current, _ = seance
+    client = TestClient(app)
+    assert client.post(f"/attendance/mark/{current.id}", files={"file": ("face.jpg", b"jpeg")}).status_code == 200
+    assert recognition_cache.get(current.id) is not None
+
+    finalize_seance(db, db.get(Seance, current.id))
+    db.commit()
+
+    assert recognition_cache.get(current.id) is None
+    response = client.post(f"/attendance/mark/{current.id}", files={"file": ("face.jpg", b"jpeg")})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Cette séance est terminée"
+
+
+def test_recognize_twice_short_circuits_second_time(seance, recognizes):
+    db, current, _ = seance
+    teacher = db.get(User, db.get(Cours, current.cours_id).enseignant_id)
+    app.dependency_overrides[get_current_user] = lambda: teacher
+    try:
+        client = TestClient(app)
+        first = client.post(f"/recognition/recognize/{current.id}", files={"file": ("face.jpg", b"jpeg")})
+        assert first.status_code == 200
+
+        statements, stop = count_statements()
+        try:
+            second = client.post(f"/recognition/recognize/{current.id}", files={"file": ("face.jpg", b"jpeg")})
+        finally:
+            stop()
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+    assert second.status_code == 400
+    assert second.json()["detail"] == f"Déjà marqué(e) comme {first.json()['status']}"
+    assert statements == []
+
+
+def test_statuses_loaded_from_the_database_are_normalized(seance, recognizes):
+    db, current, student = seance
+    db.add(Attendance(seance_id=current.id, student_id=student.id, confidence=0.9, status="PRESENT"))  # Ligne héritée
+    db.commit()
+
+    response = TestClient(app).post(f"/attendance/mark/{current.id}", files={"file": ("face.jpg", b"jpeg")})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Présence déjà enregistrée (present)"
+    assert recognition_cache.get(current.id).status_of(student.id) == "present"
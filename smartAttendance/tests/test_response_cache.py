@@ -0,0 +1,138 @@
+"""Invalidation du cache des pages enseignant (response_cache) au commit des écritures"""
+from datetime import datetime, time
+import pytest
+from fastapi.testclient import TestClient
+from app.database import Base, SessionLocal, engine
+from app.main import app
+from app.models.cours import Cours, JourSemaine
+from app.models.filiere import Filiere
+from app.models.groupe import Groupe
+from app.models.module import Module
+from app.models.seance import Seance
+from app.models.student import Student
+from app.models.user import User, UserRole
+from app.routers.seances import end_seance, start_seance
+from app.services.attendance_service import record_attendances
+from app.services.response_cache import response_cache
+from app.utils.dependencies import get_current_user
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(engine)
+    session = SessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(engine)
+
+
+@pytest.fixture
+def cours(db):
+    """Cours couvrant toute la journée d'un groupe de 2 étudiants"""
+    teacher = User(email="prof@test.ma", hashed_password="x", full_name="Prof", role=UserRole.ENSEIGNANT, is_active=True)
+    filiere = Filiere(code="GI", nom="Génie Informatique")
+    db.add_all([teacher, filiere])
+    db.flush()
+    groupe = Groupe(code="GI1-A", filiere_id=filiere.id, annee=1)
+    module = Module(code="ALGO", nom="Algorithmique", filiere_id=filiere.id, annee=1)
+    db.add_all([groupe, module])
+    db.flush()
+    cours = Cours(module_id=module.id, groupe_id=groupe.id, enseignant_id=teacher.id, jour=JourSemaine.LUNDI,
+                  heure_debut=time(0, 0), heure_fin=time(23, 59, 59), salle="B12")
+    db.add(cours)
+    for i in range(2):
+        user = User(email=f"s{i}@test.ma", hashed_password="x", full_name=f"Student {i}", role=UserRole.STUDENT, is_active=True)
+        db.add(user)
+        db.flush()
+        db.add(Student(user_id=user.id, groupe_id=groupe.id))
+    db.commit()
+    response_cache.invalidate_teacher(teacher.id)  # Les ids repartent de 1 à chaque test
+    return cours
+
+
+@pytest.fixture
+def cached(cours):
+    """Lecture en cache d'une page de l'enseignant du cours; retourne le nombre de calculs"""
+    computed = []
+
+    def read():
+        response_cache.get_or_compute("test", cours.enseignant_id, lambda: computed.append(1) or len(computed))
+        return len(computed)
+    return read
+
+
+def new_seance(db, cours) -> Seance:
+    seance = Seance(cours_id=cours.id, date=datetime.now(), heure_debut=cours.heure_debut, heure_fin=cours.heure_fin, is_active=True)
+    db.add(seance)
+    db.commit()
+    return seance
+
+
+def test_committed_attendance_invalidates(db, cours, cached):
+    seance = new_seance(db, cours)
+    student = db.query(Student).first()
+    assert cached() == 1
+    assert cached() == 1
+
+    record_attendances(db, seance, [(student.id, 0.9, "present")])
+    assert cached() == 1  # Pas encore commitée: l'ancienne valeur reste valable
+    db.commit()
+
+    assert cached() == 2
+    assert cached() == 2
+
+
+def test_seance_start_and_end_invalidate(db, cours, cached):
+    teacher = db.get(User, cours.enseignant_id)
+    assert cached() == 1
+
+    state = start_seance(cours.id, current_user=teacher, db=db)
+    assert cached() == 2
+
+    end_seance(state.id, current_user=teacher, db=db)
+    assert cached() == 3
+
+
+def test_rolled_back_write_does_not_invalidate(db, cours, cached):
+    seance = new_seance(db, cours)
+    student = db.query(Student).first()
+    assert cached() == 1
+
+    record_attendances(db, seance, [(student.id, 0.9, "present")])
+    db.rollback()
+    assert cached() == 1
+
+    # L'invalidation abandonnée n'est pas reportée sur la transaction suivante
+    db.get(Seance, seance.id).is_active = False
+    db.commit()
+    assert cached() == 1
+
+
+def test_savepoint_invalidates_only_at_outer_commit(db, cours, cached):
+    seance = new_seance(db, cours)
+    student = db.query(Student).first()
+    assert cached() == 1
+
+    with db.begin_nested():
+        record_attendances(db, seance, [(student.id, 0.9, "present")])
+    assert cached() == 1
+    db.commit()
+
+    assert cached() == 2
+
+
+def test_teacher_page_reflects_committed_attendance(db, cours):
+    seance = new_seance(db, cours)
+    student = db.query(Student).first()
+    teacher = db.get(User, cours.enseignant_id)
+    app.dependency_overrides[get_current_user] = lambda: teacher
+    try:
+        client = TestClient(app)
+        assert client.get("/enseignants/cours").json()[0]["tauxPresence"] == 0
+
+        record_attendances(db, seance, [(student.id, 0.9, "present")])
+        db.commit()
+
+        assert client.get("/enseignants/cours").json()[0]["tauxPresence"] == 50.0
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
@@ -0,0 +1,112 @@
+"""Rollups de présences (attendance_service): tenus à jour par record_attendances et finalize_seance"""
+from datetime import date, datetime, time, timedelta
+import pytest
+from sqlalchemy import delete, update
+from app.database import Base, SessionLocal, engine
+from app.models.attendance_rollup import (
+    CoursStudentAttendanceRollup, SeanceAttendanceRollup, StudentAttendanceRollup
+)
+from app.models.cours import Cours, JourSemaine
+from app.models.filiere import Filiere
+from app.models.groupe import Groupe
+from app.models.module import Module
+from app.models.seance import Seance
+from app.models.student import Student
+from app.models.user import User, UserRole
+from app.services.attendance_service import (
+    finalize_seance, rebuild_rollups, reconcile_rollups, record_attendances
+)
+
+NO_DRIFT = {model.__tablename__: 0 for model in (SeanceAttendanceRollup, CoursStudentAttendanceRollup, StudentAttendanceRollup)}
+
+
+@pytest.fixture
+def db():
+    """Deux cours d'un groupe de 4 étudiants, trois séances clôturées"""
+    Base.metadata.create_all(engine)
+    session = SessionLocal()
+    teacher = User(email="prof@test.ma", hashed_password="x", full_name="Prof", role=UserRole.ENSEIGNANT, is_active=True)
+    filiere = Filiere(code="GI", nom="Génie Informatique")
+    session.add_all([teacher, filiere])
+    session.flush()
+    groupe = Groupe(code="GI1-A", filiere_id=filiere.id, annee=1)
+    module = Module(code="ALGO", nom="Algorithmique", filiere_id=filiere.id, annee=1)
+    session.add_all([groupe, module])
+    session.flush()
+    cours_list = [
+        Cours(module_id=module.id, groupe_id=groupe.id, enseignant_id=teacher.id, jour=jour,
+              heure_debut=time(8, 0), heure_fin=time(10, 0), salle="B12")
+        for jour in (JourSemaine.LUNDI, JourSemaine.MARDI)
+    ]
+    session.add_all(cours_list)
+    students = []
+    for i in range(4):
+        user = User(email=f"s{i}@test.ma", hashed_password="x", full_name=f"Student {i}", role=UserRole.STUDENT, is_active=True)
+        session.add(user)
+        session.flush()
+        students.append(Student(user_id=user.id, groupe_id=groupe.id))
+    session.add_all(students)
+    session.flush()
+
+    for days_ago, cours, marks in [
+        (2, cours_list[0], [(0, "present"), (1, "late")]),
+        (1, cours_list[1], [(0, "present"), (2, "present"), (3, "LATE")]),
+        (0, cours_list[0], [(1, "present")]),
+    ]:
+        seance = Seance(cours_id=cours.id, date=datetime.combine(date.today() - timedelta(days=days_ago), time(8, 0)),
+                        heure_debut=cours.heure_debut, heure_fin=cours.heure_fin, is_active=True)
+        session.add(seance)
+        session.flush()
+        record_attendances(session, seance, [(students[i].id, 0.9, status) for i, status in marks])
+        # Déjà marqué: ni ligne ni compteur en plus
+        record_attendances(session, seance, [(students[marks[0][0]].id, 0.5, "late")])
+        session.commit()
+        finalize_seance(session, seance)
+        session.commit()
+
+    yield session
+    session.close()
+    Base.metadata.drop_all(engine)
+
+
+def test_incremental_rollups_match_attendances(db):
+    assert reconcile_rollups(db, fix=False) == NO_DRIFT
+
+    rollup = db.query(SeanceAttendanceRollup).order_by(SeanceAttendanceRollup.seance_id).all()
+    assert [(r.present, r.late, r.absent) for r in rollup] == [(1, 1, 2), (2, 1, 1), (1, 0, 3)]
+
+
+def test_reconcile_repairs_corrupted_rows(db):
+    first_student = db.query(Student.id).order_by(Student.id).first().id
+    first_seance = db.query(Seance.id).order_by(Seance.id).first().id
+    db.execute(update(StudentAttendanceRollup).where(
+        StudentAttendanceRollup.student_id == first_student
+    ).values(present=StudentAttendanceRollup.present + 5))
+    db.execute(delete(SeanceAttendanceRollup).where(
+        SeanceAttendanceRollup.seance_id == first_seance
+    ))
+    db.add(CoursStudentAttendanceRollup(cours_id=999, student_id=first_student, present=1, late=0, absent=0))
+    db.commit()
+
+    assert reconcile_rollups(db, fix=False) == {
+        SeanceAttendanceRollup.__tablename__: 1,
+        CoursStudentAttendanceRollup.__tablename__: 1,
+        StudentAttendanceRollup.__tablename__: 1,
+    }
+    reconcile_rollups(db, fix=True)
+    db.commit()
+
+    assert reconcile_rollups(db, fix=False) == NO_DRIFT
+
+
+def test_rebuild_matches_incremental_rollups(db):
+    incremental = {
+        model: sorted(tuple(row) for row in db.query(*model.__table__.columns))
+        for model in (SeanceAttendanceRollup, CoursStudentAttendanceRollup, StudentAttendanceRollup)
+    }
+
+    rebuild_rollups(db)
+    db.commit()
+
+    for model, rows in incremental.items():
+        assert sorted(tuple(row) for row in db.query(*model.__table__.columns)) == rows
@@ -0,0 +1,114 @@
+"""Invalidation du cache des utilisateurs authentifiés (user_cache) au commit des écritures"""
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.database import Base, SessionLocal, engine
+from app.main import app
+from app.models.student import Student
+from app.models.user import User, UserRole
+from app.routers.auth import update_user_role
+from app.routers.students import delete_student
+from app.schemas.user import UserUpdate
+from app.services.user_cache import user_cache
+from app.utils.dependencies import authenticate_token
+from app.utils.security import create_access_token, user_claims
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(engine)
+    session = SessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(engine)
+
+
+@pytest.fixture
+def users(db):
+    admin = User(email="admin@test.ma", hashed_password="x", full_name="Admin", role=UserRole.SUPER_ADMIN, is_active=True)
+    teacher = User(email="prof@test.ma", hashed_password="x", full_name="Prof", role=UserRole.ENSEIGNANT, is_active=True)
+    db.add_all([admin, teacher])
+    db.commit()
+    for user in (admin, teacher):
+        user_cache.invalidate(user.id)  # Les ids repartent de 1 à chaque test
+    return admin, teacher
+
+
+def authenticate(user) -> tuple[User, int]:
+    """Utilisateur du jeton de `user`, lu par une autre session, et nombre de requêtes émises"""
+    token = create_access_token(user_claims(user))
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        with SessionLocal() as reader:
+            return authenticate_token(token, reader), len(statements)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+
+def test_second_read_is_served_from_cache(users):
+    _, teacher = users
+    assert authenticate(teacher)[1] == 1
+    cached, statements = authenticate(teacher)
+    assert statements == 0
+    assert cached.role == UserRole.ENSEIGNANT
+
+
+def test_committed_role_update_invalidates(db, users):
+    admin, teacher = users
+    authenticate(teacher)
+
+    update_user_role(teacher.id, UserUpdate(role=UserRole.ADMIN, is_active=False), current_user=admin, db=db)
+
+    user, statements = authenticate(teacher)
+    assert statements == 1
+    assert (user.role, user.is_active) == (UserRole.ADMIN, False)
+
+
+def test_rolled_back_update_does_not_invalidate(db, users):
+    _, teacher = users
+    authenticate(teacher)
+
+    user = db.get(User, teacher.id)
+    user.is_active = False
+    user_cache.invalidate_after_commit(db, user.id)
+    db.rollback()
+
+    cached, statements = authenticate(teacher)
+    assert statements == 0
+    assert cached.is_active is True
+    # L'invalidation abandonnée n'est pas reportée sur la transaction suivante
+    db.get(User, teacher.id).full_name = "Prof 2"
+    db.commit()
+    assert authenticate(teacher)[1] == 0
+
+
+def test_deleted_user_is_rejected(db, users):
+    admin, _ = users
+    user = User(email="s0@test.ma", hashed_password="x", full_name="Student 0", role=UserRole.STUDENT, is_active=True)
+    db.add(user)
+    db.flush()
+    student = Student(user_id=user.id)
+    db.add(student)
+    db.commit()
+    user_cache.invalidate(user.id)
+    authenticate(user)
+
+    delete_student(student.id, current_user=admin, db=db)
+
+    with pytest.raises(HTTPException) as error:
+        authenticate(user)
+    assert error.value.status_code == 401
+
+
+def test_role_change_applies_to_the_next_request(db, users):
+    admin, teacher = users
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {create_access_token(user_claims(teacher))}"}
+    assert client.get("/enseignants/notifications", headers=headers).status_code == 200
+
+    update_user_role(teacher.id, UserUpdate(role=UserRole.STUDENT), current_user=admin, db=db)
+
+    assert client.get("/enseignants/notifications", headers=headers).status_code == 403
@@ -148,27 +148,32 @@ const AutoAttendanceMonitor: React.FC = () => {
       const blob = await fetch(imageData).then((res) => res.blob());
       const file = new File([blob], `capture_${Date.now()}.jpg`, { type: 'image/jpeg' });
 
-      const attendance = await attendanceAPI.markAttendance(seanceId, file);
+      const frame = await attendanceAPI.recognizeFrame(seanceId, file);
       
       // ✅ UTILISER studentsRef.current
       const studentsList = studentsRef.current;
-      console.log('🔍 Attendance student_id:', attendance.student_id);
-      console.log('🔍 Students IDs:', studentsList.map(s => s.id));
+      console.log(`🔍 ${frame.faces_detected} visage(s), ${frame.recognized.length} nouvelle(s) présence(s)`);
       
-      const student = studentsList.find(s => s.id === attendance.student_id);
-      
-      const studentName = student && student.user && student.user.full_name
-        ? student.user.full_name 
-        : `Étudiant #${attendance.student_id}`;
-
-      setAttendanceLog(prev => [{
-        timestamp: new Date().toLocaleTimeString(),
-        student: studentName,
-        status: attendance.status,
-        confidence: attendance.confidence
-      }, ...prev].slice(0, 10));
-
-      console.log(`✅ ${studentName} - ${attendance.status} (${Math.round(attendance.confidence * 100)}%)`);
+      const entries = frame.recognized.map((attendance) => {
+        const student = studentsList.find(s => s.id === attendance.student_id);
+        
+        const studentName = student && student.user && student.user.full_name
+          ? student.user.full_name 
+          : `Étudiant #${attendance.student_id}`;
+
+        console.log(`✅ ${studentName} - ${attendance.status} (${Math.round(attendance.confidence * 100)}%)`);
+
+        return {
+          timestamp: new Date().toLocaleTimeString(),
+          student: studentName,
+          status: attendance.status,
+          confidence: attendance.confidence
+        };
+      });
+
+      if (entries.length > 0) {
+        setAttendanceLog(prev => [...entries, ...prev].slice(0, 10));
+      }
     } catch (error: any) {
       console.error('❌ Reconnaissance échouée:', error.response?.data?.detail);
     }
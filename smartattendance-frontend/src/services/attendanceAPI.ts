@@ -1,5 +1,5 @@
 import api from './api';
-import { Attendance, Seance, CoursInfo } from '../types/attendance';
+import { Attendance, Seance, CoursInfo, FrameRecognition } from '../types/attendance';
 
 export const attendanceAPI = {
   markAttendance: async (seanceId: number, file: File): Promise<Attendance> => {
@@ -11,6 +11,15 @@ export const attendanceAPI = {
     return response.data;
   },
 
+  recognizeFrame: async (seanceId: number, file: File): Promise<FrameRecognition> => {
+    const formData = new FormData();
+    formData.append('file', file);
+    const response = await api.post(`/recognition/seance/${seanceId}/frame`, formData, {
+      headers: { 'Content-Type': 'multipart/form-data' },
+    });
+    return response.data;
+  },
+
   getBySeance: async (seanceId: number): Promise<Attendance[]> => {
     const response = await api.get(`/attendance/seance/${seanceId}`);
     return response.data;
@@ -7,6 +7,13 @@ export interface Attendance {
   timestamp: string;
 }
 
+export interface FrameRecognition {
+  faces_detected: number;
+  recognized: Attendance[];
+  already_marked: number[];
+  unrecognized: number;
+}
+
 export interface Seance {
   id: number;
   cours_id: number;